@@ -1,40 +1,401 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, g, send_file
 from datetime import datetime, timedelta
+import atexit
 import json
+import os
 import random
+import threading
+import time
+import zlib
+
+from analytics_funnels import FunnelEngine
+from analytics_rollups import LatencyRollups, OverviewRollups, ROLLUP_WINDOWS
+from analytics_store import AnalyticsEventStore
+from event_dedup import EventDeduplicator, MAX_EVENT_ID_LENGTH
+from event_log import EventLog
+from ingest_queue import IngestQueue, IngestRejected
+from report_exports import EXPORT_FORMATS, ReportExporter
+from sessionizer import Sessionizer
+from user_agents import clip_user_agent, user_agent_code, user_agent_info
 
 analytics_bp = Blueprint('analytics', __name__)
 
-# Mock analytics data storage (in production, use a proper database)
-analytics_data = {
-    'page_views': [],
-    'user_interactions': [],
-    'conversion_events': [],
-    'performance_metrics': []
+ANALYTICS_DATA_DIR = os.environ.get(
+    'ANALYTICS_DATA_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database', 'analytics'))
+
+# Durable log of every tracked event, shared by all workers through ANALYTICS_DATA_DIR/events
+# Sealed segments older than the retention are pruned at startup and whenever a segment rotates
+event_log = EventLog(os.path.join(ANALYTICS_DATA_DIR, 'events'),
+                     retention_seconds=float(os.environ.get('ANALYTICS_LOG_RETENTION_DAYS', 90)) * 86400)
+
+# Columnar in-memory rings of recent events per type; evicted events remain readable from the log
+analytics_data = AnalyticsEventStore(capacity=int(os.environ.get('ANALYTICS_EVENT_CAPACITY', 100_000)))
+analytics_lock = threading.Lock()
+
+# Minute/hour rollups behind /dashboard/overview, updated as events are stored;
+# distinct visitors use HyperLogLog sketches of 2**ANALYTICS_HLL_PRECISION registers
+overview_rollups = OverviewRollups(hll_precision=int(os.environ.get('ANALYTICS_HLL_PRECISION', 12)))
+
+# API request timings (request hook below) and client page-load timings as mergeable quantile sketches
+latency_rollups = LatencyRollups()
+
+# Report exports run on a background pool and stream events from the log into files
+report_exporter = ReportExporter(event_log, os.path.join(ANALYTICS_DATA_DIR, 'exports'))
+
+# Funnel and attribution queries over the in-memory rings, cached per window until new events arrive
+funnel_engine = FunnelEngine(analytics_data)
+
+# Open sessions (closed after ANALYTICS_SESSION_TIMEOUT_MINUTES idle) feed the overview rollups when they close
+sessionizer = Sessionizer(
+    timeout=float(os.environ.get('ANALYTICS_SESSION_TIMEOUT_MINUTES', 30)) * 60,
+    max_sessions=int(os.environ.get('ANALYTICS_MAX_OPEN_SESSIONS', 1_000_000)))
+
+def rollup_events(storage, records):
+    overview_rollups.add(storage, records)
+    latency_rollups.add(storage, records)
+
+def sessionize_events(grouped, now=None):
+    overview_rollups.add('sessions', sessionizer.add(grouped, now))
+
+def close_idle_sessions():
+    overview_rollups.add('sessions', sessionizer.advance())
+
+def store_events(grouped):
+    """Durably log events ({storage: [records]}) with one group commit, then add them to memory
+
+    When the ingest queue retries a batch, storages already appended to the
+    log (its `completed` set) are not appended again.
+    """
+    completed = getattr(grouped, 'completed', set())
+    grouped = {storage: records for storage, records in grouped.items() if records}
+    if not grouped:
+        return
+    
+    for storage, records in grouped.items():
+        if storage not in completed:
+            event_log.append(storage, records, durable=False)
+            completed.add(storage)
+    event_log.commit()
+    
+    with analytics_lock:
+        for storage, records in grouped.items():
+            analytics_data[storage].extend(records)
+    
+    for storage, records in grouped.items():
+        rollup_events(storage, records)
+    sessionize_events(grouped, time.time())
+
+# Tracking requests only validate and enqueue; one background writer calls store_events per batch
+ingest_queue = IngestQueue(
+    store_events,
+    max_events=int(os.environ.get('ANALYTICS_INGEST_QUEUE_SIZE', 50_000)),
+    batch_size=int(os.environ.get('ANALYTICS_INGEST_BATCH_SIZE', 1000)),
+    flush_interval=float(os.environ.get('ANALYTICS_INGEST_FLUSH_MS', 50)) / 1000,
+    max_attempts=int(os.environ.get('ANALYTICS_INGEST_MAX_ATTEMPTS', 5)),
+    dead_letter_path=os.path.join(ANALYTICS_DATA_DIR, 'dead_letters.ndjson'))
+atexit.register(ingest_queue.close)
+
+# Retries of events carrying a client event_id are dropped within the dedup window
+event_deduplicator = EventDeduplicator(
+    window=float(os.environ.get('ANALYTICS_DEDUP_WINDOW_SECONDS', 3600)),
+    memory_bytes=int(float(os.environ.get('ANALYTICS_DEDUP_MEMORY_MB', 8)) * (1 << 20)),
+    mode=os.environ.get('ANALYTICS_DEDUP_MODE', 'bloom'),
+    max_conversion_keys=int(os.environ['ANALYTICS_DEDUP_CONVERSION_KEYS'])
+    if os.environ.get('ANALYTICS_DEDUP_CONVERSION_KEYS') else None)
+
+def enqueue_events(grouped, dedup_keys=()):
+    """Queue events for the background writer; returns an error response when the queue pushes back"""
+    try:
+        ingest_queue.offer({storage: records for storage, records in grouped.items() if records})
+    except IngestRejected as e:
+        # Not stored, so the client's retry must not be treated as a duplicate
+        event_deduplicator.release(dedup_keys)
+        response = jsonify({'error': str(e), 'retry_after': e.retry_after})
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, e.status_code
+    return None
+
+def replay_event_log(hours=24, chunk_size=10_000):
+    """Reload the last N hours of logged events into memory and rebuild the overview rollups after a restart"""
+    now = datetime.now()
+    memory_start = (now - timedelta(hours=hours)).isoformat()
+    dedup_start = (now - timedelta(seconds=event_deduplicator.window)).isoformat()
+    rollup_start = now - timedelta(seconds=max(ROLLUP_WINDOWS.values()))
+    
+    pending = {}
+    replayed = 0
+    for storage, record in event_log.read(start=min(rollup_start, now - timedelta(hours=hours))):
+        pending.setdefault(storage, []).append(record)
+        replayed += 1
+        if replayed % chunk_size == 0:
+            replay_chunk(pending, memory_start, dedup_start)
+            pending = {}
+    replay_chunk(pending, memory_start, dedup_start)
+    # Sessionized by event time while replaying; close what has been idle since
+    close_idle_sessions()
+    return replayed
+
+def replay_chunk(grouped, memory_start, dedup_start):
+    for storage, records in grouped.items():
+        replay_records(storage, records, memory_start, dedup_start)
+    sessionize_events(grouped)
+
+def replay_records(storage, records, memory_start, dedup_start):
+    if storage == 'page_views':
+        # Logs written before ua_code existed only carry the raw User-Agent
+        for record in records:
+            if 'ua_code' not in record:
+                record['ua_code'] = user_agent_code(record.get('user_agent'))
+    rollup_events(storage, records)
+    event_deduplicator.remember(storage, [record for record in records
+                                          if 'event_id' in record and record['timestamp'] >= dedup_start])
+    recent = [record for record in records if record['timestamp'] >= memory_start]
+    if recent:
+        analytics_data[storage].extend(recent)
+
+try:
+    event_log.apply_retention()
+    replay_event_log(int(os.environ.get('ANALYTICS_REPLAY_HOURS', 24)))
+except Exception as e:
+    print(f"Error replaying analytics event log: {e}")
+
+@analytics_bp.before_app_request
+def start_request_timer():
+    g.analytics_request_start = time.perf_counter()
+
+@analytics_bp.after_app_request
+def record_request_timing(response):
+    """Time every app request into the API latency sketches, keyed by method and URL rule"""
+    start = g.pop('analytics_request_start', None)
+    if start is not None:
+        rule = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+        latency_rollups.record('api', f"{request.method} {rule}", (time.perf_counter() - start) * 1000,
+                               failed=response.status_code >= 500)
+    return response
+
+# Batch ingestion limits
+MAX_BATCH_EVENTS = 1000
+MAX_BATCH_BYTES = 5 * 1024 * 1024
+MAX_EVENT_AGE = timedelta(days=7)
+MAX_CLOCK_SKEW = timedelta(minutes=5)
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+
+OPTIONAL_ID = (str, int, type(None))
+NUMBER = (int, float)
+
+def event_id_error(event_id):
+    """Error message for an invalid client event_id, or None"""
+    if event_id is None:
+        return None
+    if not isinstance(event_id, (str, int)) or isinstance(event_id, bool) or not str(event_id):
+        return 'event_id must be a non-empty string or integer'
+    if len(str(event_id)) > MAX_EVENT_ID_LENGTH:
+        return f'event_id must be at most {MAX_EVENT_ID_LENGTH} characters'
+    return None
+
+def attach_event_id(data, record):
+    """Carry the client's event_id (if any) into the stored record, for dedup across restarts"""
+    if data.get('event_id') is not None:
+        record['event_id'] = data['event_id']
+    return record
+
+def request_context():
+    """Request-level fields shared by every event in the request"""
+    # Parsed once per distinct header; the cached string is shared by every event that logs it
+    user_agent, ua_code = user_agent_info(clip_user_agent(request.headers.get('User-Agent', '')))
+    return {
+        'user_agent': user_agent,
+        'ua_code': ua_code,
+        'ip_address': request.remote_addr
+    }
+
+def build_pageview(data, context, timestamp):
+    return {
+        'timestamp': timestamp,
+        'page': data.get('page', '/'),
+        'user_agent': context['user_agent'],
+        'ua_code': context['ua_code'],
+        'ip_address': context['ip_address'],
+        'referrer': data.get('referrer', ''),
+        'language': data.get('language', 'en'),
+        'session_id': data.get('session_id', ''),
+        'user_id': data.get('user_id', None)
+    }
+
+def build_interaction(data, context, timestamp):
+    return {
+        'timestamp': timestamp,
+        'event_type': data.get('event_type', 'click'),
+        'element': data.get('element', ''),
+        'page': data.get('page', '/'),
+        'user_id': data.get('user_id', None),
+        'session_id': data.get('session_id', ''),
+        'language': data.get('language', 'en'),
+        'additional_data': data.get('additional_data', {})
+    }
+
+def build_performance(data, context, timestamp):
+    return {
+        'timestamp': timestamp,
+        'metric': data.get('metric', 'page_load'),
+        'value': data.get('value'),
+        'page': data.get('page', '/')
+    }
+
+def build_conversion(data, context, timestamp):
+    return {
+        'timestamp': timestamp,
+        'conversion_type': data.get('conversion_type', 'signup'),
+        'value': data.get('value', 0),
+        'currency': data.get('currency', 'USD'),
+        'user_id': data.get('user_id', None),
+        'session_id': data.get('session_id', ''),
+        'source': data.get('source', 'direct'),
+        'campaign': data.get('campaign', ''),
+        'language': data.get('language', 'en')
+    }
+
+# Event type -> (storage list, record builder, expected field types)
+EVENT_TYPES = {
+    'pageview': ('page_views', build_pageview, {
+        'page': str, 'referrer': str, 'language': str, 'session_id': str, 'user_id': OPTIONAL_ID
+    }),
+    'interaction': ('user_interactions', build_interaction, {
+        'event_type': str, 'element': str, 'page': str, 'language': str, 'session_id': str,
+        'user_id': OPTIONAL_ID, 'additional_data': dict
+    }),
+    'conversion': ('conversion_events', build_conversion, {
+        'conversion_type': str, 'value': NUMBER, 'currency': str, 'source': str,
+        'campaign': str, 'language': str, 'session_id': str, 'user_id': OPTIONAL_ID
+    }),
+    'performance': ('performance_metrics', build_performance, {
+        'metric': str, 'value': NUMBER, 'page': str
+    })
 }
 
+# Fields an event of a type must carry
+REQUIRED_FIELDS = {'performance': ('value',)}
+
+def event_timestamp(event, now):
+    """Client event time (ISO string or epoch milliseconds) when plausible, else now"""
+    value = event.get('timestamp')
+    if value is None:
+        return now.isoformat()
+    
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        # Range-checked before converting: huge, infinite or NaN epochs overflow time_t
+        earliest = (now - MAX_EVENT_AGE).timestamp() * 1000
+        latest = (now + MAX_CLOCK_SKEW).timestamp() * 1000
+        if not earliest <= value <= latest:
+            raise ValueError('timestamp is outside the accepted range')
+        timestamp = datetime.fromtimestamp(value / 1000)
+    elif isinstance(value, str):
+        timestamp = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        if timestamp.tzinfo is not None:
+            try:
+                timestamp = timestamp.astimezone().replace(tzinfo=None)
+            except (OverflowError, OSError):
+                raise ValueError('timestamp is outside the accepted range')
+    else:
+        raise ValueError('timestamp must be an ISO string or epoch milliseconds')
+    
+    if not now - MAX_EVENT_AGE <= timestamp <= now + MAX_CLOCK_SKEW:
+        raise ValueError('timestamp is outside the accepted range')
+    return timestamp.isoformat()
+
+def validate_event(event):
+    """Return an error message for an invalid event (batch or single-event endpoint), or None"""
+    if not isinstance(event, dict):
+        return 'event must be a JSON object'
+    
+    event_type = event.get('type')
+    if event_type not in EVENT_TYPES:
+        return f"unknown event type: {event_type!r}"
+    
+    for field, expected in EVENT_TYPES[event_type][2].items():
+        if field not in event:
+            continue
+        # bool is an int subclass, but true/false is not a number
+        if not isinstance(event[field], expected) or (expected is NUMBER and isinstance(event[field], bool)):
+            return f"invalid type for {field}"
+    for field in REQUIRED_FIELDS.get(event_type, ()):
+        if field not in event:
+            return f"missing field: {field}"
+    return event_id_error(event.get('event_id'))
+
+def read_batch_events():
+    """Decode a batch body (JSON array/object or NDJSON, optionally gzip) into (event, error) pairs"""
+    if request.content_length and request.content_length > MAX_BATCH_BYTES:
+        raise OverflowError(f'batch body exceeds {MAX_BATCH_BYTES} bytes')
+    
+    # Bounded read: without a Content-Length (chunked uploads) the body length is only known at its end
+    raw = request.stream.read(MAX_BATCH_BYTES + 1)
+    if len(raw) > MAX_BATCH_BYTES:
+        raise OverflowError(f'batch body exceeds {MAX_BATCH_BYTES} bytes')
+    if request.headers.get('Content-Encoding', '').lower() == 'gzip':
+        # Bounded decompression so a small compressed body cannot expand without limit
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        raw = decompressor.decompress(raw, MAX_BATCH_BYTES + 1)
+        if len(raw) > MAX_BATCH_BYTES or decompressor.unconsumed_tail:
+            raise OverflowError(f'decompressed batch exceeds {MAX_BATCH_BYTES} bytes')
+    
+    text = raw.decode('utf-8')
+    if request.mimetype not in NDJSON_MIMETYPES:
+        try:
+            payload = json.loads(text)
+        except ValueError:
+            if request.mimetype == 'application/json':
+                raise
+            payload = None  # e.g. text/plain from navigator.sendBeacon: fall through to NDJSON
+        
+        if isinstance(payload, dict):
+            payload = payload.get('events', [payload] if 'type' in payload else None)
+        if isinstance(payload, list):
+            return [(event, None) for event in payload]
+        if payload is not None or request.mimetype == 'application/json':
+            raise ValueError('expected a JSON array of events or an object with an "events" array')
+    
+    events = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        try:
+            events.append((json.loads(line), None))
+        except ValueError as e:
+            events.append((None, f'invalid JSON: {e}'))
+    return events
+
+def track_event(event_type, data, label):
+    """Validate, deduplicate and queue the event of a single-event track endpoint"""
+    # Same checks as a batch event, so nothing unvalidated reaches the queue
+    error = validate_event({**data, 'type': event_type} if isinstance(data, dict) else data)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    storage, builder, _ = EVENT_TYPES[event_type]
+    record = builder(data, request_context(), datetime.now().isoformat())
+    duplicate, key = event_deduplicator.check(storage, attach_event_id(data, record))
+    if duplicate:
+        return jsonify({
+            'status': 'duplicate',
+            'message': f'{label} already tracked'
+        })
+    
+    rejected = enqueue_events({storage: [record]}, [key] if key else [])
+    if rejected:
+        return rejected
+    
+    return jsonify({
+        'status': 'success',
+        'message': f'{label} tracked successfully'
+    }), 202
+
 @analytics_bp.route('/track/pageview', methods=['POST'])
 def track_pageview():
     try:
-        data = request.get_json()
-        
-        pageview_data = {
-            'timestamp': datetime.now().isoformat(),
-            'page': data.get('page', '/'),
-            'user_agent': request.headers.get('User-Agent', ''),
-            'ip_address': request.remote_addr,
-            'referrer': data.get('referrer', ''),
-            'language': data.get('language', 'en'),
-            'session_id': data.get('session_id', ''),
-            'user_id': data.get('user_id', None)
-        }
+        data = request.get_json(silent=True)
         
-        analytics_data['page_views'].append(pageview_data)
-        
-        return jsonify({
-            'status': 'success',
-            'message': 'Pageview tracked successfully'
-        })
+        return track_event('pageview', data, 'Pageview')
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -42,25 +403,9 @@ def track_pageview():
 @analytics_bp.route('/track/interaction', methods=['POST'])
 def track_interaction():
     try:
-        data = request.get_json()
-        
-        interaction_data = {
-            'timestamp': datetime.now().isoformat(),
-            'event_type': data.get('event_type', 'click'),
-            'element': data.get('element', ''),
-            'page': data.get('page', '/'),
-            'user_id': data.get('user_id', None),
-            'session_id': data.get('session_id', ''),
-            'language': data.get('language', 'en'),
-            'additional_data': data.get('additional_data', {})
-        }
+        data = request.get_json(silent=True)
         
-        analytics_data['user_interactions'].append(interaction_data)
-        
-        return jsonify({
-            'status': 'success',
-            'message': 'Interaction tracked successfully'
-        })
+        return track_event('interaction', data, 'Interaction')
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -68,26 +413,82 @@ def track_interaction():
 @analytics_bp.route('/track/conversion', methods=['POST'])
 def track_conversion():
     try:
-        data = request.get_json()
+        data = request.get_json(silent=True)
         
-        conversion_data = {
-            'timestamp': datetime.now().isoformat(),
-            'conversion_type': data.get('conversion_type', 'signup'),
-            'value': data.get('value', 0),
-            'currency': data.get('currency', 'USD'),
-            'user_id': data.get('user_id', None),
-            'session_id': data.get('session_id', ''),
-            'source': data.get('source', 'direct'),
-            'campaign': data.get('campaign', ''),
-            'language': data.get('language', 'en')
-        }
+        return track_event('conversion', data, 'Conversion')
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@analytics_bp.route('/track/performance', methods=['POST'])
+def track_performance():
+    """Client-reported timing, e.g. {"metric": "page_load", "value": 1830, "page": "/pricing"} (ms)"""
+    try:
+        data = request.get_json(silent=True)
         
-        analytics_data['conversion_events'].append(conversion_data)
+        return track_event('performance', data, 'Performance metric')
         
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@analytics_bp.route('/track/batch', methods=['POST'])
+def track_batch():
+    """Track many mixed events per request (JSON or NDJSON, optionally gzip-compressed)"""
+    try:
+        try:
+            events = read_batch_events()
+        except OverflowError as e:
+            return jsonify({'error': str(e)}), 413
+        except ValueError as e:
+            return jsonify({'error': f'Invalid batch body: {e}'}), 400
+        
+        if len(events) > MAX_BATCH_EVENTS:
+            return jsonify({'error': f'batch has {len(events)} events, limit is {MAX_BATCH_EVENTS}'}), 413
+        
+        now = datetime.now()
+        context = request_context()
+        grouped = {storage: [] for storage, _, _ in EVENT_TYPES.values()}
+        dedup_keys = []
+        duplicates = 0
+        results = []
+        
+        for index, (event, error) in enumerate(events):
+            error = error or validate_event(event)
+            if error is None:
+                try:
+                    timestamp = event_timestamp(event, now)
+                except ValueError as e:
+                    error = str(e)
+            if error is not None:
+                results.append({'index': index, 'status': 'rejected', 'error': error})
+                continue
+            
+            storage, builder, _ = EVENT_TYPES[event['type']]
+            record = attach_event_id(event, builder(event, context, timestamp))
+            duplicate, key = event_deduplicator.check(storage, record)
+            if duplicate:
+                duplicates += 1
+                results.append({'index': index, 'status': 'duplicate'})
+                continue
+            if key:
+                dedup_keys.append(key)
+            grouped[storage].append(record)
+            results.append({'index': index, 'status': 'accepted'})
+        
+        # The whole batch is queued (or pushed back) together and lands in one group commit
+        queue_rejected = enqueue_events(grouped, dedup_keys)
+        if queue_rejected:
+            return queue_rejected
+        
+        accepted = sum(len(records) for records in grouped.values())
+        rejected = len(events) - accepted - duplicates
         return jsonify({
-            'status': 'success',
-            'message': 'Conversion tracked successfully'
-        })
+            'status': 'success' if not rejected else 'partial' if accepted or duplicates else 'rejected',
+            'accepted': accepted,
+            'duplicates': duplicates,
+            'rejected': rejected,
+            'results': results
+        }), 202 if accepted else 400 if rejected else 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -95,46 +496,53 @@ def track_conversion():
 @analytics_bp.route('/dashboard/overview', methods=['GET'])
 def get_dashboard_overview():
     try:
-        # Calculate time ranges
-        now = datetime.now()
-        last_24h = now - timedelta(hours=24)
-        last_7d = now - timedelta(days=7)
-        last_30d = now - timedelta(days=30)
-        
-        # Mock data for demonstration
-        overview_data = {
-            'total_users': random.randint(1200, 1500),
-            'active_users_24h': random.randint(150, 200),
-            'page_views_24h': random.randint(800, 1200),
-            'conversion_rate': round(random.uniform(2.5, 4.2), 2),
-            'avg_session_duration': random.randint(180, 300),
-            'bounce_rate': round(random.uniform(35, 45), 1),
-            'top_pages': [
-                {'page': '/', 'views': random.randint(300, 500)},
-                {'page': '/tools', 'views': random.randint(200, 350)},
-                {'page': '/pricing', 'views': random.randint(150, 250)},
-                {'page': '/about', 'views': random.randint(100, 180)}
-            ],
-            'language_distribution': {
-                'en': random.randint(60, 70),
-                'es': random.randint(15, 25),
-                'pap': random.randint(5, 10),
-                'nl': random.randint(5, 10)
-            },
-            'traffic_sources': {
-                'direct': random.randint(40, 50),
-                'organic': random.randint(25, 35),
-                'social': random.randint(10, 20),
-                'referral': random.randint(5, 15),
-                'paid': random.randint(3, 8)
-            }
-        }
+        window = request.args.get('window', '24h')
+        if window not in ROLLUP_WINDOWS:
+            return jsonify({'error': f"window must be one of {', '.join(ROLLUP_WINDOWS)}"}), 400
+        
+        # Merges at most three cached/live rollup buckets, independent of raw event volume
+        close_idle_sessions()
+        overview_data = overview_rollups.overview(window)
+        overview_data['open_sessions'] = len(sessionizer.sessions)
         
         return jsonify(overview_data)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@analytics_bp.route('/dashboard/funnel', methods=['GET'])
+def get_funnel():
+    """Ordered pageview -> interaction -> conversion funnel, e.g. ?window=7d&by=user&conversion_type=purchase"""
+    try:
+        filters = {
+            'pageview': request.args.get('page'),
+            'interaction': request.args.get('event_type'),
+            'conversion': request.args.get('conversion_type')
+        }
+        try:
+            funnel = funnel_engine.funnel(request.args.get('window', '24h'), request.args.get('by', 'session'), filters)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify(funnel)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@analytics_bp.route('/dashboard/attribution', methods=['GET'])
+def get_attribution():
+    """First-touch and last-touch conversions per campaign, e.g. ?window=30d&by=user"""
+    try:
+        try:
+            attribution = funnel_engine.attribution(request.args.get('window', '30d'), request.args.get('by', 'user'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify(attribution)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @analytics_bp.route('/dashboard/chatbot', methods=['GET'])
 def get_chatbot_analytics():
     try:
@@ -172,21 +580,54 @@ def get_chatbot_analytics():
 @analytics_bp.route('/dashboard/performance', methods=['GET'])
 def get_performance_metrics():
     try:
-        # Mock performance metrics
+        window = request.args.get('window', '24h')
+        if window not in ROLLUP_WINDOWS:
+            return jsonify({'error': f"window must be one of {', '.join(ROLLUP_WINDOWS)}"}), 400
+        
+        # Percentiles come from merged DDSketches (1% relative accuracy), never from sorting samples
+        latency = latency_rollups.summary(window)
+        page_load = latency.get('page_load', {})
+        api = latency.get('api', {})
+        
+        def rounded(value, scale=1.0, digits=0):
+            return round(value * scale, digits) if value is not None else None
+        
+        error_rate = api.get('error_rate')
+        previous_error_rate = api.get('previous_error_rate')
+        error_trend = None
+        if error_rate is not None and previous_error_rate is not None:
+            error_trend = ('decreasing' if error_rate < previous_error_rate
+                           else 'increasing' if error_rate > previous_error_rate else 'stable')
+        
         performance_data = {
+            'window': window,
             'page_load_time': {
-                'avg': round(random.uniform(1.2, 2.1), 2),
-                'p95': round(random.uniform(2.5, 3.8), 2),
-                'trend': 'improving'
+                # Seconds; client events report milliseconds
+                'avg': rounded(page_load.get('avg'), 0.001, 2),
+                'p50': rounded(page_load.get('p50'), 0.001, 2),
+                'p95': rounded(page_load.get('p95'), 0.001, 2),
+                'p99': rounded(page_load.get('p99'), 0.001, 2),
+                'samples': page_load.get('count', 0),
+                'trend': page_load.get('trend'),
+                'slowest_pages_ms': page_load.get('series', {})
             },
             'api_response_time': {
-                'avg': round(random.uniform(150, 300), 0),
-                'p95': round(random.uniform(400, 600), 0),
-                'trend': 'stable'
+                # Milliseconds
+                'avg': rounded(api.get('avg'), 1.0, 1),
+                'p50': rounded(api.get('p50'), 1.0, 1),
+                'p95': rounded(api.get('p95'), 1.0, 1),
+                'p99': rounded(api.get('p99'), 1.0, 1),
+                'samples': api.get('count', 0),
+                'trend': api.get('trend'),
+                'slowest_endpoints': api.get('series', {})
             },
             'error_rate': {
-                'rate': round(random.uniform(0.1, 0.5), 2),
-                'trend': 'decreasing'
+                'rate': rounded(error_rate, 1.0, 2) if error_rate is not None else 0.0,
+                'trend': error_trend
+            },
+            'client_metrics': {
+                kind: {key: summary[key] for key in ('count', 'avg', 'p50', 'p95', 'p99')}
+                for kind, summary in latency.items() if kind not in ('api', 'page_load')
             },
             'uptime': {
                 'percentage': round(random.uniform(99.5, 99.9), 2),
@@ -206,32 +647,67 @@ def get_performance_metrics():
 
 @analytics_bp.route('/reports/export', methods=['POST'])
 def export_analytics_report():
+    """Queue a background export (csv, ndjson or parquet) of logged events, reusing a current one"""
     try:
-        data = request.get_json()
+        data = request.get_json() or {}
         report_type = data.get('report_type', 'overview')
         date_range = data.get('date_range', '7d')
         format_type = data.get('format', 'json')
         
-        # Mock report generation
-        report_data = {
-            'report_id': f"report_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
-            'type': report_type,
-            'date_range': date_range,
-            'generated_at': datetime.now().isoformat(),
-            'data': {
-                'summary': 'Analytics report generated successfully',
-                'metrics_included': ['page_views', 'user_interactions', 'conversions'],
-                'total_records': random.randint(1000, 5000)
-            }
-        }
+        try:
+            report, reused = report_exporter.request_export(report_type, date_range, format_type)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
+        ready = report['status'] == 'complete'
         return jsonify({
             'status': 'success',
-            'message': 'Report generated successfully',
-            'report': report_data,
-            'download_url': f'/api/reports/download/{report_data["report_id"]}'
-        })
+            'message': 'Report ready' if ready else 'Report export started',
+            'cached': reused,
+            'report': report,
+            'status_url': f"/api/reports/{report['report_id']}",
+            'download_url': f"/api/reports/download/{report['report_id']}"
+        }), 200 if ready else 202
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@analytics_bp.route('/reports/<report_id>', methods=['GET'])
+def get_report_status(report_id):
+    try:
+        report = report_exporter.get_job(report_id)
+        if report is None:
+            return jsonify({'error': 'Report not found'}), 404
+        return jsonify(report)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@analytics_bp.route('/reports/download/<report_id>', methods=['GET'])
+def download_report(report_id):
+    """Stream a finished export from disk; supports Range requests, so downloads can resume"""
+    try:
+        report = report_exporter.get_job(report_id)
+        if report is None:
+            return jsonify({'error': 'Report not found'}), 404
+        if report['status'] == 'failed':
+            return jsonify({'error': f"Report export failed: {report['error']}"}), 500
+        if report['status'] != 'complete':
+            return jsonify({'status': report['status'], 'report': report}), 202
         
+        extension, mimetype = EXPORT_FORMATS[report['format']]
+        return send_file(
+            report_exporter.file_path(report),
+            mimetype=mimetype,
+            as_attachment=True,
+            download_name=f"{report['type']}_{report['date_range']}.{extension}",
+            conditional=True,
+            etag=True,
+            max_age=0
+        )
+        
+    except FileNotFoundError:
+        return jsonify({'error': 'Report file has expired'}), 410
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -244,10 +720,16 @@ def analytics_health_check():
             'service': 'analytics',
             'version': '1.0.0',
             'data_points': {
-                'page_views': len(analytics_data['page_views']),
-                'interactions': len(analytics_data['user_interactions']),
-                'conversions': len(analytics_data['conversion_events'])
-            }
+                'page_views': analytics_data['page_views'].count,
+                'interactions': analytics_data['user_interactions'].count,
+                'conversions': analytics_data['conversion_events'].count
+            },
+            'memory': analytics_data.memory_usage(),
+            'event_log': event_log.get_stats(),
+            'ingest_queue': ingest_queue.get_stats(),
+            'deduplication': event_deduplicator.get_stats(),
+            'sessions': sessionizer.get_stats(),
+            'user_agent_cache': user_agent_info.cache_info()._asdict()
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
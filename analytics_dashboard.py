@@ -4,29 +4,142 @@ AI Marketing Tools - Analytics Dashboard
 Comprehensive dashboard for monitoring platform performance, user engagement, and business metrics.
 """
 
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import plotly.graph_objects as go
-import plotly.express as px
-from plotly.subplots import make_subplots
-import numpy as np
+from __future__ import annotations
+
+import argparse
 from datetime import datetime, timedelta
+import hashlib
 import json
+import os
+import time
 import requests
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from requests.adapters import HTTPAdapter
 from typing import Dict, List, Any
 import warnings
 warnings.filterwarnings('ignore')
 
-# Set style for better visualizations
-plt.style.use('seaborn-v0_8')
-sns.set_palette("husl")
+from dashboard_history import DashboardHistoryStore, parse_timestamp
+from executive_summary import ExecutiveSummaryEngine
+from lazy_imports import LazyModule, lazy_function
+
+# Data and plotting stacks are only imported when a dashboard is actually rendered
+np = LazyModule('numpy')
+go = LazyModule('plotly.graph_objects')
+make_subplots = lazy_function('plotly.subplots', 'make_subplots')
+
+# Multi-tab page for the shared-asset dashboard bundle. plotly.js is loaded once
+# from the assets directory and each tab's figure JSON is fetched on first view
+# (or read from an inline application/json script block when embedded).
+BUNDLE_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>AI Marketing Tools - Analytics Dashboards</title>
+<style>
+  body { margin: 0; font-family: Arial, sans-serif; background: __BACKGROUND__; color: __TEXT__; }
+  nav { display: flex; gap: 4px; padding: 12px 16px 0; border-bottom: 2px solid __PRIMARY__; }
+  nav button { border: none; padding: 10px 18px; cursor: pointer; background: #E8F8F7; color: __TEXT__;
+               font-size: 15px; border-radius: 6px 6px 0 0; }
+  nav button.active { background: __PRIMARY__; color: white; }
+  .tab { display: none; padding: 8px 16px; }
+  .tab.active { display: block; }
+  .status { padding: 24px; color: #7F8C8D; }
+</style>
+<script src="__PLOTLY_SRC__"></script>
+</head>
+<body>
+<nav id="tabs"></nav>
+<main id="panels"></main>
+__INLINE_DATA__
+<script>
+  const dashboards = __DASHBOARDS__;
+  const loaded = {};
+
+  function loadFigure(dashboard) {
+    const inline = document.getElementById('figure-' + dashboard.name);
+    if (inline) {
+      return Promise.resolve(JSON.parse(inline.textContent));
+    }
+    return fetch(dashboard.data_url).then(response => response.json());
+  }
+
+  function showTab(name) {
+    dashboards.forEach(dashboard => {
+      document.getElementById('tab-' + dashboard.name).classList.toggle('active', dashboard.name === name);
+      document.getElementById('panel-' + dashboard.name).classList.toggle('active', dashboard.name === name);
+    });
+    const dashboard = dashboards.find(d => d.name === name);
+    const panel = document.getElementById('panel-' + name);
+    if (!loaded[name]) {
+      loaded[name] = loadFigure(dashboard).then(figure => {
+        panel.innerHTML = '';
+        return Plotly.newPlot(panel, figure.data, figure.layout, {responsive: true});
+      }).catch(error => {
+        panel.innerHTML = '<div class="status">Failed to load dashboard: ' + error + '</div>';
+        delete loaded[name];
+      });
+    } else {
+      Plotly.Plots.resize(panel);
+    }
+  }
+
+  dashboards.forEach(dashboard => {
+    const button = document.createElement('button');
+    button.id = 'tab-' + dashboard.name;
+    button.textContent = dashboard.title;
+    button.onclick = () => showTab(dashboard.name);
+    document.getElementById('tabs').appendChild(button);
+
+    const panel = document.createElement('div');
+    panel.id = 'panel-' + dashboard.name;
+    panel.className = 'tab';
+    panel.innerHTML = '<div class="status">Loading...</div>';
+    document.getElementById('panels').appendChild(panel);
+  });
+  showTab(dashboards[0].name);
+</script>
+</body>
+</html>
+"""
 
 class AIMarketingAnalyticsDashboard:
     """Main analytics dashboard class for AI Marketing Tools platform"""
     
-    def __init__(self, api_base_url: str = "http://localhost:5000/api"):
+    # Dashboard data sources and their API paths
+    DATA_SOURCES = {
+        'overview': '/dashboard/overview',
+        'chatbot': '/dashboard/chatbot',
+        'performance': '/dashboard/performance',
+        'revenue': '/analytics/revenue'
+    }
+    
+    # Dashboard name -> (input data source, builder method, standalone filename, progress label)
+    DASHBOARDS = {
+        'overview': ('overview', 'create_overview_dashboard', 'overview_dashboard.html', '📈 Overview dashboard'),
+        'chatbot': ('chatbot', 'create_chatbot_analytics', 'chatbot_dashboard.html', '🤖 Chatbot analytics'),
+        'revenue': ('revenue', 'create_revenue_dashboard', 'revenue_dashboard.html', '💰 Revenue dashboard')
+    }
+    
+    def __init__(self, api_base_url: str = "http://localhost:5000/api",
+                 output_dir: str = None,
+                 request_timeout: float = 5.0,
+                 fetch_deadline: float = 10.0):
         self.api_base_url = api_base_url
+        self.output_dir = output_dir or '/home/ubuntu/AI_Marketing_Tools_Workspace/analytics-monitoring'
+        self.dashboards_dir = os.path.join(self.output_dir, 'dashboards')
+        self.reports_dir = os.path.join(self.output_dir, 'reports')
+        self.request_timeout = request_timeout
+        self.fetch_deadline = fetch_deadline
+        self.fetch_snapshot_path = os.path.join(self.reports_dir, 'last_fetch_snapshot.json')
+        self.render_manifest_path = os.path.join(self.dashboards_dir, 'render_manifest.json')
+        self.history = DashboardHistoryStore(os.path.join(self.output_dir, 'history'))
+        self.summary_engine = ExecutiveSummaryEngine(self.history, os.path.join(self.reports_dir, 'summary_cache'))
+        self.engagement_trend_days = 7
+        self.arpu_trend_months = 7
+        self.last_fetch_report = {}
+        self._session = None
+        self._last_good_data = None
         self.colors = {
             'primary_teal': '#4ECDC4',
             'secondary_coral': '#FF6B6B',
@@ -35,35 +148,159 @@ class AIMarketingAnalyticsDashboard:
             'text_light': '#7F8C8D'
         }
         
-    def fetch_analytics_data(self) -> Dict[str, Any]:
-        """Fetch analytics data from the backend API"""
+    @property
+    def session(self) -> requests.Session:
+        """Pooled HTTP session shared by all data source requests"""
+        if self._session is None:
+            self._session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=len(self.DATA_SOURCES))
+            self._session.mount('http://', adapter)
+            self._session.mount('https://', adapter)
+        return self._session
+    
+    def _fetch_source(self, source: str, timeout: float = None) -> Dict[str, Any]:
+        """Fetch a single data source, timing the request (timeout defaults to request_timeout)"""
+        start_time = time.perf_counter()
         try:
-            # Fetch overview data
-            overview_response = requests.get(f"{self.api_base_url}/dashboard/overview")
-            overview_data = overview_response.json() if overview_response.status_code == 200 else {}
-            
-            # Fetch chatbot analytics
-            chatbot_response = requests.get(f"{self.api_base_url}/dashboard/chatbot")
-            chatbot_data = chatbot_response.json() if chatbot_response.status_code == 200 else {}
+            response = self.session.get(f"{self.api_base_url}{self.DATA_SOURCES[source]}",
+                                        timeout=self.request_timeout if timeout is None else timeout)
+            latency_ms = (time.perf_counter() - start_time) * 1000
             
-            # Fetch performance metrics
-            performance_response = requests.get(f"{self.api_base_url}/dashboard/performance")
-            performance_data = performance_response.json() if performance_response.status_code == 200 else {}
+            if response.status_code != 200:
+                return {'status': 'failed', 'latency_ms': latency_ms, 'error': f"HTTP {response.status_code}"}
             
-            # Fetch revenue analytics
-            revenue_response = requests.get(f"{self.api_base_url}/analytics/revenue")
-            revenue_data = revenue_response.json() if revenue_response.status_code == 200 else {}
-            
-            return {
-                'overview': overview_data,
-                'chatbot': chatbot_data,
-                'performance': performance_data,
-                'revenue': revenue_data
-            }
+            return {'status': 'ok', 'latency_ms': latency_ms, 'data': response.json()}
             
         except Exception as e:
-            print(f"Error fetching data: {e}")
-            return self.generate_mock_data()
+            return {'status': 'failed', 'latency_ms': (time.perf_counter() - start_time) * 1000, 'error': str(e)}
+    
+    def load_fetch_snapshot(self) -> Dict[str, Any]:
+        """Last successfully fetched payload per source (in memory, then on disk)"""
+        if self._last_good_data is None:
+            self._last_good_data = {}
+            if os.path.exists(self.fetch_snapshot_path):
+                try:
+                    with open(self.fetch_snapshot_path, 'r') as f:
+                        self._last_good_data = json.load(f)
+                except Exception as e:
+                    print(f"Error loading fetch snapshot: {e}")
+        return self._last_good_data
+    
+    def save_fetch_snapshot(self, fetched: Dict[str, Any]):
+        """Remember freshly fetched sources for later fallbacks"""
+        snapshot = self.load_fetch_snapshot()
+        snapshot.update(fetched)
+        try:
+            os.makedirs(os.path.dirname(self.fetch_snapshot_path), exist_ok=True)
+            tmp_path = self.fetch_snapshot_path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self.fetch_snapshot_path)
+        except Exception as e:
+            print(f"Error saving fetch snapshot: {e}")
+    
+    def fetch_analytics_data(self, concurrent: bool = True) -> Dict[str, Any]:
+        """Fetch analytics data from the backend API
+        
+        Sources are fetched concurrently over a pooled session with a
+        per-request timeout and an overall deadline. Only the sources that
+        fail fall back to the last good snapshot, or to mock data.
+        """
+        deadline = time.perf_counter() + self.fetch_deadline
+        results = {}
+        
+        if concurrent:
+            executor = ThreadPoolExecutor(max_workers=len(self.DATA_SOURCES))
+            futures = {executor.submit(self._fetch_source, source): source for source in self.DATA_SOURCES}
+            done, _ = wait(futures, timeout=self.fetch_deadline)
+            for future, source in futures.items():
+                if future in done:
+                    results[source] = future.result()
+                else:
+                    results[source] = {'status': 'timeout', 'latency_ms': self.fetch_deadline * 1000,
+                                       'error': 'Total fetch deadline exceeded'}
+            executor.shutdown(wait=False, cancel_futures=True)
+        else:
+            for source in self.DATA_SOURCES:
+                # Each request only gets what is left of the overall deadline
+                remaining = max(0.0, deadline - time.perf_counter())
+                if not remaining:
+                    results[source] = {'status': 'timeout', 'latency_ms': 0.0,
+                                       'error': 'Total fetch deadline exceeded'}
+                    continue
+                results[source] = self._fetch_source(source, min(self.request_timeout, remaining))
+        
+        fetched = {source: result['data'] for source, result in results.items() if result['status'] == 'ok'}
+        if fetched:
+            self.save_fetch_snapshot(fetched)
+            try:
+                self.history.append(fetched)
+            except Exception as e:
+                print(f"Error appending to dashboard history: {e}")
+        
+        data = dict(fetched)
+        snapshot = self.load_fetch_snapshot()
+        mock_data = None
+        for source, result in results.items():
+            result.pop('data', None)
+            result['fallback'] = None
+            if source in data:
+                continue
+            if source in snapshot:
+                data[source] = snapshot[source]
+                result['fallback'] = 'snapshot'
+            else:
+                mock_data = mock_data or self.generate_mock_data()
+                data[source] = mock_data[source]
+                result['fallback'] = 'mock'
+        
+        self.last_fetch_report = results
+        for source, result in results.items():
+            fallback = f" → {result['fallback']}" if result['fallback'] else ""
+            error = f" ({result['error']})" if result.get('error') else ""
+            print(f"  • {source}: {result['status']} in {result['latency_ms']:.0f}ms{fallback}{error}")
+        
+        return self.add_history_trends(data)
+    
+    def load_analytics_data_at(self, when: Any) -> Dict[str, Any]:
+        """Rebuild the dashboard input as it was at a past moment, from history only"""
+        when = parse_timestamp(when)
+        stored = self.history.as_of(when, self.DATA_SOURCES)
+        data = dict(stored['data'])
+        
+        results = {}
+        mock_data = None
+        for source in self.DATA_SOURCES:
+            if source in data:
+                results[source] = {'status': 'history', 'stored_at': stored['timestamps'][source], 'fallback': None}
+            else:
+                mock_data = mock_data or self.generate_mock_data()
+                data[source] = mock_data[source]
+                results[source] = {'status': 'missing', 'stored_at': None, 'fallback': 'mock'}
+        
+        self.last_fetch_report = results
+        for source, result in results.items():
+            detail = f"stored {result['stored_at']}" if result['stored_at'] else "no history → mock"
+            print(f"  • {source}: {detail}")
+        
+        return self.add_history_trends(data, when)
+    
+    def add_history_trends(self, data: Dict[str, Any], as_of: Any = None) -> Dict[str, Any]:
+        """Attach trend series read from the history store to the overview and revenue inputs"""
+        as_of = parse_timestamp(as_of)
+        try:
+            engagement = self.history.series('overview', 'active_users_24h',
+                                             as_of - timedelta(days=self.engagement_trend_days - 1), as_of, 'day')
+            arpu = self.history.series('revenue', 'average_revenue_per_user',
+                                       as_of - timedelta(days=31 * self.arpu_trend_months), as_of, 'month')
+        except Exception as e:
+            print(f"Error reading dashboard history: {e}")
+            engagement, arpu = [], []
+        
+        data = dict(data)
+        data['overview'] = dict(data['overview'], engagement_history=engagement)
+        data['revenue'] = dict(data['revenue'], arpu_history=arpu[-self.arpu_trend_months:])
+        return data
     
     def generate_mock_data(self) -> Dict[str, Any]:
         """Generate mock data for demonstration purposes"""
@@ -194,9 +431,12 @@ class AIMarketingAnalyticsDashboard:
             row=2, col=1
         )
         
-        # User Engagement Over Time (Mock time series)
-        dates = pd.date_range(start='2025-01-20', end='2025-01-27', freq='D')
-        engagement = np.random.randint(150, 250, len(dates))
+        # User Engagement Over Time (daily active users from the dashboard history)
+        history = overview.get('engagement_history') or [
+            {'period': datetime.now().strftime('%Y-%m-%d'), 'value': overview['active_users_24h']}
+        ]
+        dates = [point['period'] for point in history]
+        engagement = [point['value'] for point in history]
         
         fig.add_trace(
             go.Scatter(
@@ -424,9 +664,12 @@ class AIMarketingAnalyticsDashboard:
             row=2, col=2
         )
         
-        # ARPU Trend (mock data)
-        arpu_months = months
-        arpu_values = [revenue['average_revenue_per_user'] + np.random.randint(-5, 8) for _ in months]
+        # ARPU Trend (month-end values from the dashboard history)
+        history = revenue.get('arpu_history') or [
+            {'period': datetime.now().strftime('%Y-%m'), 'value': revenue['average_revenue_per_user']}
+        ]
+        arpu_months = [point['period'] for point in history]
+        arpu_values = [point['value'] for point in history]
         
         fig.add_trace(
             go.Scatter(
@@ -452,87 +695,343 @@ class AIMarketingAnalyticsDashboard:
         
         return fig
     
-    def generate_executive_summary(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        """Generate executive summary with key insights"""
-        overview = data['overview']
-        chatbot = data['chatbot']
-        revenue = data['revenue']
-        performance = data['performance']
-        
-        summary = {
-            'timestamp': datetime.now().isoformat(),
-            'key_metrics': {
-                'total_users': overview['total_users'],
-                'daily_active_users': overview['active_users_24h'],
-                'conversion_rate': overview['conversion_rate'],
-                'monthly_recurring_revenue': revenue['monthly_recurring_revenue'],
-                'churn_rate': revenue['churn_rate'],
-                'user_satisfaction': chatbot['user_satisfaction']
-            },
-            'insights': [
-                f"Platform has {overview['total_users']:,} total users with {overview['conversion_rate']}% conversion rate",
-                f"Chatbot handled {chatbot['conversations_24h']} conversations today with {chatbot['user_satisfaction']}/5 satisfaction",
-                f"MRR is ${revenue['monthly_recurring_revenue']:,} with {revenue['churn_rate']}% monthly churn",
-                f"System uptime is {performance['uptime']['percentage']}% with {performance['api_response_time']['avg']}ms avg response time"
-            ],
-            'recommendations': [
-                "Focus on converting free tier users to paid plans",
-                "Improve chatbot training for better satisfaction scores",
-                "Implement retention campaigns to reduce churn",
-                "Optimize API performance for better user experience"
-            ],
-            'alerts': [
-                f"Churn rate at {revenue['churn_rate']}% - monitor closely",
-                f"API response time trending {performance['api_response_time']['trend']}",
-                f"Conversion rate below target at {overview['conversion_rate']}%"
-            ]
-        }
-        
-        return summary
+    def generate_executive_summary(self, period: str = 'week', as_of: Any = None) -> Dict[str, Any]:
+        """Generate executive summary with key insights from the stored history (cached per period)"""
+        return self.summary_engine.get_summary(period, as_of)
     
-    def save_dashboard_html(self, fig: go.Figure, filename: str):
+    def save_dashboard_html(self, fig: go.Figure, filename: str) -> int:
         """Save dashboard as HTML file"""
-        fig.write_html(f"/home/ubuntu/AI_Marketing_Tools_Workspace/analytics-monitoring/dashboards/{filename}")
+        size = self._write_file(os.path.join(self.dashboards_dir, filename), fig.to_html())
         print(f"Dashboard saved as {filename}")
+        return size
     
-    def run_full_analytics_suite(self):
-        """Run complete analytics suite and generate all dashboards"""
-        print("🚀 Starting AI Marketing Tools Analytics Suite...")
+    def _write_file(self, path: str, content: str) -> int:
+        """Write a text file atomically and return its size in bytes"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+        return os.path.getsize(path)
+    
+    def save_dashboard_figure_json(self, name: str, fig: go.Figure) -> Dict[str, Any]:
+        """Write one figure's JSON for the bundle page and return its tab entry"""
+        data_url = f"data/{name}.json"
+        data_path = os.path.join(self.dashboards_dir, data_url)
+        return {
+            'name': name,
+            'title': fig.layout.title.text or name.replace('_', ' ').title(),
+            'data_url': data_url,
+            'files': {data_path: self._write_file(data_path, fig.to_json())}
+        }
+    
+    def plotly_asset_path(self) -> str:
+        """Versioned shared plotly.js asset of the bundle page (rewritten only on upgrade)"""
+        import plotly
+        return os.path.join(self.dashboards_dir, 'assets', f"plotly-{plotly.__version__}.min.js")
+    
+    def write_bundle_page(self, dashboards: List[Dict[str, Any]],
+                          filename: str = "analytics_dashboard.html",
+                          inline_data: bool = False) -> Dict[str, int]:
+        """Write the multi-tab bundle page, plus the shared plotly.js asset if missing
         
-        # Fetch data
+        Each tab's figure JSON (dashboards/data/<name>.json) is fetched when
+        the tab is first opened, which needs the page to be served over HTTP.
+        With inline_data the JSON is embedded in the page instead, so it also
+        works when the file is opened straight from disk.
+        """
+        from plotly.offline import get_plotlyjs
+        
+        files = {}
+        plotly_js_path = self.plotly_asset_path()
+        if not os.path.exists(plotly_js_path):
+            files[plotly_js_path] = self._write_file(plotly_js_path, get_plotlyjs())
+        
+        inline_blocks = []
+        if inline_data:
+            for dashboard in dashboards:
+                with open(os.path.join(self.dashboards_dir, dashboard['data_url']), 'r', encoding='utf-8') as f:
+                    # Escape '</' so figure text can never close the script tag early
+                    escaped_json = f.read().replace('</', '<\\/')
+                inline_blocks.append(
+                    f'<script type="application/json" id="figure-{dashboard["name"]}">{escaped_json}</script>')
+        
+        tabs = [{key: dashboard[key] for key in ('name', 'title', 'data_url')} for dashboard in dashboards]
+        page = (BUNDLE_TEMPLATE
+                .replace('__BACKGROUND__', self.colors['background'])
+                .replace('__TEXT__', self.colors['text_dark'])
+                .replace('__PRIMARY__', self.colors['primary_teal'])
+                .replace('__PLOTLY_SRC__', f"assets/{os.path.basename(plotly_js_path)}")
+                .replace('__INLINE_DATA__', '\n'.join(inline_blocks))
+                .replace('__DASHBOARDS__', json.dumps(tabs)))
+        bundle_path = os.path.join(self.dashboards_dir, filename)
+        files[bundle_path] = self._write_file(bundle_path, page)
+        return files
+    
+    @staticmethod
+    def hash_dashboard_input(payload: Any) -> str:
+        """Stable content hash of a dashboard's input slice"""
+        canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+    
+    def load_render_manifest(self) -> Dict[str, Any]:
+        """Load the render manifest describing what each dashboard was last built from"""
+        if os.path.exists(self.render_manifest_path):
+            try:
+                with open(self.render_manifest_path, 'r') as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"Error loading render manifest: {e}")
+        return {'dashboards': {}}
+    
+    def save_render_manifest(self, manifest: Dict[str, Any]):
+        """Atomically persist the render manifest"""
+        manifest['updated_at'] = datetime.now().isoformat()
+        self._write_file(self.render_manifest_path, json.dumps(manifest, indent=2))
+    
+    def render_settings(self) -> Dict[str, Any]:
+        """Picklable settings needed to recreate this dashboard in a worker process"""
+        return {
+            'api_base_url': self.api_base_url,
+            'output_dir': self.output_dir,
+            'dashboards_dir': self.dashboards_dir,
+            'colors': dict(self.colors)
+        }
+    
+    def render_dashboard(self, name: str, data: Dict[str, Any], output_mode: str) -> Dict[str, Any]:
+        """Build one dashboard figure and write it, timing each step"""
+        source, builder, filename, label = self.DASHBOARDS[name]
+        print(f"{label}: building...")
+        
+        build_start = time.perf_counter()
+        fig = getattr(self, builder)(data)
+        build_seconds = time.perf_counter() - build_start
+        
+        write_start = time.perf_counter()
+        if output_mode == 'bundle':
+            dashboard = self.save_dashboard_figure_json(name, fig)
+            written = dashboard['files']
+            title = dashboard['title']
+        else:
+            path = os.path.join(self.dashboards_dir, filename)
+            written = {path: self.save_dashboard_html(fig, filename)}
+            title = fig.layout.title.text
+        
+        return {
+            'title': title,
+            'files': written,
+            'build_seconds': build_seconds,
+            'write_seconds': time.perf_counter() - write_start,
+            'pid': os.getpid()
+        }
+    
+    def render_dashboards(self, data: Dict[str, Any], output_mode: str = 'standalone',
+                          force: bool = False, workers: int = None, inline_data: bool = False) -> Dict[str, Any]:
+        """Build and write every dashboard whose input slice changed since the last render
+        
+        Changed dashboards are built in a process pool (one process per
+        dashboard up to the CPU count) unless workers is 1. In bundle mode
+        inline_data embeds the figure JSON in the page (see write_bundle_page).
+        """
+        start_time = time.perf_counter()
+        manifest = self.load_render_manifest()
+        files = {}
+        rendered, skipped = [], []
+        
+        pending = {}
+        
+        for name, (source, builder, filename, label) in self.DASHBOARDS.items():
+            input_hash = self.hash_dashboard_input(data[source])
+            entry = manifest['dashboards'].get(name)
+            
+            if (not force and entry
+                    and entry['input_hash'] == input_hash
+                    and entry['output_mode'] == output_mode
+                    and all(os.path.exists(path) for path in entry['files'])):
+                print(f"⏭️  {label} unchanged, reusing {', '.join(os.path.basename(p) for p in entry['files'])}")
+                skipped.append(name)
+                continue
+            
+            pending[name] = input_hash
+        
+        if workers is None:
+            workers = min(len(pending), os.cpu_count() or 1)
+        
+        if workers > 1 and len(pending) > 1:
+            # Figure building and HTML/JSON serialization are CPU-bound, so use processes
+            print(f"⚙️  Rendering {len(pending)} dashboards in {workers} processes...")
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    name: executor.submit(_render_dashboard_worker, self.render_settings(), name,
+                                          data[self.DASHBOARDS[name][0]], output_mode)
+                    for name in pending
+                }
+                results = {name: future.result() for name, future in futures.items()}
+        else:
+            results = {name: self.render_dashboard(name, data, output_mode) for name in pending}
+        
+        # Manifest entries are applied in registry order so the output is deterministic
+        for name in self.DASHBOARDS:
+            if name not in results:
+                continue
+            result = results[name]
+            files.update(result['files'])
+            rendered.append(name)
+            manifest['dashboards'][name] = {
+                'input_hash': pending[name],
+                'output_mode': output_mode,
+                'title': result['title'],
+                'files': list(result['files']),
+                'bytes': sum(result['files'].values()),
+                'rendered_at': datetime.now().isoformat(),
+                'build_seconds': result['build_seconds'],
+                'write_seconds': result['write_seconds'],
+                'pid': result['pid']
+            }
+        
+        bundle_changed = False
+        if output_mode == 'bundle':
+            bundle_path = os.path.join(self.dashboards_dir, 'analytics_dashboard.html')
+            bundle_changed = manifest.get('bundle_inline_data') != inline_data
+            if (rendered or bundle_changed or not os.path.exists(bundle_path)
+                    or not os.path.exists(self.plotly_asset_path())):
+                dashboards = [
+                    {'name': name, 'title': manifest['dashboards'][name]['title'], 'data_url': f"data/{name}.json"}
+                    for name in self.DASHBOARDS
+                ]
+                files.update(self.write_bundle_page(dashboards, inline_data=inline_data))
+                manifest['bundle_inline_data'] = inline_data
+        
+        if rendered or bundle_changed:
+            self.save_render_manifest(manifest)
+        
+        return {
+            'mode': output_mode,
+            'rendered': rendered,
+            'skipped': skipped,
+            'manifest': manifest['dashboards'],
+            'files': files,
+            'bytes_written': sum(files.values()),
+            'write_seconds': time.perf_counter() - start_time
+        }
+    
+    def save_executive_summary(self, summary: Dict[str, Any], filename: str = 'executive_summary.json') -> str:
+        """Write the executive summary JSON report"""
+        summary_path = os.path.join(self.reports_dir, filename)
+        self._write_file(summary_path, json.dumps(summary, indent=2, default=str))
+        return summary_path
+    
+    def run_executive_summary(self, period: str = 'week') -> Dict[str, Any]:
+        """Fetch data and write only the executive summary, without rendering any dashboard"""
         print("📊 Fetching analytics data...")
-        data = self.fetch_analytics_data()
+        self.fetch_analytics_data()
         
-        # Generate dashboards
-        print("📈 Creating overview dashboard...")
-        overview_fig = self.create_overview_dashboard(data)
-        self.save_dashboard_html(overview_fig, "overview_dashboard.html")
+        summary = dict(self.generate_executive_summary(period))
+        summary['data_sources'] = self.last_fetch_report
+        summary_path = self.save_executive_summary(summary)
+        print(f"📊 Executive summary: {summary_path}")
+        
+        return summary
+    
+    def run_full_analytics_suite(self, output_mode: str = 'standalone', force: bool = False,
+                                 workers: int = None, as_of: Any = None, inline_data: bool = False):
+        """Run complete analytics suite and generate all dashboards
+        
+        output_mode 'standalone' writes one self-contained HTML file per
+        dashboard; 'bundle' writes a single multi-tab page that shares one
+        plotly.js asset (see write_bundle_page; inline_data embeds the figure
+        JSON so the page opens from disk). Dashboards whose input
+        data hashes the same as in the render manifest are not rebuilt
+        unless force is set.
+        
+        With as_of the dashboards are rebuilt from the history store as they
+        were at that moment, without calling the API, and written to
+        dashboards/as_of/<timestamp>/.
+        """
+        if output_mode not in ('standalone', 'bundle'):
+            raise ValueError(f"Unknown output mode: {output_mode}")
+        
+        print("🚀 Starting AI Marketing Tools Analytics Suite...")
         
-        print("🤖 Creating chatbot analytics...")
-        chatbot_fig = self.create_chatbot_analytics(data)
-        self.save_dashboard_html(chatbot_fig, "chatbot_dashboard.html")
+        summary_filename = 'executive_summary.json'
+        self.dashboards_dir = os.path.join(self.output_dir, 'dashboards')
+        if as_of is not None:
+            as_of = parse_timestamp(as_of)
+            stamp = as_of.strftime('%Y%m%d_%H%M%S')
+            self.dashboards_dir = os.path.join(self.dashboards_dir, 'as_of', stamp)
+            summary_filename = f'executive_summary_as_of_{stamp}.json'
+        self.render_manifest_path = os.path.join(self.dashboards_dir, 'render_manifest.json')
         
-        print("💰 Creating revenue dashboard...")
-        revenue_fig = self.create_revenue_dashboard(data)
-        self.save_dashboard_html(revenue_fig, "revenue_dashboard.html")
+        if as_of is not None:
+            print(f"🕰️  Loading analytics data as of {as_of.isoformat()} from history...")
+            data = self.load_analytics_data_at(as_of)
+        else:
+            # Fetch data
+            print("📊 Fetching analytics data...")
+            data = self.fetch_analytics_data()
+        
+        # Generate dashboards
+        output_stats = self.render_dashboards(data, output_mode, force, workers, inline_data)
+        print(f"💾 Rendered {len(output_stats['rendered'])}, skipped {len(output_stats['skipped'])}; "
+              f"wrote {output_stats['bytes_written'] / (1024 * 1024):.2f} MB "
+              f"in {output_stats['write_seconds']:.2f}s ({output_mode} mode)")
         
         # Generate executive summary
         print("📋 Generating executive summary...")
-        summary = self.generate_executive_summary(data)
+        summary = dict(self.generate_executive_summary('week', as_of))
+        summary['data_sources'] = self.last_fetch_report
+        summary['dashboard_output'] = {
+            'mode': output_mode,
+            'rendered': output_stats['rendered'],
+            'skipped': output_stats['skipped'],
+            'timings': {
+                name: {key: output_stats['manifest'][name][key] for key in ('build_seconds', 'write_seconds')}
+                for name in output_stats['rendered']
+            },
+            'bytes_written': output_stats['bytes_written'],
+            'write_seconds': output_stats['write_seconds']
+        }
         
-        with open('/home/ubuntu/AI_Marketing_Tools_Workspace/analytics-monitoring/reports/executive_summary.json', 'w') as f:
-            json.dump(summary, f, indent=2)
+        summary_path = self.save_executive_summary(summary, summary_filename)
         
         print("✅ Analytics suite completed successfully!")
-        print(f"📁 Dashboards saved to: /home/ubuntu/AI_Marketing_Tools_Workspace/analytics-monitoring/dashboards/")
-        print(f"📊 Executive summary: /home/ubuntu/AI_Marketing_Tools_Workspace/analytics-monitoring/reports/executive_summary.json")
+        print(f"📁 Dashboards saved to: {self.dashboards_dir}/")
+        print(f"📊 Executive summary: {summary_path}")
         
         return data, summary
 
+def _render_dashboard_worker(settings: Dict[str, Any], name: str,
+                             source_data: Dict[str, Any], output_mode: str) -> Dict[str, Any]:
+    """Process pool entry point: rebuild a dashboard instance and render one figure"""
+    dashboard = AIMarketingAnalyticsDashboard(settings['api_base_url'], output_dir=settings['output_dir'])
+    dashboard.dashboards_dir = settings['dashboards_dir']
+    dashboard.colors = settings['colors']
+    source = dashboard.DASHBOARDS[name][0]
+    return dashboard.render_dashboard(name, {source: source_data}, output_mode)
+
 def main():
     """Main function to run analytics dashboard"""
-    dashboard = AIMarketingAnalyticsDashboard()
-    data, summary = dashboard.run_full_analytics_suite()
+    parser = argparse.ArgumentParser(description='Generate AI Marketing Tools analytics dashboards')
+    parser.add_argument('--api-base-url', default="http://localhost:5000/api")
+    parser.add_argument('--output-dir', default=None)
+    parser.add_argument('--summary-only', action='store_true',
+                        help='only write the executive summary JSON (no plotting libraries are loaded)')
+    parser.add_argument('--output-mode', choices=['standalone', 'bundle'], default='standalone')
+    parser.add_argument('--inline-data', action='store_true',
+                        help='bundle mode: embed figure JSON in the page so it opens from disk (file://)')
+    parser.add_argument('--force', action='store_true', help='rebuild dashboards even if their data is unchanged')
+    parser.add_argument('--workers', type=int, default=None, help='processes used to render dashboards')
+    parser.add_argument('--summary-period', choices=['day', 'week'], default='week')
+    parser.add_argument('--as-of', default=None,
+                        help='render dashboards from stored history at this ISO timestamp (no API calls)')
+    args = parser.parse_args()
+    
+    dashboard = AIMarketingAnalyticsDashboard(args.api_base_url, output_dir=args.output_dir)
+    if args.summary_only:
+        summary = dashboard.run_executive_summary(args.summary_period)
+    else:
+        data, summary = dashboard.run_full_analytics_suite(args.output_mode, args.force, args.workers, args.as_of,
+                                                           args.inline_data)
     
     # Print key insights
     print("\n🔍 KEY INSIGHTS:")
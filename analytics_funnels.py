@@ -0,0 +1,313 @@
+"""
+AI Marketing Tools - Funnel & Attribution Queries
+Ordered funnels (pageview -> interaction -> conversion) and first/last-touch
+campaign attribution over the in-memory columnar event rings, computed with
+sorted-array joins on dictionary codes and cached per window.
+"""
+
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from analytics_rollups import ROLLUP_WINDOWS
+from analytics_store import AnalyticsEventStore, StringDictionary, from_epoch_us
+
+# Join keys: which column identifies a journey
+JOURNEY_KEYS = {'session': 'session_id', 'user': 'user_id'}
+
+# Funnel steps: (name, event store, column an optional filter applies to)
+FUNNEL_STEPS = [
+    ('pageview', 'page_views', 'page'),
+    ('interaction', 'user_interactions', 'event_type'),
+    ('conversion', 'conversion_events', 'conversion_type')
+]
+
+# Seconds a cached result is served for while no new events arrive
+QUERY_CACHE_SECONDS = 60
+MAX_CACHED_QUERIES = 256
+
+# Registered join keys (or campaigns) before the shared code spaces are rebuilt from scratch
+MAX_REGISTERED_KEYS = 2_000_000
+
+NO_CAMPAIGN = '(none)'
+
+
+@lru_cache(maxsize=4096)
+def utm_campaign(url: str) -> Optional[str]:
+    """utm_campaign query parameter of a page or referrer URL, if any"""
+    if not url or 'utm_campaign=' not in url:
+        return None
+    values = parse_qs(urlparse(url).query).get('utm_campaign')
+    return values[0] if values else None
+
+
+def first_per_key(keys: np.ndarray, times: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(distinct keys, earliest time of each) from unsorted parallel arrays"""
+    if not len(keys):
+        return keys, times
+    order = np.lexsort((times, keys))
+    keys, times = keys[order], times[order]
+    first = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    return keys[first], times[first]
+
+
+def lookup(sorted_keys: np.ndarray, keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(index into sorted_keys, found mask) for each key"""
+    index = np.searchsorted(sorted_keys, keys)
+    index = np.minimum(index, max(len(sorted_keys) - 1, 0))
+    found = sorted_keys[index] == keys if len(sorted_keys) else np.zeros(len(keys), dtype=bool)
+    return index, found
+
+
+class FunnelEngine:
+    """Funnel and attribution queries over an AnalyticsEventStore
+
+    Each event type's columns have their own string dictionaries, so join
+    keys (session or user ids) are translated into one shared code space
+    through per-column mapping arrays that only grow by the values added
+    since the last query. Joins then sort (key, time) arrays and match them
+    with searchsorted. Queries only see events still in the memory rings;
+    results report the oldest timestamp covered.
+    """
+
+    def __init__(self, store: AnalyticsEventStore, cache_seconds: float = QUERY_CACHE_SECONDS):
+        self.store = store
+        self.cache_seconds = cache_seconds
+        self._registry: Dict[Any, int] = {}
+        self._campaigns = StringDictionary()
+        # (event store, column, kind) -> (dictionary value list, mapping array)
+        self._mappings: Dict[Tuple[str, str, str], Tuple[List[Any], np.ndarray]] = {}
+        self._cache: Dict[Tuple[Any, ...], Tuple[float, Tuple[int, ...], Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def _data_version(self) -> Tuple[int, ...]:
+        return tuple(self.store[storage].count for _, storage, _ in FUNNEL_STEPS)
+
+    def _mapping(self, storage: str, column: str, kind: str) -> np.ndarray:
+        """Array mapping the column's dictionary codes to shared codes
+
+        kind 'key' registers join keys; 'campaign' maps campaign names and
+        'utm' the utm_campaign of URLs into the campaign dictionary (-1 = none).
+        """
+        values = self.store[storage].dictionaries[column].values
+        cached = self._mappings.get((storage, column, kind))
+        if cached is not None and cached[0] is values:
+            mapping = cached[1]
+        else:
+            # New or compacted dictionary: map it from the start
+            mapping = np.empty(0, dtype=np.int64)
+
+        if len(mapping) < len(values):
+            new_values = values[len(mapping):]
+            if kind == 'key':
+                registry = self._registry
+                codes = [registry.setdefault(value, len(registry)) for value in new_values]
+            elif kind == 'utm':
+                codes = [self._campaigns.encode(utm_campaign(value)) for value in new_values]
+            else:
+                codes = [self._campaigns.encode(value or None) for value in new_values]
+            mapping = np.concatenate([mapping, np.array(codes, dtype=np.int64)])
+        self._mappings[(storage, column, kind)] = (values, mapping)
+        return mapping
+
+    def _translate(self, storage: str, column: str, codes: np.ndarray, kind: str = 'key') -> np.ndarray:
+        mapping = self._mapping(storage, column, kind)
+        return np.where(codes >= 0, mapping[np.maximum(codes, 0)], -1)
+
+    def _rows(self, storage: str, key_column: str, start_us: int, end_us: int,
+              filters: Dict[str, str] = None, extra: Tuple[str, ...] = (),
+              translated: Dict[str, str] = None) -> Dict[str, np.ndarray]:
+        """Shared join keys, timestamps and extra columns of rows in [start, end) with a join key
+
+        extra columns are returned raw; translated maps columns to the _mapping
+        kind their codes are translated with. Codes are only meaningful for the
+        dictionary they were read with (eviction may compact it), so all
+        translation happens under the store lock.
+        """
+        store = self.store[storage]
+        with store._lock:
+            positions = store.live_positions()
+            timestamps = store.columns['timestamp'][positions]
+            mask = (timestamps >= start_us) & (timestamps < end_us)
+            for column, value in (filters or {}).items():
+                code = store.dictionaries[column].codes.get(value, -2)
+                mask &= store.columns[column][positions] == code
+            positions = positions[mask]
+
+            keys = self._translate(storage, key_column, store.columns[key_column][positions])
+            rows = {'key': keys, 'time': timestamps[mask]}
+            for column in extra:
+                rows[column] = store.columns[column][positions]
+            for column, kind in (translated or {}).items():
+                rows[column] = self._translate(storage, column, store.columns[column][positions], kind)
+            oldest = int(store.columns['timestamp'][store.live_positions()[0]]) if store.size else None
+
+        valid = keys >= 0
+        rows = {column: values[valid] for column, values in rows.items()}
+        rows['oldest'] = oldest
+        return rows
+
+    def _cached(self, cache_key: Tuple[Any, ...], compute) -> Dict[str, Any]:
+        version = self._data_version()
+        now = time.time()
+        with self._lock:
+            cached = self._cache.get(cache_key)
+            if cached is not None and cached[1] == version and now - cached[0] < self.cache_seconds:
+                return {**cached[2], 'cached': True}
+            result = compute(now)
+            if len(self._cache) >= MAX_CACHED_QUERIES:
+                self._cache.clear()
+            self._cache[cache_key] = (now, version, result)
+            if len(self._registry) > MAX_REGISTERED_KEYS or len(self._campaigns) > MAX_REGISTERED_KEYS:
+                self._registry.clear()
+                self._campaigns = StringDictionary()
+                self._mappings.clear()
+        return {**result, 'cached': False}
+
+    @staticmethod
+    def _window_bounds(window: str, now: float) -> Tuple[int, int]:
+        if window not in ROLLUP_WINDOWS:
+            raise ValueError(f"window must be one of {', '.join(ROLLUP_WINDOWS)}")
+        end_us = int(now * 1_000_000) + 1
+        return end_us - ROLLUP_WINDOWS[window] * 1_000_000, end_us
+
+    @staticmethod
+    def _coverage(window_start_us: int, oldest: List[Optional[int]]) -> str:
+        """Earliest time from which the rings hold every queried event type (the window start if all do)"""
+        return from_epoch_us(max([window_start_us] + [value for value in oldest if value is not None]))
+
+    def funnel(self, window: str = '24h', by: str = 'session', filters: Dict[str, str] = None) -> Dict[str, Any]:
+        """Journeys reaching each step in order within the window
+
+        A journey (session or user) enters at its first matching pageview;
+        each later step counts at its first matching event at or after the
+        time the previous step was reached. filters maps step name ->
+        value of that step's filter column (page, event_type, conversion_type).
+        """
+        if by not in JOURNEY_KEYS:
+            raise ValueError(f"by must be one of {', '.join(JOURNEY_KEYS)}")
+        filters = {name: value for name, value in (filters or {}).items() if value}
+        cache_key = ('funnel', window, by, tuple(sorted(filters.items())))
+
+        def compute(now: float) -> Dict[str, Any]:
+            start_us, end_us = self._window_bounds(window, now)
+            steps, oldest = [], []
+            reached_keys = reached_times = None
+            entered = 0
+            for name, storage, column in FUNNEL_STEPS:
+                step_filter = {column: filters[name]} if name in filters else None
+                rows = self._rows(storage, JOURNEY_KEYS[by], start_us, end_us, step_filter)
+                oldest.append(rows['oldest'])
+                keys, times = rows['key'], rows['time']
+
+                if reached_keys is not None:
+                    # Keep events of journeys that reached the previous step, at or after that moment
+                    index, found = lookup(reached_keys, keys)
+                    after = found & (times >= reached_times[index]) if len(reached_keys) else found
+                    keys, times = keys[after], times[after]
+                step_keys, step_times = first_per_key(keys, times)
+
+                step = {'step': name, 'journeys': int(len(step_keys))}
+                if name in filters:
+                    step['filter'] = {column: filters[name]}
+                if reached_keys is None:
+                    entered = len(step_keys)
+                else:
+                    index, _ = lookup(reached_keys, step_keys)
+                    elapsed = (step_times - reached_times[index]) / 1_000_000
+                    step['rate_from_previous'] = round(len(step_keys) / len(reached_keys) * 100, 1) \
+                        if len(reached_keys) else 0.0
+                    step['median_seconds_from_previous'] = round(float(np.median(elapsed)), 1) \
+                        if len(elapsed) else None
+                step['rate_from_start'] = round(len(step_keys) / entered * 100, 1) if entered else 0.0
+                steps.append(step)
+                reached_keys, reached_times = step_keys, step_times
+
+            return {
+                'window': window,
+                'by': by,
+                'steps': steps,
+                'coverage_start': self._coverage(start_us, oldest),
+                'computed_at': from_epoch_us(int(now * 1_000_000))
+            }
+
+        return self._cached(cache_key, compute)
+
+    def attribution(self, window: str = '30d', by: str = 'user') -> Dict[str, Any]:
+        """First-touch and last-touch conversions and value per campaign
+
+        Touches are pageviews whose page or referrer URL carries
+        utm_campaign, plus each conversion's own campaign. A conversion is
+        credited to its journey's earliest touch in the window (first touch)
+        and to the latest touch at or before it (last touch).
+        """
+        if by not in JOURNEY_KEYS:
+            raise ValueError(f"by must be one of {', '.join(JOURNEY_KEYS)}")
+        key_column = JOURNEY_KEYS[by]
+
+        def compute(now: float) -> Dict[str, Any]:
+            start_us, end_us = self._window_bounds(window, now)
+            # Touch campaigns in the shared campaign code space (-1 = no campaign)
+            views = self._rows('page_views', key_column, start_us, end_us,
+                               translated={'page': 'utm', 'referrer': 'utm'})
+            conversions = self._rows('conversion_events', key_column, start_us, end_us,
+                                     extra=('value',), translated={'campaign': 'campaign'})
+
+            view_campaigns = np.where(views['page'] >= 0, views['page'], views['referrer'])
+            conversion_campaigns = conversions['campaign']
+
+            touched = view_campaigns >= 0
+            touch_keys = np.concatenate([views['key'][touched], conversions['key'][conversion_campaigns >= 0]])
+            touch_times = np.concatenate([views['time'][touched], conversions['time'][conversion_campaigns >= 0]])
+            touch_campaigns = np.concatenate([view_campaigns[touched],
+                                              conversion_campaigns[conversion_campaigns >= 0]])
+            # (journey, time) as one sortable int64: key * span + milliseconds into the window
+            span = (end_us - start_us) // 1000 + 1
+            touch_order = touch_keys * span + (touch_times - start_us) // 1000
+            order = np.argsort(touch_order, kind='stable')
+            touch_order, touch_campaigns = touch_order[order], touch_campaigns[order]
+            touch_keys = touch_order // span
+            conversion_keys = conversions['key']
+            conversion_order = conversion_keys * span + (conversions['time'] - start_us) // 1000
+
+            # Last touch: latest touch of the same journey at or before the conversion;
+            # first touch: the start of that journey's block of touches
+            last = np.searchsorted(touch_order, conversion_order, side='right') - 1
+            first = np.searchsorted(touch_keys, conversion_keys, side='left')
+            attributed = (last >= 0) & (touch_keys[np.maximum(last, 0)] == conversion_keys) \
+                if len(touch_order) else np.zeros(len(conversion_keys), dtype=bool)
+            last_campaigns = np.where(attributed, touch_campaigns[np.maximum(last, 0)], -1) \
+                if len(touch_order) else np.full(len(conversion_keys), -1)
+            first_campaigns = np.where(attributed, touch_campaigns[np.minimum(first, len(touch_order) - 1)], -1) \
+                if len(touch_order) else last_campaigns
+
+            values = np.nan_to_num(conversions['value'])
+            return {
+                'window': window,
+                'by': by,
+                'conversions': int(len(conversion_keys)),
+                'attributed': int(attributed.sum()),
+                'first_touch': self._credit(first_campaigns, values),
+                'last_touch': self._credit(last_campaigns, values),
+                'coverage_start': self._coverage(start_us, [views['oldest'], conversions['oldest']]),
+                'computed_at': from_epoch_us(int(now * 1_000_000))
+            }
+
+        return self._cached(('attribution', window, by), compute)
+
+    def _credit(self, campaigns: np.ndarray, values: np.ndarray) -> List[Dict[str, Any]]:
+        """Conversions and value per campaign code, most conversions first"""
+        if not len(campaigns):
+            return []
+        codes, inverse, counts = np.unique(campaigns, return_inverse=True, return_counts=True)
+        totals = np.bincount(inverse, weights=values, minlength=len(codes))
+        credit = [
+            {'campaign': self._campaigns.decode(int(code)) if code >= 0 else NO_CAMPAIGN,
+             'conversions': int(count), 'value': round(float(total), 2)}
+            for code, count, total in zip(codes.tolist(), counts.tolist(), totals.tolist())
+        ]
+        return sorted(credit, key=lambda item: (-item['conversions'], -item['value']))
@@ -0,0 +1,527 @@
+"""
+AI Marketing Tools - Analytics Rollups
+Per-minute and per-hour rollup buckets of tracked events and request
+latencies, updated on ingest, so overview and performance metrics for
+24h/7d/30d windows merge a bounded number of buckets instead of scanning
+raw events.
+
+Rollups live in the memory of the process that ingested the events and are
+not merged across processes: with several workers each one reports only its
+own traffic, so the analytics blueprint must run in a single process.
+"""
+
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+from urllib.parse import urlparse
+
+from sketches import DDSketch, HeavyHitters, HyperLogLog
+from user_agents import unpack_user_agent, user_agent_code
+
+MINUTE = 60
+HOUR = 3600
+
+# Registers per HyperLogLog visitor sketch = 2**precision (~1.6% standard error at 12)
+DEFAULT_HLL_PRECISION = 12
+
+# Space-Saving counters per top-K sketch; Count-Min tables only appear in buckets that overflow it
+TOP_K_CAPACITY = 64
+
+# RollupBucket sketches that OverviewRollups.top() can rank
+TOP_K_DIMENSIONS = ('pages', 'referrers', 'campaigns', 'entry_pages', 'exit_pages')
+
+# Relative accuracy of latency quantiles, and named series (endpoints/pages) kept per kind and bucket
+LATENCY_ACCURACY = 0.01
+MAX_LATENCY_SERIES = 200
+
+# Window name -> length in seconds
+ROLLUP_WINDOWS = {
+    '24h': 24 * HOUR,
+    '7d': 7 * 24 * HOUR,
+    '30d': 30 * 24 * HOUR
+}
+
+SEARCH_ENGINES = ('google.', 'bing.', 'yahoo.', 'duckduckgo.', 'baidu.', 'yandex.', 'ecosia.')
+SOCIAL_NETWORKS = ('facebook.', 'instagram.', 'linkedin.', 'twitter.', 't.co', 'x.com', 'tiktok.',
+                   'youtube.', 'pinterest.', 'reddit.', 'lnkd.in')
+PAID_MARKERS = ('gclid=', 'fbclid=', 'msclkid=', 'utm_medium=cpc', 'utm_medium=paid', 'utm_medium=ppc')
+
+
+@lru_cache(maxsize=4096)
+def classify_traffic_source(referrer: str) -> str:
+    """Map a referrer URL to direct / organic / social / paid / referral"""
+    if not referrer:
+        return 'direct'
+    lowered = referrer.lower()
+    if any(marker in lowered for marker in PAID_MARKERS):
+        return 'paid'
+    host = urlparse(lowered if '//' in lowered else '//' + lowered).netloc
+    if any(engine in host for engine in SEARCH_ENGINES):
+        return 'organic'
+    if any(network in host for network in SOCIAL_NETWORKS):
+        return 'social'
+    return 'referral'
+
+
+@lru_cache(maxsize=4096)
+def referrer_host(referrer: str) -> Optional[str]:
+    """Host of a referrer URL without a leading www., or None for direct traffic"""
+    if not referrer:
+        return None
+    host = urlparse(referrer if '//' in referrer else '//' + referrer).netloc.lower()
+    return host[4:] if host.startswith('www.') else host or None
+
+
+def visitor_key(record: Dict[str, Any]) -> Optional[str]:
+    """Best available visitor identity: user id, then session id, then IP address"""
+    for field in ('user_id', 'session_id', 'ip_address'):
+        value = record.get(field)
+        if value not in (None, ''):
+            return f"{field}:{value}"
+    return None
+
+
+def event_epoch(record: Dict[str, Any]) -> float:
+    timestamp = record['timestamp']
+    if isinstance(timestamp, (int, float)):
+        return float(timestamp)
+    return datetime.fromisoformat(timestamp).timestamp()
+
+
+class RollupBucket:
+    """Aggregates of every event that fell into one time bucket
+
+    Sessions are counted in the bucket they started in, once the sessionizer
+    closes them, so a bucket only keeps their totals.
+    """
+
+    __slots__ = ('page_views', 'pages', 'referrers', 'campaigns', 'languages', 'sources', 'devices',
+                 'browsers', 'operating_systems', 'visitors', 'conversions', 'sessions', 'bounces',
+                 'session_seconds', 'session_pages', 'entry_pages', 'exit_pages')
+
+    def __init__(self, hll_precision: int = DEFAULT_HLL_PRECISION):
+        self.page_views = 0
+        self.pages = HeavyHitters(TOP_K_CAPACITY)
+        self.referrers = HeavyHitters(TOP_K_CAPACITY)
+        # Conversions by campaign
+        self.campaigns = HeavyHitters(TOP_K_CAPACITY)
+        self.languages = Counter()
+        self.sources = Counter()
+        self.devices = Counter()
+        self.browsers = Counter()
+        self.operating_systems = Counter()
+        self.visitors = HyperLogLog(hll_precision)
+        self.conversions = 0
+        self.sessions = 0
+        self.bounces = 0
+        self.session_seconds = 0.0
+        self.session_pages = 0
+        self.entry_pages = HeavyHitters(TOP_K_CAPACITY)
+        self.exit_pages = HeavyHitters(TOP_K_CAPACITY)
+
+    def add_session(self, record: Dict[str, Any]):
+        """A closed session from the sessionizer"""
+        self.sessions += 1
+        self.bounces += record['bounce']
+        self.session_seconds += record['duration']
+        self.session_pages += record['pages']
+        if record['entry_page'] is not None:
+            self.entry_pages.add(record['entry_page'])
+            self.exit_pages.add(record['exit_page'])
+
+    def add_pageview(self, record: Dict[str, Any]):
+        self.page_views += 1
+        referrer = record.get('referrer') or ''
+        self.pages.add(record.get('page') or '/')
+        self.languages[record.get('language') or 'unknown'] += 1
+        self.sources[classify_traffic_source(referrer)] += 1
+
+        ua_code = record.get('ua_code')
+        user_agent = unpack_user_agent(user_agent_code(record.get('user_agent')) if ua_code is None else ua_code)
+        self.devices[user_agent['device']] += 1
+        self.browsers[user_agent['browser']] += 1
+        self.operating_systems[user_agent['os']] += 1
+
+        host = referrer_host(referrer)
+        if host:
+            self.referrers.add(host)
+
+        visitor = visitor_key(record)
+        if visitor:
+            self.visitors.add(visitor)
+
+    def add_conversion(self, record: Dict[str, Any]):
+        self.conversions += 1
+        if record.get('campaign'):
+            self.campaigns.add(record['campaign'])
+
+    def add(self, storage: str, record: Dict[str, Any]):
+        if storage == 'page_views':
+            self.add_pageview(record)
+        elif storage == 'sessions':
+            self.add_session(record)
+        else:
+            self.add_conversion(record)
+
+    def merge(self, other: 'RollupBucket'):
+        self.page_views += other.page_views
+        self.pages.merge(other.pages)
+        self.referrers.merge(other.referrers)
+        self.campaigns.merge(other.campaigns)
+        self.languages.update(other.languages)
+        self.sources.update(other.sources)
+        self.devices.update(other.devices)
+        self.browsers.update(other.browsers)
+        self.operating_systems.update(other.operating_systems)
+        self.visitors.merge(other.visitors)
+        self.conversions += other.conversions
+        self.sessions += other.sessions
+        self.bounces += other.bounces
+        self.session_seconds += other.session_seconds
+        self.session_pages += other.session_pages
+        self.entry_pages.merge(other.entry_pages)
+        self.exit_pages.merge(other.exit_pages)
+
+
+class WindowTotals:
+    """A large, cached base bucket overlaid with a few small live buckets, without copying the base
+
+    Distinct visitors come from a HyperLogLog, so they are reported as an
+    estimate with error bounds (see HyperLogLog.error_bounds).
+    """
+
+    def __init__(self, base: RollupBucket, live: List[RollupBucket]):
+        overlay = RollupBucket(base.visitors.precision)
+        for bucket in live:
+            overlay.merge(bucket)
+
+        self.page_views = base.page_views + overlay.page_views
+        self.conversions = base.conversions + overlay.conversions
+        self.pages = overlay.pages.merge(base.pages)
+        self.referrers = overlay.referrers.merge(base.referrers)
+        self.campaigns = overlay.campaigns.merge(base.campaigns)
+        self.languages = base.languages + overlay.languages
+        self.sources = base.sources + overlay.sources
+        self.devices = base.devices + overlay.devices
+        self.browsers = base.browsers + overlay.browsers
+        self.operating_systems = base.operating_systems + overlay.operating_systems
+        self.visitors = overlay.visitors.merge(base.visitors).error_bounds()
+        self.sessions = base.sessions + overlay.sessions
+        self.bounces = base.bounces + overlay.bounces
+        self.session_seconds = base.session_seconds + overlay.session_seconds
+        self.session_pages = base.session_pages + overlay.session_pages
+        self.entry_pages = overlay.entry_pages.merge(base.entry_pages)
+        self.exit_pages = overlay.exit_pages.merge(base.exit_pages)
+
+
+class WindowedRollups:
+    """Minute and hour buckets with cached window merges
+
+    Hour buckets are kept for the longest window and minute buckets for a
+    day plus an hour. Each window is the merge of its closed hours, cached
+    until the hour rolls over, overlaid with the current hour and, for the
+    24h window, a per-minute cached merge of the minute buckets of the
+    partial hour at its start. Late events are folded into the caches as
+    they arrive, so a window query touches at most three buckets.
+
+    Subclasses provide _new_bucket(); buckets need add(*args) and merge(other).
+    """
+
+    def __init__(self, hour_retention: int = ROLLUP_WINDOWS['30d'] + HOUR,
+                 minute_retention: int = ROLLUP_WINDOWS['24h'] + HOUR):
+        self.hour_retention = hour_retention
+        self.minute_retention = minute_retention
+        self.minutes: Dict[int, Any] = {}
+        self.hours: Dict[int, Any] = {}
+        # cache name -> (start, end, merged buckets with start <= key < end)
+        self._merged: Dict[str, Tuple[int, int, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _new_bucket(self):
+        raise NotImplementedError
+
+    def _bucket(self, buckets: Dict[int, Any], size: int, retention: int, timestamp: float, now: float):
+        key = int(timestamp // size) * size
+        bucket = buckets.get(key)
+        if bucket is None:
+            if key < now - retention:
+                return None
+            bucket = buckets[key] = self._new_bucket()
+            # New buckets appear at most once per bucket period, so this prune is cheap
+            for stale in [existing for existing in buckets if existing < now - retention]:
+                del buckets[stale]
+        return bucket
+
+    def _fold(self, timestamp: float, now: float, *args):
+        """bucket.add(*args) on the minute and hour buckets of timestamp (caller holds the lock)"""
+        minute = self._bucket(self.minutes, MINUTE, self.minute_retention, timestamp, now)
+        if minute is not None:
+            minute.add(*args)
+        hour = self._bucket(self.hours, HOUR, self.hour_retention, timestamp, now)
+        if hour is None:
+            return
+        hour.add(*args)
+
+        # Late events for already merged periods also update the cached merges
+        for start, end, merged in self._merged.values():
+            if start <= timestamp < end:
+                merged.add(*args)
+
+    def _window_bounds(self, window: str, now: float) -> Tuple[float, int, int]:
+        start = now - ROLLUP_WINDOWS[window]
+        current_hour = int(now // HOUR) * HOUR
+        # The 24h window is exact to the minute; longer ones start on the hour
+        first_hour = int(-(-start // HOUR) * HOUR) if window == '24h' else int(start // HOUR) * HOUR
+        return start, first_hour, current_hour
+
+    def _cached_merge(self, name: str, buckets: Dict[int, Any], start: int, end: int):
+        """Merge of buckets with start <= key < end, rebuilt only when the range moves"""
+        cached = self._merged.get(name)
+        if cached is None or cached[:2] != (start, end):
+            merged = self._new_bucket()
+            for key, bucket in buckets.items():
+                if start <= key < end:
+                    merged.merge(bucket)
+            cached = self._merged[name] = (start, end, merged)
+        return cached[2]
+
+    def _live_buckets(self, window: str, start: float, first_hour: int, current_hour: int) -> List[Any]:
+        live = [self.hours[current_hour]] if current_hour in self.hours else []
+        if window == '24h':
+            edge_start = int(-(-start // MINUTE) * MINUTE)
+            live.append(self._cached_merge('24h-edge', self.minutes, edge_start, first_hour))
+        return live
+
+    def window_parts(self, window: str, now: float) -> Tuple[Any, List[Any]]:
+        """(cached merge of the window's closed hours, live buckets); caller holds the lock"""
+        start, first_hour, current_hour = self._window_bounds(window, now)
+        return (self._cached_merge(window, self.hours, first_hour, current_hour),
+                self._live_buckets(window, start, first_hour, current_hour))
+
+
+class OverviewRollups(WindowedRollups):
+    """Rollups of pageviews and conversions behind the overview dashboard"""
+
+    def __init__(self, hour_retention: int = ROLLUP_WINDOWS['30d'] + HOUR,
+                 minute_retention: int = ROLLUP_WINDOWS['24h'] + HOUR,
+                 hll_precision: int = DEFAULT_HLL_PRECISION):
+        super().__init__(hour_retention, minute_retention)
+        self.hll_precision = hll_precision
+
+    def _new_bucket(self) -> RollupBucket:
+        return RollupBucket(self.hll_precision)
+
+    def add(self, storage: str, records: Iterable[Dict[str, Any]]):
+        """Fold newly stored events of one type, or closed sessions ('sessions'), into their buckets"""
+        if storage not in ('page_views', 'conversion_events', 'sessions'):
+            return
+
+        now = time.time()
+        with self._lock:
+            for record in records:
+                self._fold(event_epoch(record), now, storage, record)
+
+    def window_totals(self, window: str, now: float = None) -> WindowTotals:
+        """Totals over the last `window` (see ROLLUP_WINDOWS)"""
+        with self._lock:
+            return WindowTotals(*self.window_parts(window, now or time.time()))
+
+    def top(self, dimension: str, window: str = '24h', n: int = 10, now: float = None) -> List[Dict[str, Any]]:
+        """Top-n keys of one sketch dimension (see TOP_K_DIMENSIONS) over a window"""
+        if dimension not in TOP_K_DIMENSIONS:
+            raise ValueError(f"Unknown top-K dimension: {dimension}")
+        with self._lock:
+            closed, live = self.window_parts(window, now or time.time())
+            sketch = getattr(closed, dimension).copy()
+            for bucket in live:
+                sketch.merge(getattr(bucket, dimension))
+        return sketch.top(n)
+
+    @staticmethod
+    def _distribution(counter: Counter) -> Dict[str, float]:
+        total = sum(counter.values())
+        return {key: round(count / total * 100, 1) for key, count in counter.most_common()} if total else {}
+
+    def overview(self, window: str = '24h', top_pages: int = 5) -> Dict[str, Any]:
+        """Overview dashboard payload computed from the rollups"""
+        if window not in ROLLUP_WINDOWS:
+            raise ValueError(f"Unknown window: {window}")
+
+        now = time.time()
+        day = self.window_totals('24h', now)
+        selected = day if window == '24h' else self.window_totals(window, now)
+        month = selected if window == '30d' else self.window_totals('30d', now)
+
+        active_users = selected.visitors['estimate']
+
+        return {
+            'window': window,
+            'total_users': month.visitors['estimate'],
+            'active_users_24h': day.visitors['estimate'],
+            'page_views_24h': day.page_views,
+            'active_users': active_users,
+            'active_users_bounds': {key: selected.visitors[key] for key in ('low', 'high', 'relative_error')},
+            'page_views': selected.page_views,
+            'conversions': selected.conversions,
+            'conversion_rate': round(selected.conversions / active_users * 100, 2) if active_users else 0.0,
+            'sessions': selected.sessions,
+            'avg_session_duration': round(selected.session_seconds / selected.sessions) if selected.sessions else 0,
+            'pages_per_session': round(selected.session_pages / selected.sessions, 2) if selected.sessions else 0.0,
+            'bounce_rate': round(selected.bounces / selected.sessions * 100, 1) if selected.sessions else 0.0,
+            'top_pages': [{'page': item['key'], 'views': item['count']} for item in selected.pages.top(top_pages)],
+            'top_referrers': [{'referrer': item['key'], 'views': item['count']}
+                              for item in selected.referrers.top(top_pages)],
+            'top_campaigns': [{'campaign': item['key'], 'conversions': item['count']}
+                              for item in selected.campaigns.top(top_pages)],
+            'top_entry_pages': [{'page': item['key'], 'sessions': item['count']}
+                                for item in selected.entry_pages.top(top_pages)],
+            'top_exit_pages': [{'page': item['key'], 'sessions': item['count']}
+                               for item in selected.exit_pages.top(top_pages)],
+            'language_distribution': self._distribution(selected.languages),
+            'traffic_sources': self._distribution(selected.sources),
+            'device_distribution': self._distribution(selected.devices),
+            'browser_distribution': self._distribution(selected.browsers),
+            'os_distribution': self._distribution(selected.operating_systems)
+        }
+
+
+class LatencyBucket:
+    """DDSketches of one bucket's latencies, per kind ('api', 'page_load', ...) and per named series"""
+
+    __slots__ = ('kinds', 'series', 'failures')
+
+    def __init__(self):
+        self.kinds: Dict[str, DDSketch] = {}
+        # kind -> series name (endpoint or page) -> sketch
+        self.series: Dict[str, Dict[str, DDSketch]] = {}
+        self.failures = Counter()
+
+    def add(self, kind: str, name: str, value: float, failed: bool = False):
+        sketch = self.kinds.get(kind)
+        if sketch is None:
+            sketch = self.kinds[kind] = DDSketch(LATENCY_ACCURACY)
+            self.series[kind] = {}
+        sketch.add(value)
+
+        named = self.series[kind]
+        if name not in named and len(named) >= MAX_LATENCY_SERIES:
+            name = 'other'
+        series = named.get(name)
+        if series is None:
+            series = named[name] = DDSketch(LATENCY_ACCURACY)
+        series.add(value)
+
+        if failed:
+            self.failures[kind] += 1
+
+    def merge(self, other: 'LatencyBucket'):
+        for kind, sketch in other.kinds.items():
+            if kind not in self.kinds:
+                self.kinds[kind] = DDSketch(LATENCY_ACCURACY)
+                self.series[kind] = {}
+            self.kinds[kind].merge(sketch)
+
+            named = self.series[kind]
+            for name, series in other.series[kind].items():
+                if name not in named:
+                    if len(named) >= MAX_LATENCY_SERIES:
+                        name = 'other'
+                    named.setdefault(name, DDSketch(LATENCY_ACCURACY))
+                named[name].merge(series)
+        self.failures.update(other.failures)
+
+
+class LatencyRollups(WindowedRollups):
+    """Mergeable latency sketches per kind and series in minute and hour buckets
+
+    API request timings come from the Flask request hook and page-load
+    timings from client performance events; window percentiles are read from
+    merged DDSketches, never by sorting raw samples.
+    """
+
+    def _new_bucket(self) -> LatencyBucket:
+        return LatencyBucket()
+
+    def record(self, kind: str, name: str, value: float, timestamp: float = None, failed: bool = False):
+        """Add one latency sample (milliseconds)"""
+        now = time.time()
+        with self._lock:
+            self._fold(timestamp or now, now, kind, name, value, failed)
+
+    def add(self, storage: str, records: Iterable[Dict[str, Any]]):
+        """Fold stored client performance events (metric, value in ms, page) into the sketches"""
+        if storage != 'performance_metrics':
+            return
+
+        now = time.time()
+        with self._lock:
+            for record in records:
+                if record.get('value') is None:
+                    continue
+                self._fold(event_epoch(record), now, record.get('metric') or 'page_load',
+                           record.get('page') or '/', float(record['value']), False)
+
+    def window_bucket(self, window: str, now: float = None) -> LatencyBucket:
+        """Merged latency sketches over the last `window`"""
+        merged = LatencyBucket()
+        with self._lock:
+            closed, live = self.window_parts(window, now or time.time())
+            for bucket in [closed] + live:
+                merged.merge(bucket)
+        return merged
+
+    def previous_window_bucket(self, window: str, now: float = None) -> Optional[LatencyBucket]:
+        """Merged sketches of the equally long window before the current one, if still retained"""
+        length = ROLLUP_WINDOWS[window]
+        if 2 * length > self.hour_retention:
+            return None
+        _, first_hour, _ = self._window_bounds(window, now or time.time())
+        merged = LatencyBucket()
+        with self._lock:
+            merged.merge(self._cached_merge(f"{window}-previous", self.hours, first_hour - length, first_hour))
+        return merged
+
+    @staticmethod
+    def _trend(current: Optional[float], previous: Optional[float], tolerance: float = 0.05) -> Optional[str]:
+        """'improving' / 'degrading' / 'stable' for a lower-is-better value"""
+        if current is None or previous is None:
+            return None
+        if current < previous * (1 - tolerance):
+            return 'improving'
+        if current > previous * (1 + tolerance):
+            return 'degrading'
+        return 'stable'
+
+    def summary(self, window: str = '24h', series_limit: int = 10) -> Dict[str, Any]:
+        """count/avg/p50/p95/p99 per kind over a window, with the slowest series by p95
+
+        The trend compares p95 with the previous window of the same length.
+        """
+        if window not in ROLLUP_WINDOWS:
+            raise ValueError(f"Unknown window: {window}")
+
+        now = time.time()
+        bucket = self.window_bucket(window, now)
+        previous = self.previous_window_bucket(window, now)
+        summaries = {}
+        for kind, sketch in bucket.kinds.items():
+            previous_sketch = previous.kinds.get(kind) if previous is not None else None
+            previous_p95 = previous_sketch.quantile(0.95) if previous_sketch is not None else None
+            slowest = sorted(bucket.series[kind].items(), key=lambda item: item[1].quantile(0.95), reverse=True)
+            summaries[kind] = {
+                'count': sketch.count,
+                'avg': sketch.mean,
+                'p50': sketch.quantile(0.50),
+                'p95': sketch.quantile(0.95),
+                'p99': sketch.quantile(0.99),
+                'failures': bucket.failures[kind],
+                'error_rate': bucket.failures[kind] / sketch.count * 100,
+                'trend': self._trend(sketch.quantile(0.95), previous_p95),
+                'previous_error_rate': previous.failures[kind] / previous_sketch.count * 100
+                if previous_sketch is not None and previous_sketch.count else None,
+                'series': {name: series.summary() for name, series in slowest[:series_limit]}
+            }
+        return summaries
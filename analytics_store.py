@@ -0,0 +1,315 @@
+"""
+AI Marketing Tools - Columnar Analytics Event Store
+Fixed-capacity, array-backed storage for tracked analytics events: epoch
+timestamps, dictionary-encoded strings and a ring buffer whose oldest rows
+spill to compressed files on disk.
+"""
+
+import gzip
+import json
+import os
+import sys
+import threading
+from datetime import datetime
+from typing import Dict, List, Any, Iterable, Iterator
+
+import numpy as np
+
+# Column kinds
+TIME = 'time'          # int64 epoch microseconds
+CATEGORY = 'category'  # int32 code into a per-column dictionary (-1 = None)
+NUMBER = 'number'      # float64 (NaN = None)
+JSON = 'json'          # dictionary-encoded canonical JSON text
+CODE = 'code'          # uint16 small-integer code computed at ingest (e.g. packed user-agent classes)
+
+EVENT_SCHEMAS = {
+    'page_views': {
+        'timestamp': TIME, 'page': CATEGORY, 'ua_code': CODE, 'ip_address': CATEGORY,
+        'referrer': CATEGORY, 'language': CATEGORY, 'session_id': CATEGORY, 'user_id': CATEGORY
+    },
+    'user_interactions': {
+        'timestamp': TIME, 'event_type': CATEGORY, 'element': CATEGORY, 'page': CATEGORY,
+        'user_id': CATEGORY, 'session_id': CATEGORY, 'language': CATEGORY, 'additional_data': JSON
+    },
+    'conversion_events': {
+        'timestamp': TIME, 'conversion_type': CATEGORY, 'value': NUMBER, 'currency': CATEGORY,
+        'user_id': CATEGORY, 'session_id': CATEGORY, 'source': CATEGORY, 'campaign': CATEGORY,
+        'language': CATEGORY
+    },
+    'performance_metrics': {
+        'timestamp': TIME, 'metric': CATEGORY, 'value': NUMBER, 'page': CATEGORY
+    }
+}
+
+# Columns kept in the durable event log (and exports) but not in the memory rings;
+# the raw User-Agent is reduced to its ua_code class at ingest
+LOG_ONLY_COLUMNS = {
+    'page_views': {'user_agent': CATEGORY}
+}
+
+COLUMN_DTYPES = {TIME: np.int64, CATEGORY: np.int32, NUMBER: np.float64, JSON: np.int32, CODE: np.uint16}
+
+
+def to_epoch_us(value: Any) -> int:
+    """ISO string, datetime or epoch seconds -> epoch microseconds"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime):
+        value = value.timestamp()
+    return int(round(value * 1_000_000))
+
+
+def from_epoch_us(value: int) -> str:
+    return datetime.fromtimestamp(value / 1_000_000).isoformat()
+
+
+class StringDictionary:
+    """Interns column values to small integer codes"""
+
+    def __init__(self):
+        self.codes: Dict[Any, int] = {}
+        self.values: List[Any] = []
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def encode(self, value: Any) -> int:
+        if value is None:
+            return -1
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(sys.intern(value) if isinstance(value, str) else value)
+        return code
+
+    def decode(self, code: int) -> Any:
+        return self.values[code] if code >= 0 else None
+
+    def compact(self, live_codes: np.ndarray) -> np.ndarray:
+        """Drop values no live row refers to; returns the old -> new code mapping"""
+        used = np.unique(live_codes[live_codes >= 0])
+        mapping = np.full(len(self.values) + 1, -1, dtype=np.int32)
+        mapping[used] = np.arange(len(used), dtype=np.int32)
+
+        self.values = [self.values[code] for code in used.tolist()]
+        self.codes = {value: code for code, value in enumerate(self.values)}
+        return mapping
+
+    def memory_bytes(self) -> int:
+        return (sys.getsizeof(self.codes) + sys.getsizeof(self.values)
+                + sum(sys.getsizeof(value) for value in self.values))
+
+
+class ColumnarEventStore:
+    """Ring buffer of one event type stored column by column
+
+    When the ring is full, the oldest spill_batch rows are written to a
+    gzip NDJSON file in spill_dir (or dropped when there is none), and
+    dictionaries are compacted once they hold far more values than live rows.
+    Rows are kept in insertion order.
+    """
+
+    def __init__(self, name: str, schema: Dict[str, str], capacity: int = 100_000,
+                 spill_dir: str = None, spill_batch: int = None):
+        self.name = name
+        self.schema = schema
+        self.capacity = capacity
+        self.spill_dir = os.path.join(spill_dir, name) if spill_dir else None
+        self.spill_batch = spill_batch or max(1, capacity // 4)
+
+        self.columns = {column: np.zeros(capacity, dtype=COLUMN_DTYPES[kind]) for column, kind in schema.items()}
+        self.dictionaries = {column: StringDictionary() for column, kind in schema.items()
+                             if kind in (CATEGORY, JSON)}
+        self.head = 0
+        self.size = 0
+        self.total_appended = 0
+        self.spilled_rows = 0
+        self.dropped_rows = 0
+        self._spill_sequence = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def count(self) -> int:
+        """Events ever appended, including spilled and dropped ones"""
+        return self.total_appended
+
+    def _encode(self, column: str, values: List[Any]) -> np.ndarray:
+        kind = self.schema[column]
+        if kind == TIME:
+            return np.fromiter((to_epoch_us(value) for value in values), dtype=np.int64, count=len(values))
+        if kind == NUMBER:
+            return np.array([np.nan if value is None else float(value) for value in values], dtype=np.float64)
+        if kind == CODE:
+            return np.fromiter((value or 0 for value in values), dtype=np.uint16, count=len(values))
+
+        dictionary = self.dictionaries[column]
+        if kind == JSON:
+            values = [None if value is None else json.dumps(value, sort_keys=True, separators=(',', ':'))
+                      for value in values]
+        return np.fromiter((dictionary.encode(value) for value in values), dtype=np.int32, count=len(values))
+
+    def decode_column(self, column: str, positions: np.ndarray) -> List[Any]:
+        """Decoded Python values of one column at the given ring positions"""
+        kind = self.schema[column]
+        raw = self.columns[column][positions]
+        if kind == TIME:
+            return [from_epoch_us(value) for value in raw.tolist()]
+        if kind == NUMBER:
+            return [None if value != value else value for value in raw.tolist()]
+        if kind == CODE:
+            return raw.tolist()
+
+        values = self.dictionaries[column].values
+        decoded = [values[code] if code >= 0 else None for code in raw.tolist()]
+        if kind == JSON:
+            decoded = [None if value is None else json.loads(value) for value in decoded]
+        return decoded
+
+    def append(self, record: Dict[str, Any]):
+        self.extend([record])
+
+    def extend(self, records: Iterable[Dict[str, Any]]):
+        """Append records (dicts keyed by schema column) to the ring"""
+        records = list(records)
+        for start in range(0, len(records), self.capacity):
+            self._extend_chunk(records[start:start + self.capacity])
+
+    def _extend_chunk(self, records: List[Dict[str, Any]]):
+        count = len(records)
+        if not count:
+            return
+
+        with self._lock:
+            overflow = self.size + count - self.capacity
+            if overflow > 0:
+                self._evict(min(self.size, max(overflow, self.spill_batch)))
+
+            positions = (self.head + np.arange(count)) % self.capacity
+            for column in self.schema:
+                self.columns[column][positions] = self._encode(column, [record.get(column) for record in records])
+
+            self.head = (self.head + count) % self.capacity
+            self.size += count
+            self.total_appended += count
+
+    def live_positions(self) -> np.ndarray:
+        """Ring positions of the rows in memory, oldest first"""
+        tail = (self.head - self.size) % self.capacity
+        return (tail + np.arange(self.size)) % self.capacity
+
+    def select(self, start: Any = None, end: Any = None) -> np.ndarray:
+        """Positions of in-memory rows with start <= timestamp < end"""
+        with self._lock:
+            positions = self.live_positions()
+            timestamps = self.columns['timestamp'][positions]
+            mask = np.ones(len(positions), dtype=bool)
+            if start is not None:
+                mask &= timestamps >= to_epoch_us(start)
+            if end is not None:
+                mask &= timestamps < to_epoch_us(end)
+            return positions[mask]
+
+    def rows(self, positions: np.ndarray = None) -> List[Dict[str, Any]]:
+        """Decode rows back into event dicts"""
+        with self._lock:
+            if positions is None:
+                positions = self.live_positions()
+            columns = {column: self.decode_column(column, positions) for column in self.schema}
+        return [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+    def _evict(self, count: int):
+        """Move the oldest rows out of the ring (to disk when spilling is enabled)"""
+        positions = self.live_positions()[:count]
+        if self.spill_dir:
+            self._spill(positions)
+            self.spilled_rows += count
+        else:
+            self.dropped_rows += count
+        self.size -= count
+
+        # Keep dictionaries proportional to what is still in the ring
+        live = self.live_positions()
+        for column, dictionary in self.dictionaries.items():
+            if len(dictionary) > 2 * self.capacity:
+                mapping = dictionary.compact(self.columns[column][live])
+                self.columns[column][live] = mapping[self.columns[column][live]]
+
+    def _spill(self, positions: np.ndarray):
+        timestamps = self.columns['timestamp'][positions]
+        os.makedirs(self.spill_dir, exist_ok=True)
+        self._spill_sequence += 1
+        filename = f"{int(timestamps.min())}-{int(timestamps.max())}-{os.getpid()}-{self._spill_sequence}.ndjson.gz"
+        path = os.path.join(self.spill_dir, filename)
+
+        tmp_path = path + '.tmp'
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            for row in self.rows(positions):
+                f.write(json.dumps(row, separators=(',', ':'), default=str) + '\n')
+        os.replace(tmp_path, path)
+
+    def iter_spilled(self, start: Any = None, end: Any = None) -> Iterator[Dict[str, Any]]:
+        """Spilled rows in [start, end), reading only files whose time range overlaps"""
+        if not self.spill_dir or not os.path.isdir(self.spill_dir):
+            return
+        start_us = to_epoch_us(start) if start is not None else None
+        end_us = to_epoch_us(end) if end is not None else None
+
+        for filename in sorted(os.listdir(self.spill_dir)):
+            if not filename.endswith('.ndjson.gz'):
+                continue
+            first_us, last_us = (int(part) for part in filename.split('-')[:2])
+            if (start_us is not None and last_us < start_us) or (end_us is not None and first_us >= end_us):
+                continue
+            with gzip.open(os.path.join(self.spill_dir, filename), 'rt', encoding='utf-8') as f:
+                for line in f:
+                    row = json.loads(line)
+                    timestamp = to_epoch_us(row['timestamp'])
+                    if (start_us is None or timestamp >= start_us) and (end_us is None or timestamp < end_us):
+                        yield row
+
+    def memory_usage(self) -> Dict[str, Any]:
+        """Bytes held by column arrays and dictionaries"""
+        with self._lock:
+            column_bytes = sum(array.nbytes for array in self.columns.values())
+            dictionary_bytes = sum(dictionary.memory_bytes() for dictionary in self.dictionaries.values())
+            return {
+                'rows': self.size,
+                'capacity': self.capacity,
+                'column_bytes': column_bytes,
+                'dictionary_bytes': dictionary_bytes,
+                'total_bytes': column_bytes + dictionary_bytes,
+                'bytes_per_row_capacity': column_bytes / self.capacity,
+                'spilled_rows': self.spilled_rows,
+                'dropped_rows': self.dropped_rows
+            }
+
+
+class AnalyticsEventStore:
+    """One columnar ring per tracked event type, addressable like the old analytics_data dict"""
+
+    def __init__(self, capacity: int = 100_000, spill_dir: str = None,
+                 schemas: Dict[str, Dict[str, str]] = None):
+        self.stores = {
+            name: ColumnarEventStore(name, schema, capacity, spill_dir)
+            for name, schema in (schemas or EVENT_SCHEMAS).items()
+        }
+
+    def __getitem__(self, name: str) -> ColumnarEventStore:
+        return self.stores[name]
+
+    def __iter__(self):
+        return iter(self.stores)
+
+    def items(self):
+        return self.stores.items()
+
+    def memory_usage(self) -> Dict[str, Any]:
+        per_store = {name: store.memory_usage() for name, store in self.stores.items()}
+        return {
+            'total_bytes': sum(usage['total_bytes'] for usage in per_store.values()),
+            'stores': per_store
+        }
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+AI Marketing Tools - Performance Analyzer Benchmarks
+Times every PerformanceAnalyzer stage and the full analysis on synthetic
+monitoring databases of increasing size, and records peak memory per stage.
+"""
+
+import argparse
+import json
+import os
+import resource
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Dict, List, Any, Callable, Tuple
+
+from generate_monitoring_data import MonitoringDataGenerator, parse_size
+from performance_analyzer import PerformanceAnalyzer
+
+DEFAULT_SIZES = ['10k', '100k', '1M']
+
+
+def measure(func: Callable, repeat: int = 1, track_memory: bool = True) -> Tuple[Dict[str, Any], Any]:
+    """Best-of-N wall time, plus a separate traced run for peak Python/NumPy allocations"""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start_time)
+
+    measurement = {'seconds': min(timings), 'runs': timings}
+
+    if track_memory:
+        tracemalloc.start()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        measurement['peak_memory_mb'] = peak / (1024 * 1024)
+
+    return measurement, result
+
+
+def benchmark_size(rows: int, work_dir: str, repeat: int, track_memory: bool) -> Dict[str, Any]:
+    """Generate one database and benchmark every analyzer stage against it"""
+    db_path = os.path.join(work_dir, f'monitoring_{rows}.db')
+    if not os.path.exists(db_path):
+        print(f"🧪 Generating {rows:,} rows...")
+        generation = MonitoringDataGenerator(db_path).generate(rows)
+    else:
+        generation = {'db_path': db_path, 'reused': True}
+
+    analyzer = PerformanceAnalyzer(
+        db_path,
+        snapshot_dir=os.path.join(work_dir, f'snapshots_{rows}'),
+        output_dir=os.path.join(work_dir, f'reports_{rows}')
+    )
+    sqlite_analyzer = PerformanceAnalyzer(
+        db_path,
+        use_snapshot=False,
+        output_dir=os.path.join(work_dir, f'reports_{rows}')
+    )
+
+    stages = {}
+
+    # The first snapshot load includes the initial SQLite -> columnar sync
+    stages['snapshot_initial_sync'], _ = measure(lambda: analyzer.load_monitoring_data(168), 1, False)
+    stages['load_monitoring_data'], monitoring_df = measure(
+        lambda: analyzer.load_monitoring_data(168), repeat, track_memory)
+    stages['load_monitoring_data_sqlite'], _ = measure(
+        lambda: sqlite_analyzer.load_monitoring_data(168), repeat, track_memory)
+    stages['load_system_metrics'], system_df = measure(
+        lambda: analyzer.load_system_metrics(168), repeat, track_memory)
+
+    stages['analyze_response_times'], response_analysis = measure(
+        lambda: analyzer.analyze_response_times(monitoring_df.copy()), repeat, track_memory)
+    stages['analyze_availability'], availability_analysis = measure(
+        lambda: analyzer.analyze_availability(monitoring_df.copy()), repeat, track_memory)
+    stages['analyze_system_performance'], system_analysis = measure(
+        lambda: analyzer.analyze_system_performance(system_df.copy()), repeat, track_memory)
+    stages['detect_performance_regressions'], _ = measure(
+        lambda: analyzer.detect_performance_regressions(monitoring_df), repeat, track_memory)
+    stages['run_full_analysis'], _ = measure(
+        lambda: analyzer.run_full_analysis(168), 1, track_memory)
+
+    return {
+        'rows': rows,
+        'loaded_monitoring_rows': len(monitoring_df),
+        'loaded_system_rows': len(system_df),
+        'generation': generation,
+        'stages': stages,
+        'process_max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    }
+
+
+def print_results(results: List[Dict[str, Any]]):
+    """Print a compact stage x size table"""
+    stage_names = list(results[0]['stages'])
+    header = f"{'stage':<34}" + ''.join(f"{result['rows']:>16,}" for result in results)
+    print("\n📊 ANALYZER BENCHMARK (seconds / peak MB)")
+    print(header)
+    print("-" * len(header))
+    for stage in stage_names:
+        cells = []
+        for result in results:
+            measurement = result['stages'][stage]
+            peak = measurement.get('peak_memory_mb')
+            cells.append(f"{measurement['seconds']:>8.3f}s" + (f" {peak:>6.0f}" if peak is not None else " " * 7))
+        print(f"{stage:<34}" + ''.join(f"{cell:>16}" for cell in cells))
+
+
+def main():
+    """Run the analyzer benchmark suite"""
+    parser = argparse.ArgumentParser(description='Benchmark PerformanceAnalyzer at scale')
+    parser.add_argument('--sizes', nargs='+', default=DEFAULT_SIZES,
+                        help='monitoring_logs row counts, e.g. 10k 1M 50M')
+    parser.add_argument('--work-dir', default=None, help='where generated databases are kept (reused if present)')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc peak-memory runs')
+    parser.add_argument('--output', default=None, help='write results as JSON to this path')
+    args = parser.parse_args()
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix='analyzer_bench_')
+    os.makedirs(work_dir, exist_ok=True)
+
+    results = []
+    for size in args.sizes:
+        rows = parse_size(size)
+        print(f"\n⏱️  Benchmarking {rows:,} rows in {work_dir}")
+        results.append(benchmark_size(rows, work_dir, args.repeat, not args.no_memory))
+
+    print_results(results)
+
+    output_path = args.output or os.path.join(
+        work_dir, f"analyzer_benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(output_path, 'w') as f:
+        json.dump({'generated_at': datetime.now().isoformat(), 'results': results}, f, indent=2, default=str)
+    print(f"\n📁 Benchmark results saved to: {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+AI Marketing Tools - Import-Time Budgets
+Measures module import cost with `python -X importtime` in fresh interpreters
+and fails when a module goes over its budget or pulls in a heavy stack eagerly.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List, Any
+
+HEAVY_MODULES = ['pandas', 'numpy', 'matplotlib', 'seaborn', 'plotly', 'pyarrow']
+
+# Cumulative import time budget (ms) and modules that must not be loaded by the import
+IMPORT_BUDGETS = {
+    'analytics_dashboard': {'max_ms': 400, 'forbidden': HEAVY_MODULES},
+    'performance_analyzer': {'max_ms': 200, 'forbidden': HEAVY_MODULES},
+    'monitoring_snapshot': {'max_ms': 150, 'forbidden': HEAVY_MODULES},
+    'sketches': {'max_ms': 100, 'forbidden': HEAVY_MODULES}
+}
+
+
+def measure_import(module: str) -> Dict[str, Any]:
+    """Import a module in a fresh interpreter and return its cumulative time and loaded modules"""
+    code = f"import {module}, sys, json; print(json.dumps(sorted(sys.modules)))"
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{completed.stderr[-2000:]}")
+
+    cumulative_us = None
+    for line in completed.stderr.splitlines():
+        # Format: "import time: self [us] | cumulative | imported package"
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) == 3 and parts[2].strip() == module:
+            cumulative_us = int(parts[1])
+
+    return {
+        'cumulative_ms': cumulative_us / 1000 if cumulative_us is not None else None,
+        'modules': set(json.loads(completed.stdout.strip().splitlines()[-1]))
+    }
+
+
+def check_budgets(budgets: Dict[str, Dict[str, Any]], repeat: int = 3) -> List[Dict[str, Any]]:
+    """Best-of-N import time per module, compared against its budget"""
+    results = []
+    for module, budget in budgets.items():
+        runs = [measure_import(module) for _ in range(repeat)]
+        best_ms = min(run['cumulative_ms'] for run in runs)
+        loaded_heavy = sorted({
+            name for name in runs[0]['modules']
+            for forbidden in budget['forbidden']
+            if name == forbidden or name.startswith(forbidden + '.')
+        })
+        eager = sorted({name.split('.')[0] for name in loaded_heavy})
+
+        results.append({
+            'module': module,
+            'import_ms': best_ms,
+            'budget_ms': budget['max_ms'],
+            'eager_heavy_imports': eager,
+            'passed': best_ms <= budget['max_ms'] and not eager
+        })
+    return results
+
+
+def main():
+    """Check import-time budgets and exit non-zero on any violation"""
+    parser = argparse.ArgumentParser(description='Enforce import-time budgets')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--modules', nargs='+', default=list(IMPORT_BUDGETS))
+    args = parser.parse_args()
+
+    results = check_budgets({module: IMPORT_BUDGETS[module] for module in args.modules}, args.repeat)
+
+    print("⏱️  IMPORT-TIME BUDGETS")
+    for result in results:
+        status = "✅" if result['passed'] else "❌"
+        eager = f" eager: {', '.join(result['eager_heavy_imports'])}" if result['eager_heavy_imports'] else ""
+        print(f"  {status} {result['module']:<24} {result['import_ms']:>8.1f}ms / {result['budget_ms']}ms{eager}")
+
+    if not all(result['passed'] for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
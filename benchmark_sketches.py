@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+AI Marketing Tools - Sketch Accuracy Checks
+Validates the streaming sketches used by the analytics aggregation layer
+against exact answers on synthetic data and exits non-zero when an estimate
+falls outside its documented error bounds.
+"""
+
+import argparse
+import sys
+
+from sketches import hyperloglog_accuracy
+
+DEFAULT_CARDINALITIES = [100, 1_000, 10_000, 100_000]
+
+
+def main():
+    """Run the sketch accuracy checks and exit non-zero on any failure"""
+    parser = argparse.ArgumentParser(description='Validate sketch accuracy against exact counts')
+    parser.add_argument('--cardinalities', nargs='+', type=int, default=DEFAULT_CARDINALITIES)
+    parser.add_argument('--precision', type=int, default=12, help='HyperLogLog precision (2**p registers)')
+    parser.add_argument('--trials', type=int, default=3)
+    parser.add_argument('--sigmas', type=float, default=3.0, help='Allowed error in standard errors')
+    args = parser.parse_args()
+
+    results = hyperloglog_accuracy(args.cardinalities, args.precision, args.trials, args.sigmas)
+
+    print(f"🔢 HYPERLOGLOG ACCURACY (p={args.precision}, ±{args.sigmas:g}σ)")
+    for result in results:
+        status = "✅" if result['within_bounds'] else "❌"
+        print(f"  {status} {result['cardinality']:>10,} distinct  "
+              f"mean {result['mean_abs_error']:.2%}  max {result['max_abs_error']:.2%}  "
+              f"(σ {result['expected_relative_error']:.2%})"
+              f"{'' if result['merge_consistent'] else '  merge mismatch'}")
+
+    if not all(result['within_bounds'] for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
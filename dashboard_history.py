@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+AI Marketing Tools - Dashboard History Store
+Append-only history of fetched dashboard payloads: one gzip NDJSON segment per
+day plus a fixed-width timestamp index, so any past moment can be looked up
+without decompressing the whole history.
+"""
+
+import bisect
+import gzip
+import json
+import os
+import struct
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Iterable, Optional, Tuple, Union
+
+# Index record: fetch time (epoch seconds), byte offset and length of its gzip member
+INDEX_RECORD = struct.Struct('<dQI')
+
+PERIOD_FORMATS = {
+    'hour': '%Y-%m-%d %H:00',
+    'day': '%Y-%m-%d',
+    'month': '%Y-%m'
+}
+
+
+def parse_timestamp(value: Union[str, datetime, None]) -> datetime:
+    """Accept a datetime or an ISO string; None means now"""
+    if value is None:
+        return datetime.now()
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+class DashboardHistoryStore:
+    """Day-segmented, timestamp-indexed history of dashboard source payloads
+
+    Every append writes the record as its own gzip member at the end of the
+    day's segment and then its (timestamp, offset, length) to the index, so a
+    lookup is a bisect over the index plus one small decompression. An
+    interrupted append can leave a partial index record or entries pointing
+    past the end of the segment: readers ignore them and the next append
+    cuts them off, so later entries stay aligned.
+    """
+
+    def __init__(self, history_dir: str, max_lookback_days: int = 31):
+        self.history_dir = history_dir
+        self.max_lookback_days = max_lookback_days
+        self._lock = threading.Lock()
+        self._index_cache = {}
+
+    def _paths(self, day: str) -> Tuple[str, str]:
+        base = os.path.join(self.history_dir, day)
+        return base + '.ndjson.gz', base + '.idx'
+
+    def days(self) -> List[str]:
+        """Days that have a history segment, oldest first"""
+        if not os.path.isdir(self.history_dir):
+            return []
+        return sorted(name[:-len('.idx')] for name in os.listdir(self.history_dir) if name.endswith('.idx'))
+
+    def append(self, sources: Dict[str, Any], timestamp: datetime = None) -> Optional[Dict[str, Any]]:
+        """Store freshly fetched source payloads as one history record"""
+        if not sources:
+            return None
+
+        timestamp = timestamp or datetime.now()
+        record = {'timestamp': timestamp.isoformat(), 'sources': sources}
+        line = json.dumps(record, separators=(',', ':'), default=str) + '\n'
+        member = gzip.compress(line.encode('utf-8'))
+        day = timestamp.strftime('%Y-%m-%d')
+        data_path, index_path = self._paths(day)
+
+        with self._lock:
+            os.makedirs(self.history_dir, exist_ok=True)
+            self._repair_index(data_path, index_path)
+            with open(data_path, 'ab') as f:
+                offset = f.tell()
+                f.write(member)
+            # The index is written last so it never points at a partially written record
+            with open(index_path, 'ab') as f:
+                f.write(INDEX_RECORD.pack(timestamp.timestamp(), offset, len(member)))
+
+        return {'day': day, 'offset': offset, 'bytes': len(member)}
+
+    @staticmethod
+    def _repair_index(data_path: str, index_path: str):
+        """Truncate a torn index tail: a partial record, or entries past the end of the segment"""
+        if not os.path.exists(index_path):
+            return
+        index_size = os.path.getsize(index_path)
+        data_size = os.path.getsize(data_path) if os.path.exists(data_path) else 0
+        usable = index_size - index_size % INDEX_RECORD.size
+
+        with open(index_path, 'r+b') as f:
+            while usable:
+                f.seek(usable - INDEX_RECORD.size)
+                _, offset, length = INDEX_RECORD.unpack(f.read(INDEX_RECORD.size))
+                if offset + length <= data_size:
+                    break
+                usable -= INDEX_RECORD.size
+            if usable != index_size:
+                f.truncate(usable)
+                print(f"⚠️  Dropped {index_size - usable} torn bytes from {os.path.basename(index_path)}")
+
+    def _load_index(self, day: str) -> List[Tuple[float, int, int]]:
+        """Sorted (epoch, offset, length) entries of one day, cached until the index grows"""
+        data_path, index_path = self._paths(day)
+        if not os.path.exists(index_path) or not os.path.exists(data_path):
+            return []
+
+        index_size = os.path.getsize(index_path)
+        cached = self._index_cache.get(day)
+        if cached and cached[0] == index_size:
+            return cached[1]
+
+        with open(index_path, 'rb') as f:
+            raw = f.read()
+        data_size = os.path.getsize(data_path)
+        usable = len(raw) - len(raw) % INDEX_RECORD.size
+        entries = sorted(
+            entry for entry in INDEX_RECORD.iter_unpack(raw[:usable])
+            if entry[1] + entry[2] <= data_size
+        )
+
+        self._index_cache[day] = (index_size, entries)
+        return entries
+
+    def _read_record(self, day: str, offset: int, length: int) -> Dict[str, Any]:
+        data_path, _ = self._paths(day)
+        with open(data_path, 'rb') as f:
+            f.seek(offset)
+            member = f.read(length)
+        return json.loads(gzip.decompress(member))
+
+    def _days_between(self, start: datetime, end: datetime) -> List[str]:
+        first, last = start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')
+        return [day for day in self.days() if first <= day <= last]
+
+    def _records_before(self, day: str, cutoff: float) -> Iterable[Dict[str, Any]]:
+        """Records of one day at or before cutoff, newest first"""
+        entries = self._load_index(day)
+        position = bisect.bisect_right(entries, (cutoff, float('inf'), float('inf')))
+        for _, offset, length in reversed(entries[:position]):
+            yield self._read_record(day, offset, length)
+
+    def as_of(self, when: Union[str, datetime, None] = None,
+              sources: Iterable[str] = None) -> Dict[str, Any]:
+        """Latest stored payload of each source at or before `when`
+
+        Returns {'data': {source: payload}, 'timestamps': {source: stored_at}};
+        sources with no record in the lookback window are left out.
+        """
+        when = parse_timestamp(when)
+        cutoff = when.timestamp()
+        wanted = set(sources) if sources is not None else None
+        data, timestamps = {}, {}
+
+        for day in reversed(self._days_between(when - timedelta(days=self.max_lookback_days), when)):
+            for record in self._records_before(day, cutoff):
+                for source, payload in record['sources'].items():
+                    if source not in data and (wanted is None or source in wanted):
+                        data[source] = payload
+                        timestamps[source] = record['timestamp']
+                if wanted is None or wanted <= set(data):
+                    return {'data': data, 'timestamps': timestamps}
+
+        return {'data': data, 'timestamps': timestamps}
+
+    def latest_timestamp(self, before: Union[str, datetime, None] = None) -> Optional[float]:
+        """Epoch of the newest record at or before `before` (None if there is none)"""
+        before = parse_timestamp(before)
+        cutoff = before.timestamp()
+        for day in reversed(self._days_between(before - timedelta(days=self.max_lookback_days), before)):
+            entries = self._load_index(day)
+            position = bisect.bisect_right(entries, (cutoff, float('inf'), float('inf')))
+            if position:
+                return entries[position - 1][0]
+        return None
+
+    def collect(self, fields: Dict[str, Tuple[str, str]], start: Union[str, datetime],
+                end: Union[str, datetime, None] = None, period: str = 'day') -> Dict[str, List[Dict[str, Any]]]:
+        """Last stored value of several (source, dotted field) pairs per period, in one pass
+
+        For daily and monthly periods a day's records are read newest first
+        and only until every field has a value, so a trend usually costs one
+        decompression per day.
+        """
+        start, end = parse_timestamp(start), parse_timestamp(end)
+        period_format = PERIOD_FORMATS[period]
+        points = {name: {} for name in fields}
+
+        for day in self._days_between(start, end):
+            pending = set(fields)
+            for record in self._records_before(day, end.timestamp()):
+                stored_at = datetime.fromisoformat(record['timestamp'])
+                if stored_at < start:
+                    break
+
+                key = stored_at.strftime(period_format)
+                for name in list(pending):
+                    source, field = fields[name]
+                    value = record['sources'].get(source)
+                    for part in field.split('.'):
+                        value = value.get(part) if isinstance(value, dict) else None
+                    if value is None:
+                        continue
+
+                    if key not in points[name] or points[name][key]['timestamp'] < record['timestamp']:
+                        points[name][key] = {'period': key, 'timestamp': record['timestamp'], 'value': value}
+                    if period != 'hour':
+                        pending.discard(name)
+
+                if not pending:
+                    break
+
+        return {name: [by_key[key] for key in sorted(by_key)] for name, by_key in points.items()}
+
+    def series(self, source: str, field: str, start: Union[str, datetime],
+               end: Union[str, datetime, None] = None, period: str = 'day') -> List[Dict[str, Any]]:
+        """Last stored value of a (dotted) field per period between start and end"""
+        return self.collect({'value': (source, field)}, start, end, period)['value']
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Record count and on-disk size of the history"""
+        days = self.days()
+        records = sum(len(self._load_index(day)) for day in days)
+        size = sum(os.path.getsize(path) for day in days for path in self._paths(day) if os.path.exists(path))
+        return {
+            'days': len(days),
+            'records': records,
+            'size_kb': size / 1024,
+            'first_day': days[0] if days else None,
+            'last_day': days[-1] if days else None
+        }
@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""
+AI Marketing Tools - Live Dashboard Server
+Serves the analytics dashboards from memory and pushes incremental figure
+updates to every connected browser over Server-Sent Events.
+"""
+
+import argparse
+import base64
+import json
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+from flask import Flask, Response, jsonify, request
+
+from analytics_dashboard import AIMarketingAnalyticsDashboard
+from lazy_imports import LazyModule
+
+np = LazyModule('numpy')
+
+LIVE_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>AI Marketing Tools - Live Analytics</title>
+<style>
+  body { margin: 0; font-family: Arial, sans-serif; background: __BACKGROUND__; color: __TEXT__; }
+  nav { display: flex; gap: 4px; padding: 12px 16px 0; border-bottom: 2px solid __PRIMARY__; align-items: end; }
+  nav button { border: none; padding: 10px 18px; cursor: pointer; background: #E8F8F7; color: __TEXT__;
+               font-size: 15px; border-radius: 6px 6px 0 0; }
+  nav button.active { background: __PRIMARY__; color: white; }
+  #live { margin-left: auto; padding: 10px; font-size: 13px; color: #7F8C8D; }
+  .tab { display: none; padding: 8px 16px; }
+  .tab.active { display: block; }
+</style>
+<script src="/assets/plotly.min.js"></script>
+</head>
+<body>
+<nav id="tabs"><span id="live">connecting...</span></nav>
+<main id="panels"></main>
+<script>
+  let version = null;
+  let active = null;
+  const figures = {};
+  const plotted = {};
+
+  function panel(name) { return document.getElementById('panel-' + name); }
+
+  function plot(name) {
+    Plotly.react(panel(name), figures[name].data, figures[name].layout, {responsive: true});
+    plotted[name] = true;
+  }
+
+  function showTab(name) {
+    active = name;
+    Object.keys(figures).forEach(n => {
+      document.getElementById('tab-' + n).classList.toggle('active', n === name);
+      panel(n).classList.toggle('active', n === name);
+    });
+    if (!plotted[name]) { plot(name); } else { Plotly.Plots.resize(panel(name)); }
+  }
+
+  function loadAll() {
+    return fetch('/api/figures').then(r => r.json()).then(payload => {
+      version = payload.version;
+      Object.entries(payload.figures).forEach(([name, entry]) => {
+        if (!document.getElementById('tab-' + name)) {
+          const button = document.createElement('button');
+          button.id = 'tab-' + name;
+          button.textContent = entry.title;
+          button.onclick = () => showTab(name);
+          document.getElementById('tabs').insertBefore(button, document.getElementById('live'));
+          const div = document.createElement('div');
+          div.id = 'panel-' + name;
+          div.className = 'tab';
+          document.getElementById('panels').appendChild(div);
+        }
+        figures[name] = entry.figure;
+        plotted[name] = false;
+      });
+      showTab(active || Object.keys(figures)[0]);
+    });
+  }
+
+  function applyUpdate(update) {
+    if (update.base_version !== version) { return loadAll(); }
+    version = update.version;
+    update.changes.forEach(change => {
+      const name = change.dashboard;
+      if (!plotted[name] || change.ops.some(op => op.op === 'replace')) {
+        const replace = change.ops.find(op => op.op === 'replace');
+        if (replace) { figures[name] = replace.figure; plotted[name] = false; if (name === active) plot(name); }
+        else { fetch('/api/figures/' + name).then(r => r.json()).then(entry => { figures[name] = entry.figure; }); }
+        return;
+      }
+      change.ops.forEach(op => {
+        if (op.op === 'extend') { Plotly.extendTraces(panel(name), op.update, [op.trace]); }
+        else if (op.op === 'restyle') { Plotly.restyle(panel(name), op.update, [op.trace]); }
+        else if (op.op === 'relayout') { Plotly.relayout(panel(name), op.update); }
+      });
+    });
+  }
+
+  loadAll().then(() => {
+    const source = new EventSource('/events');
+    source.addEventListener('update', event => {
+      applyUpdate(JSON.parse(event.data));
+      document.getElementById('live').textContent = 'live · updated ' + new Date().toLocaleTimeString();
+    });
+    source.addEventListener('resync', () => loadAll());
+    source.onopen = () => { document.getElementById('live').textContent = 'live'; loadAll(); };
+    source.onerror = () => { document.getElementById('live').textContent = 'reconnecting...'; };
+  });
+</script>
+</body>
+</html>
+"""
+
+
+def plain_json(value: Any) -> Any:
+    """Decode plotly's typed-array encoding ({'dtype', 'bdata'}) into plain lists"""
+    if isinstance(value, dict):
+        if 'bdata' in value and 'dtype' in value:
+            array = np.frombuffer(base64.b64decode(value['bdata']), dtype=value['dtype'])
+            if 'shape' in value:
+                shape = [int(dim) for dim in str(value['shape']).split(',')]
+                array = array.reshape(shape)
+            return array.tolist()
+        return {key: plain_json(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [plain_json(item) for item in value]
+    return value
+
+
+def _extension(old_trace: Dict[str, Any], new_trace: Dict[str, Any]) -> Optional[Dict[str, List]]:
+    """Return the appended points if new_trace only extends old_trace's x/y arrays"""
+    changed = {key for key in set(old_trace) | set(new_trace) if old_trace.get(key) != new_trace.get(key)}
+    if not changed or not changed <= {'x', 'y'}:
+        return None
+
+    appended = {}
+    for key in ('x', 'y'):
+        old_values, new_values = old_trace.get(key), new_trace.get(key)
+        if old_values is None and new_values is None:
+            continue
+        if not isinstance(old_values, list) or not isinstance(new_values, list):
+            return None
+        if len(new_values) <= len(old_values) or new_values[:len(old_values)] != old_values:
+            return None
+        appended[key] = [new_values[len(old_values):]]
+
+    lengths = {len(values[0]) for values in appended.values()}
+    return appended if appended and len(lengths) == 1 else None
+
+
+def diff_figures(old: Optional[Dict[str, Any]], new: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Smallest set of Plotly operations turning figure `old` into `new`"""
+    old_traces = old.get('data', []) if old else None
+    new_traces = new.get('data', [])
+
+    if (old_traces is None or len(old_traces) != len(new_traces)
+            or any(o.get('type') != n.get('type') for o, n in zip(old_traces, new_traces))):
+        return [{'op': 'replace', 'figure': new}]
+
+    ops = []
+    for index, (old_trace, new_trace) in enumerate(zip(old_traces, new_traces)):
+        if old_trace == new_trace:
+            continue
+
+        appended = _extension(old_trace, new_trace)
+        if appended:
+            ops.append({'op': 'extend', 'trace': index, 'update': appended})
+            continue
+
+        # restyle expects one value per targeted trace, hence the single-item lists
+        ops.append({
+            'op': 'restyle',
+            'trace': index,
+            'update': {
+                key: [new_trace.get(key)]
+                for key in set(old_trace) | set(new_trace)
+                if key != 'type' and old_trace.get(key) != new_trace.get(key)
+            }
+        })
+
+    old_layout, new_layout = old.get('layout', {}), new.get('layout', {})
+    if old_layout != new_layout:
+        ops.append({
+            'op': 'relayout',
+            'update': {
+                key: new_layout.get(key)
+                for key in set(old_layout) | set(new_layout)
+                if old_layout.get(key) != new_layout.get(key)
+            }
+        })
+
+    return ops
+
+
+class DashboardLiveServer:
+    """In-memory dashboard state shared by all viewers, refreshed by a single poller"""
+
+    def __init__(self, dashboard: AIMarketingAnalyticsDashboard = None,
+                 poll_interval: float = 60.0,
+                 heartbeat_seconds: float = 15.0,
+                 subscriber_queue_size: int = 100):
+        self.dashboard = dashboard or AIMarketingAnalyticsDashboard()
+        self.poll_interval = poll_interval
+        self.heartbeat_seconds = heartbeat_seconds
+        self.subscriber_queue_size = subscriber_queue_size
+
+        self.data: Dict[str, Any] = {}
+        self.figures: Dict[str, Dict[str, Any]] = {}
+        self.input_hashes: Dict[str, str] = {}
+        self.version = 0
+        self.stats = {'polls': 0, 'updates_published': 0, 'last_poll': None,
+                      'last_poll_seconds': None, 'last_error': None}
+
+        self._lock = threading.Lock()
+        self._subscribers: List[queue.Queue] = []
+        self._stop = threading.Event()
+        self._poller = None
+        self._plotly_js = None
+
+    def poll_once(self) -> List[Dict[str, Any]]:
+        """Fetch data once, rebuild changed dashboards and publish their diffs
+
+        Changed figures are built into new dicts and swapped in with the
+        version bump and the publish in one critical section, so a snapshot
+        from /api/figures always carries the version its figures belong to.
+        """
+        start_time = time.perf_counter()
+        data = self.dashboard.fetch_analytics_data()
+        figures, input_hashes = dict(self.figures), dict(self.input_hashes)
+        changes = []
+
+        for name, (source, builder, _, _) in self.dashboard.DASHBOARDS.items():
+            input_hash = self.dashboard.hash_dashboard_input(data[source])
+            if input_hashes.get(name) == input_hash:
+                continue
+
+            fig = getattr(self.dashboard, builder)(data)
+            figure = plain_json(json.loads(fig.to_json()))
+            ops = diff_figures(figures.get(name), figure)
+
+            figures[name] = figure
+            input_hashes[name] = input_hash
+            if ops:
+                changes.append({'dashboard': name, 'ops': ops})
+
+        with self._lock:
+            self.data = data
+            self.figures = figures
+            self.input_hashes = input_hashes
+            if changes:
+                base_version = self.version
+                self.version += 1
+                self._publish('update', {'version': self.version, 'base_version': base_version, 'changes': changes})
+            self.stats['polls'] += 1
+            self.stats['last_poll'] = datetime.now().isoformat()
+            self.stats['last_poll_seconds'] = time.perf_counter() - start_time
+
+        return changes
+
+    def _publish(self, event: str, payload: Dict[str, Any]):
+        """Serialize once and fan out to every subscriber (caller holds the lock)"""
+        message = (event, json.dumps(payload, default=str))
+        for subscriber in self._subscribers:
+            try:
+                subscriber.put_nowait(message)
+            except queue.Full:
+                # A viewer that fell behind gets its backlog dropped and reloads everything
+                while not subscriber.empty():
+                    try:
+                        subscriber.get_nowait()
+                    except queue.Empty:
+                        break
+                subscriber.put_nowait(('resync', '{}'))
+        self.stats['updates_published'] += 1
+
+    def subscribe(self) -> queue.Queue:
+        subscriber = queue.Queue(maxsize=self.subscriber_queue_size)
+        with self._lock:
+            self._subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: queue.Queue):
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+    def start_polling(self) -> threading.Thread:
+        """Start the single background poller shared by all viewers"""
+        def polling_loop():
+            while not self._stop.is_set():
+                try:
+                    self.poll_once()
+                    self.stats['last_error'] = None
+                except Exception as e:
+                    self.stats['last_error'] = str(e)
+                    print(f"Error polling dashboard data: {e}")
+                self._stop.wait(self.poll_interval)
+
+        self._poller = threading.Thread(target=polling_loop, daemon=True)
+        self._poller.start()
+        return self._poller
+
+    def stop(self):
+        self._stop.set()
+
+    def figure_entry(self, name: str) -> Dict[str, Any]:
+        figure = self.figures[name]
+        return {'title': figure.get('layout', {}).get('title', {}).get('text') or name, 'figure': figure}
+
+    def create_app(self) -> Flask:
+        """Flask app serving the live page, figure snapshots and the SSE stream"""
+        app = Flask(__name__)
+        colors = self.dashboard.colors
+
+        @app.route('/')
+        def index():
+            page = (LIVE_TEMPLATE
+                    .replace('__BACKGROUND__', colors['background'])
+                    .replace('__TEXT__', colors['text_dark'])
+                    .replace('__PRIMARY__', colors['primary_teal']))
+            return Response(page, mimetype='text/html')
+
+        @app.route('/assets/plotly.min.js')
+        def plotly_js():
+            if self._plotly_js is None:
+                from plotly.offline import get_plotlyjs
+                self._plotly_js = get_plotlyjs()
+            return Response(self._plotly_js, mimetype='application/javascript',
+                            headers={'Cache-Control': 'public, max-age=86400'})
+
+        @app.route('/api/figures')
+        def all_figures():
+            with self._lock:
+                return jsonify({
+                    'version': self.version,
+                    'figures': {name: self.figure_entry(name) for name in self.figures}
+                })
+
+        @app.route('/api/figures/<name>')
+        def one_figure(name):
+            with self._lock:
+                if name not in self.figures:
+                    return jsonify({'error': f'Unknown dashboard: {name}'}), 404
+                return jsonify(self.figure_entry(name))
+
+        @app.route('/api/status')
+        def status():
+            with self._lock:
+                return jsonify({
+                    'version': self.version,
+                    'viewers': len(self._subscribers),
+                    'poll_interval_seconds': self.poll_interval,
+                    'data_sources': self.dashboard.last_fetch_report,
+                    **self.stats
+                })
+
+        @app.route('/api/summary')
+        def summary():
+            # Served from the summary engine's cache; never triggers a fetch or a render
+            try:
+                return jsonify(self.dashboard.generate_executive_summary(
+                    request.args.get('period', 'week'), request.args.get('as_of')))
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+
+        @app.route('/events')
+        def events():
+            subscriber = self.subscribe()
+
+            def stream():
+                try:
+                    with self._lock:
+                        version = self.version
+                    yield f"event: hello\ndata: {json.dumps({'version': version})}\n\n"
+                    while not self._stop.is_set():
+                        try:
+                            event, message = subscriber.get(timeout=self.heartbeat_seconds)
+                        except queue.Empty:
+                            yield ": keep-alive\n\n"
+                            continue
+                        yield f"event: {event}\ndata: {message}\n\n"
+                finally:
+                    self.unsubscribe(subscriber)
+
+            return Response(stream(), mimetype='text/event-stream',
+                            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+        return app
+
+    def run(self, host: str = '127.0.0.1', port: int = 8050):
+        """Poll once so the first viewer sees data, then serve until interrupted"""
+        print("📊 Fetching initial dashboard data...")
+        self.poll_once()
+        self.start_polling()
+        print(f"🚀 Live dashboards at http://{host}:{port}/ (polling every {self.poll_interval:.0f}s)")
+        try:
+            self.create_app().run(host=host, port=port, threaded=True)
+        finally:
+            self.stop()
+
+
+def main():
+    """Run the live dashboard server"""
+    parser = argparse.ArgumentParser(description='Serve live AI Marketing Tools dashboards')
+    parser.add_argument('--api-base-url', default="http://localhost:5000/api")
+    parser.add_argument('--output-dir', default=None, help='directory whose history/ receives every fetch')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8050)
+    parser.add_argument('--poll-interval', type=float, default=60.0, help='seconds between backend polls')
+    args = parser.parse_args()
+
+    dashboard = AIMarketingAnalyticsDashboard(args.api_base_url, output_dir=args.output_dir)
+    server = DashboardLiveServer(dashboard, poll_interval=args.poll_interval)
+    server.run(args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
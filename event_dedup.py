@@ -0,0 +1,187 @@
+"""
+AI Marketing Tools - Event Deduplication
+Drops client retries of already-tracked events by their optional client
+`event_id`, within a bounded time window and memory budget.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from operator import itemgetter
+from typing import Dict, List, Any, Hashable, Optional, Tuple
+
+from analytics_rollups import event_epoch
+from sketches import RotatingBloomFilter
+
+DEDUP_MODES = ('bloom', 'lru')
+MAX_EVENT_ID_LENGTH = 128
+
+# Approximate bytes per remembered key in an ExpiringKeySet (dict entry, tuple and strings)
+EXACT_KEY_BYTES = 256
+
+# Share of the memory budget reserved for exact conversion keys in bloom mode
+# (half in lru mode), unless max_conversion_keys is given
+CONVERSION_BUDGET_SHARE = 0.25
+
+
+class ExpiringKeySet:
+    """Exact "seen within the last window" set, bounded to max_keys (least recently added dropped first)"""
+
+    def __init__(self, window: float, max_keys: int):
+        self.window = window
+        self.max_keys = max(1, max_keys)
+        self._added: 'OrderedDict[Hashable, float]' = OrderedDict()
+        self.evicted = 0
+
+    def _expire(self, now: float):
+        added = self._added
+        cutoff = now - self.window
+        while added:
+            key, timestamp = next(iter(added.items()))
+            if timestamp > cutoff:
+                break
+            del added[key]
+
+    def add(self, key: Hashable, now: float) -> bool:
+        """Remember key; returns True if it was already seen within the window"""
+        self._expire(now)
+        if key in self._added:
+            return True
+        self._added[key] = now
+        if len(self._added) > self.max_keys:
+            self._added.popitem(last=False)
+            self.evicted += 1
+        return False
+
+    def discard(self, key: Hashable):
+        self._added.pop(key, None)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._added
+
+    def __len__(self) -> int:
+        return len(self._added)
+
+
+class EventDeduplicator:
+    """Decides whether a tracked event is a retry of one seen in the last `window` seconds
+
+    Only events carrying an `event_id` are checked. Conversions are keyed
+    exactly by (user_id, conversion_type, event_id); other events by
+    (event type, event_id) in a RotatingBloomFilter ('bloom' mode, fixed
+    memory, rare false positives) or in an exact bounded set ('lru' mode).
+    Ids keep their JSON type, so 1 and "1" are different events. Conversion
+    keys are exact up to max_conversion_keys within the window (by default
+    what their share of memory_bytes holds, 8192 keys for 8 MB in bloom
+    mode); beyond that the oldest are forgotten and counted as evicted.
+    Keys of events that could not be queued are released so the client's
+    retry is accepted.
+    """
+
+    def __init__(self, window: float = 3600, memory_bytes: int = 8 << 20, mode: str = 'bloom',
+                 max_conversion_keys: Optional[int] = None):
+        if mode not in DEDUP_MODES:
+            raise ValueError(f"mode must be one of {', '.join(DEDUP_MODES)}")
+
+        self.window = window
+        self.memory_bytes = memory_bytes
+        self.mode = mode
+        self._lock = threading.Lock()
+
+        if max_conversion_keys is not None:
+            conversion_bytes = max_conversion_keys * EXACT_KEY_BYTES
+            if conversion_bytes >= memory_bytes:
+                raise ValueError("max_conversion_keys does not fit in memory_bytes")
+        elif mode == 'bloom':
+            conversion_bytes = int(memory_bytes * CONVERSION_BUDGET_SHARE)
+        else:
+            conversion_bytes = memory_bytes // 2
+        if mode == 'bloom':
+            self.events = RotatingBloomFilter(window, memory_bytes - conversion_bytes)
+        else:
+            self.events = ExpiringKeySet(window, (memory_bytes - conversion_bytes) // EXACT_KEY_BYTES)
+        self.conversions = ExpiringKeySet(window, conversion_bytes // EXACT_KEY_BYTES)
+        # Bloom bits cannot be cleared, so released keys are exempted here until seen again
+        self._released = ExpiringKeySet(window, 10_000)
+
+        self.stats = {'checked': 0, 'duplicates': 0, 'released': 0}
+
+    @staticmethod
+    def event_key(storage: str, record: Dict[str, Any]) -> Optional[Hashable]:
+        """Dedup key of a built record, or None when the client sent no event_id"""
+        event_id = record.get('event_id')
+        if event_id is None:
+            return None
+        if storage == 'conversion_events':
+            return (record.get('user_id'), record.get('conversion_type'), event_id)
+        # repr keeps integer and string ids apart (1 vs '1')
+        return f"{storage}:{event_id!r}"
+
+    def _structure(self, key: Hashable):
+        return self.conversions if isinstance(key, tuple) else self.events
+
+    def check(self, storage: str, record: Dict[str, Any], now: float = None) -> Tuple[bool, Optional[Hashable]]:
+        """(is_duplicate, key) for a built record; the key is remembered unless it is a duplicate
+
+        Callers pass the keys of records they then fail to store to release().
+        """
+        key = self.event_key(storage, record)
+        if key is None:
+            return False, None
+        now = time.monotonic() if now is None else now
+
+        with self._lock:
+            self.stats['checked'] += 1
+            seen = self._structure(key).add(key, now)
+            if seen and key in self._released:
+                self._released.discard(key)
+                seen = False
+            if seen:
+                self.stats['duplicates'] += 1
+                return True, None
+        return False, key
+
+    def release(self, keys: List[Hashable]):
+        """Forget keys of events that were not stored, so their retries are accepted"""
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                self.stats['released'] += 1
+                structure = self._structure(key)
+                if isinstance(structure, ExpiringKeySet):
+                    structure.discard(key)
+                else:
+                    self._released.add(key, now)
+
+    def remember(self, storage: str, records: List[Dict[str, Any]]):
+        """Seed the window from already-stored records (event log replay after a restart)
+
+        Keys are stamped with their event time, so they leave the window when
+        they would have without the restart.
+        """
+        offset = time.monotonic() - time.time()
+        stamped = sorted(((event_epoch(record) + offset, key) for key, record in
+                          ((self.event_key(storage, record), record) for record in records) if key is not None),
+                         key=itemgetter(0))
+        with self._lock:
+            for stamp, key in stamped:
+                self._structure(key).add(key, stamp)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {
+                **self.stats,
+                'mode': self.mode,
+                'window_seconds': self.window,
+                'memory_budget_bytes': self.memory_bytes,
+                'conversion_keys': len(self.conversions),
+                'conversion_key_capacity': self.conversions.max_keys,
+                'conversion_keys_evicted': self.conversions.evicted
+            }
+            if self.mode == 'bloom':
+                stats['bloom_false_positive_rate'] = round(self.events.false_positive_rate(), 6)
+                stats['bloom_capacity_per_generation'] = self.events.capacity
+            else:
+                stats['event_keys'] = len(self.events)
+                stats['event_keys_evicted'] = self.events.evicted
+            return stats
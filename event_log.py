@@ -0,0 +1,431 @@
+"""
+AI Marketing Tools - Analytics Event Log
+Durable, append-only segment log for tracked analytics events: length-prefixed
+CRC-checked records, rotating segments with a per-segment time index, group
+commit fsync and memory-mapped reads.
+"""
+
+import heapq
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime
+from operator import itemgetter
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - no cross-process writer locking on Windows
+    fcntl = None
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - falls back to the stdlib encoder
+    orjson = None
+
+from analytics_store import to_epoch_us
+
+RECORD_HEADER = struct.Struct('<II')    # body length, crc32(body)
+RECORD_META = struct.Struct('<qB')      # event timestamp (epoch us), event type code
+INDEX_ENTRY = struct.Struct('<QQqqI')   # block start, block end, min timestamp, max timestamp, records
+
+EVENT_TYPE_CODES = {
+    'page_views': 1,
+    'user_interactions': 2,
+    'conversion_events': 3,
+    'performance_metrics': 4
+}
+EVENT_TYPE_NAMES = {code: name for name, code in EVENT_TYPE_CODES.items()}
+
+
+def _dumps(record: Dict[str, Any]) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(record, default=str)
+    return json.dumps(record, separators=(',', ':'), default=str).encode('utf-8')
+
+
+def _loads(payload: bytes) -> Dict[str, Any]:
+    return orjson.loads(payload) if orjson is not None else json.loads(payload)
+
+
+def scan_records(buffer: Any, start: int, end: int) -> Iterator[Tuple[int, int, int, bytes]]:
+    """Yield (end offset, timestamp, type code, payload) for valid records in buffer[start:end]
+
+    Stops at the first torn or corrupt record.
+    """
+    offset = start
+    while offset + RECORD_HEADER.size <= end:
+        length, crc = RECORD_HEADER.unpack_from(buffer, offset)
+        body_start = offset + RECORD_HEADER.size
+        body_end = body_start + length
+        if length < RECORD_META.size or body_end > end:
+            return
+        body = buffer[body_start:body_end]
+        if zlib.crc32(body) != crc:
+            return
+        timestamp, code = RECORD_META.unpack_from(body)
+        yield body_end, timestamp, code, body[RECORD_META.size:]
+        offset = body_end
+
+
+class EventLog:
+    """Append-only analytics event log split into rotating segments
+
+    Each process writes to its own writer-N directory (claimed with an
+    exclusive lock, so gunicorn workers never interleave records) and every
+    reader sees all writers. Appends are buffered; commit() makes them
+    durable with a single fsync that covers every append written before it,
+    so concurrent requests share fsyncs (group commit). Every index_interval
+    records a (start, end, min_ts, max_ts) block entry is added to the
+    segment's index, which lets reads skip blocks outside the time range and
+    lets recovery rescan only the unindexed tail of the active segment.
+    With retention_seconds, sealed segments older than that are pruned on
+    every rotation (and by apply_retention(), e.g. at startup).
+    """
+
+    def __init__(self, log_dir: str, segment_bytes: int = 64 * 1024 * 1024,
+                 index_interval: int = 512, fsync: bool = True, retention_seconds: float = None):
+        self.log_dir = log_dir
+        self.segment_bytes = segment_bytes
+        self.index_interval = index_interval
+        self.fsync = fsync
+        self.retention_seconds = retention_seconds
+
+        self.writer_dir = None
+        self._pid = None
+        self._file = None
+        self._index_file = None
+        self._lock_file = None
+        self._segment = 0
+        self._offset = 0
+        self._block = None
+        self._written = 0
+        self._durable = 0
+        self._lock = threading.Lock()
+        self._commit_lock = threading.Lock()
+        self.stats = {
+            'appended': 0, 'commits': 0, 'fsync_seconds': 0.0, 'rotations': 0,
+            'recovery_seconds': 0.0, 'recovered_records': 0, 'truncated_bytes': 0, 'pruned_segments': 0
+        }
+
+    # Layout
+
+    @staticmethod
+    def _segment_paths(writer_dir: str, segment: int) -> Tuple[str, str]:
+        base = os.path.join(writer_dir, f'segment-{segment:08d}')
+        return base + '.log', base + '.idx'
+
+    @staticmethod
+    def _segments(writer_dir: str) -> List[int]:
+        return sorted(int(name[len('segment-'):-len('.log')]) for name in os.listdir(writer_dir)
+                      if name.startswith('segment-') and name.endswith('.log'))
+
+    def _writer_dirs(self) -> List[str]:
+        if not os.path.isdir(self.log_dir):
+            return []
+        return [os.path.join(self.log_dir, name) for name in sorted(os.listdir(self.log_dir))
+                if name.startswith('writer-')]
+
+    @staticmethod
+    def _read_index(index_path: str, data_size: int) -> List[Tuple[int, int, int, int, int]]:
+        """Index entries that point at data actually present in the segment"""
+        if not os.path.exists(index_path):
+            return []
+        with open(index_path, 'rb') as f:
+            raw = f.read()
+        usable = len(raw) - len(raw) % INDEX_ENTRY.size
+        return [entry for entry in INDEX_ENTRY.iter_unpack(raw[:usable]) if entry[1] <= data_size]
+
+    # Writing
+
+    def _open_writer(self):
+        """Claim a writer directory for this process and recover its active segment"""
+        os.makedirs(self.log_dir, exist_ok=True)
+        slot = 0
+        while True:
+            writer_dir = os.path.join(self.log_dir, f'writer-{slot}')
+            os.makedirs(writer_dir, exist_ok=True)
+            lock_file = open(os.path.join(writer_dir, 'LOCK'), 'a')
+            if fcntl is None:
+                break
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except OSError:
+                lock_file.close()
+                slot += 1
+
+        self.writer_dir = writer_dir
+        self._lock_file = lock_file
+        self._pid = os.getpid()
+
+        segments = self._segments(writer_dir)
+        if segments:
+            self._recover(segments[-1])
+        else:
+            self._start_segment(0)
+
+    def _recover(self, segment: int):
+        """Truncate a torn tail and re-index the unindexed records of the active segment"""
+        start_time = time.perf_counter()
+        data_path, index_path = self._segment_paths(self.writer_dir, segment)
+        data_size = os.path.getsize(data_path)
+        entries = self._read_index(index_path, data_size)
+
+        # Rewrite the index without entries that pointed past the data
+        with open(index_path, 'wb') as f:
+            f.write(b''.join(INDEX_ENTRY.pack(*entry) for entry in entries))
+
+        scan_from = entries[-1][1] if entries else 0
+        valid_end = scan_from
+        recovered = []
+        if data_size > scan_from:
+            with open(data_path, 'rb') as f:
+                f.seek(scan_from)
+                tail = f.read()
+            for end, timestamp, _, _ in scan_records(tail, 0, len(tail)):
+                recovered.append((valid_end, scan_from + end, timestamp))
+                valid_end = scan_from + end
+
+        if valid_end < data_size:
+            with open(data_path, 'r+b') as f:
+                f.truncate(valid_end)
+            self.stats['truncated_bytes'] += data_size - valid_end
+
+        self._segment = segment
+        self._file = open(data_path, 'ab')
+        self._index_file = open(index_path, 'ab')
+        self._offset = valid_end
+        self._block = None
+        for record_start, record_end, timestamp in recovered:
+            self._track_block(record_start, record_end, timestamp)
+
+        self.stats['recovered_records'] += len(recovered)
+        self.stats['recovery_seconds'] += time.perf_counter() - start_time
+
+    def _start_segment(self, segment: int):
+        data_path, index_path = self._segment_paths(self.writer_dir, segment)
+        self._segment = segment
+        self._file = open(data_path, 'ab')
+        self._index_file = open(index_path, 'ab')
+        self._offset = self._file.tell()
+        self._block = None
+
+    def _track_block(self, record_start: int, record_end: int, timestamp: int):
+        """Extend the current index block with one record, writing the entry when full"""
+        if self._block is None:
+            self._block = [record_start, record_end, timestamp, timestamp, 0]
+        block = self._block
+        block[1] = record_end
+        block[2] = min(block[2], timestamp)
+        block[3] = max(block[3], timestamp)
+        block[4] += 1
+        if block[4] >= self.index_interval:
+            self._close_block()
+
+    def _close_block(self):
+        if self._block is not None:
+            self._index_file.write(INDEX_ENTRY.pack(*self._block))
+            self._block = None
+
+    def _rotate(self):
+        """Seal the active segment (durably) and start the next one"""
+        self._close_block()
+        self._file.flush()
+        self._index_file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+            os.fsync(self._index_file.fileno())
+        self._file.close()
+        self._index_file.close()
+        self._start_segment(self._segment + 1)
+        self.stats['rotations'] += 1
+        self.apply_retention()
+
+    def append(self, event_type: str, records: Iterable[Dict[str, Any]], durable: bool = True) -> int:
+        """Append records of one event type; returns the log position to commit up to"""
+        code = EVENT_TYPE_CODES[event_type]
+        encoded = []
+        for record in records:
+            timestamp = to_epoch_us(record['timestamp'])
+            body = RECORD_META.pack(timestamp, code) + _dumps(record)
+            encoded.append((timestamp, RECORD_HEADER.pack(len(body), zlib.crc32(body)) + body))
+
+        with self._lock:
+            if self._pid != os.getpid():
+                self._open_writer()
+            for timestamp, data in encoded:
+                if self._offset >= self.segment_bytes:
+                    self._rotate()
+                self._file.write(data)
+                record_start = self._offset
+                self._offset += len(data)
+                self._track_block(record_start, self._offset, timestamp)
+            self._written += len(encoded)
+            self.stats['appended'] += len(encoded)
+            position = self._written
+
+        if durable:
+            self.commit(position)
+        return position
+
+    def commit(self, position: int = None):
+        """Flush and fsync everything appended so far (group commit)
+
+        Callers queue on the commit lock; when a caller gets it, the fsync of
+        whoever went before may already cover its position, so it returns
+        without a second fsync.
+        """
+        with self._commit_lock:
+            if position is not None and self._durable >= position:
+                return
+            with self._lock:
+                if self._file is None:
+                    return
+                self._file.flush()
+                self._index_file.flush()
+                written = self._written
+                # A duplicate descriptor stays valid even if the segment rotates meanwhile
+                fd = os.dup(self._file.fileno())
+            try:
+                if self.fsync:
+                    start_time = time.perf_counter()
+                    os.fsync(fd)
+                    self.stats['fsync_seconds'] += time.perf_counter() - start_time
+            finally:
+                os.close(fd)
+            self._durable = written
+            self.stats['commits'] += 1
+
+    def close(self):
+        self.commit()
+        with self._lock:
+            if self._file is not None:
+                self._close_block()
+                self._file.close()
+                self._index_file.close()
+                self._file = None
+            if self._lock_file is not None:
+                self._lock_file.close()
+                self._lock_file = None
+
+    # Reading
+
+    def _segment_ranges(self, index_entries: List[Tuple[int, int, int, int, int]], size: int,
+                        start_us: Optional[int], end_us: Optional[int]) -> List[Tuple[int, int]]:
+        """Byte ranges of a segment that may hold records in [start_us, end_us)"""
+        ranges = [
+            (block_start, block_end) for block_start, block_end, min_ts, max_ts, _ in index_entries
+            if not ((start_us is not None and max_ts < start_us) or (end_us is not None and min_ts >= end_us))
+        ]
+        indexed_end = index_entries[-1][1] if index_entries else 0
+        if size > indexed_end:
+            ranges.append((indexed_end, size))
+        return ranges
+
+    def read(self, start: Any = None, end: Any = None,
+             event_types: Iterable[str] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """(event_type, record) for every logged event in [start, end), all writers, via mmap
+
+        Each writer's records are in append order; the writers' streams are
+        merged by event time, so readers see one stream instead of one
+        writer after another.
+        """
+        start_us = to_epoch_us(start) if start is not None else None
+        end_us = to_epoch_us(end) if end is not None else None
+        codes = {EVENT_TYPE_CODES[name] for name in event_types} if event_types else None
+
+        if self._file is not None:
+            with self._lock:
+                self._file.flush()
+                self._index_file.flush()
+
+        streams = [self._read_writer(writer_dir, start_us, end_us, codes) for writer_dir in self._writer_dirs()]
+        for _, code, payload in heapq.merge(*streams, key=itemgetter(0)):
+            yield EVENT_TYPE_NAMES.get(code, str(code)), _loads(payload)
+
+    def _read_writer(self, writer_dir: str, start_us: Optional[int], end_us: Optional[int],
+                     codes: Optional[set]) -> Iterator[Tuple[int, int, bytes]]:
+        """(timestamp, type code, payload) of one writer's records in [start_us, end_us)"""
+        for segment in self._segments(writer_dir):
+            data_path, index_path = self._segment_paths(writer_dir, segment)
+            try:
+                size = os.path.getsize(data_path)
+            except FileNotFoundError:
+                # Pruned since the listing
+                continue
+            if not size:
+                continue
+            entries = self._read_index(index_path, size)
+
+            with open(data_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                size = len(mm)
+                for range_start, range_end in self._segment_ranges(entries, size, start_us, end_us):
+                    for _, timestamp, code, payload in scan_records(mm, range_start, range_end):
+                        if start_us is not None and timestamp < start_us:
+                            continue
+                        if end_us is not None and timestamp >= end_us:
+                            continue
+                        if codes is not None and code not in codes:
+                            continue
+                        yield timestamp, code, payload
+
+    def prune(self, before: Any) -> int:
+        """Delete sealed segments whose newest event is older than `before`; returns segments removed"""
+        before_us = to_epoch_us(before)
+        removed = 0
+        for writer_dir in self._writer_dirs():
+            for segment in self._segments(writer_dir)[:-1]:
+                data_path, index_path = self._segment_paths(writer_dir, segment)
+                try:
+                    size = os.path.getsize(data_path)
+                    entries = self._read_index(index_path, size)
+                    if not entries or entries[-1][1] < size:
+                        continue
+                    if max(entry[3] for entry in entries) < before_us:
+                        os.remove(data_path)
+                        os.remove(index_path)
+                        removed += 1
+                except FileNotFoundError:
+                    # Another worker pruned it first
+                    continue
+        self.stats['pruned_segments'] += removed
+        return removed
+
+    def apply_retention(self) -> int:
+        """Prune segments older than retention_seconds (no-op without a retention)"""
+        if not self.retention_seconds:
+            return 0
+        return self.prune(time.time() - self.retention_seconds)
+
+    def data_version(self) -> str:
+        """Marker that changes whenever any writer appends (newest segment and its size per writer)"""
+        parts = []
+        for writer_dir in self._writer_dirs():
+            segments = self._segments(writer_dir)
+            if segments:
+                data_path = self._segment_paths(writer_dir, segments[-1])[0]
+                parts.append(f"{os.path.basename(writer_dir)}:{segments[-1]}:{os.path.getsize(data_path)}")
+        return ','.join(parts)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Segment layout and commit statistics"""
+        segments = [
+            self._segment_paths(writer_dir, segment)[0]
+            for writer_dir in self._writer_dirs() for segment in self._segments(writer_dir)
+        ]
+        commits = self.stats['commits']
+        return {
+            **self.stats,
+            'writer_dir': self.writer_dir,
+            'writers': len(self._writer_dirs()),
+            'segments': len(segments),
+            'size_mb': sum(os.path.getsize(path) for path in segments) / (1024 * 1024),
+            'records_per_commit': self.stats['appended'] / commits if commits else None,
+            'avg_fsync_ms': self.stats['fsync_seconds'] * 1000 / commits if commits else None,
+            'checked_at': datetime.now().isoformat()
+        }
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+AI Marketing Tools - Executive Summary Engine
+Computes key metrics, period-over-period deltas, percentile bands and alerts
+from the dashboard history, cached per period.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import warnings
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, Union
+
+from dashboard_history import DashboardHistoryStore, parse_timestamp
+from lazy_imports import LazyModule
+
+np = LazyModule('numpy')
+
+# Metric -> (history source, dotted field, better direction, label)
+SUMMARY_METRICS = {
+    'total_users': ('overview', 'total_users', 'higher', 'Total users'),
+    'daily_active_users': ('overview', 'active_users_24h', 'higher', 'Daily active users'),
+    'conversion_rate': ('overview', 'conversion_rate', 'higher', 'Conversion rate (%)'),
+    'monthly_recurring_revenue': ('revenue', 'monthly_recurring_revenue', 'higher', 'MRR ($)'),
+    'churn_rate': ('revenue', 'churn_rate', 'lower', 'Churn rate (%)'),
+    'conversations_24h': ('chatbot', 'conversations_24h', 'higher', 'Chatbot conversations (24h)'),
+    'user_satisfaction': ('chatbot', 'user_satisfaction', 'higher', 'Chatbot satisfaction (/5)'),
+    'api_response_time_ms': ('performance', 'api_response_time.avg', 'lower', 'API response time (ms)'),
+    'uptime_percentage': ('performance', 'uptime.percentage', 'higher', 'Uptime (%)')
+}
+
+# Action suggested when a metric moves the wrong way
+METRIC_RECOMMENDATIONS = {
+    'total_users': "Review acquisition channels; user growth is below its normal range",
+    'daily_active_users': "Re-engage inactive users with onboarding and lifecycle campaigns",
+    'conversion_rate': "Focus on converting free tier users to paid plans",
+    'monthly_recurring_revenue': "Investigate revenue drop by plan and billing cycle",
+    'churn_rate': "Implement retention campaigns to reduce churn",
+    'conversations_24h': "Check chatbot availability and entry points on the site",
+    'user_satisfaction': "Improve chatbot training for better satisfaction scores",
+    'api_response_time_ms': "Optimize API performance for better user experience",
+    'uptime_percentage': "Review recent incidents and harden failing services"
+}
+
+# Period -> length of the current window in days
+SUMMARY_PERIODS = {'day': 1, 'week': 7}
+
+
+def _format_value(value: float) -> str:
+    if value is None or value != value:
+        return 'n/a'
+    if float(value).is_integer():
+        return f"{int(value):,}"
+    return f"{value:,.2f}"
+
+
+class ExecutiveSummaryEngine:
+    """Executive summary computed from daily history points, with an LRU + on-disk cache
+
+    The current window (last day or week) is compared with the window before
+    it, and the latest value of each metric is placed against the
+    p10/p50/p90 band of the baseline_days preceding the current window.
+    """
+
+    def __init__(self, history: DashboardHistoryStore, cache_dir: str = None,
+                 baseline_days: int = 28, alert_change_pct: float = 10.0, cache_size: int = 64):
+        self.history = history
+        self.cache_dir = cache_dir
+        self.baseline_days = baseline_days
+        self.alert_change_pct = alert_change_pct
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self.cache_stats = {'hits': 0, 'disk_hits': 0, 'misses': 0}
+
+    def load_metric_matrix(self, end: datetime, days: int) -> Dict[str, Any]:
+        """Daily values of every summary metric as a (metrics x days) array, NaN where missing"""
+        start = (end - timedelta(days=days - 1)).replace(hour=0, minute=0, second=0, microsecond=0)
+        day_keys = [(start + timedelta(days=offset)).strftime('%Y-%m-%d') for offset in range(days)]
+        column = {day: position for position, day in enumerate(day_keys)}
+
+        fields = {name: (source, field) for name, (source, field, _, _) in SUMMARY_METRICS.items()}
+        collected = self.history.collect(fields, start, end, 'day')
+
+        matrix = np.full((len(SUMMARY_METRICS), days), np.nan)
+        for row, name in enumerate(SUMMARY_METRICS):
+            for point in collected[name]:
+                if isinstance(point['value'], (int, float)) and point['period'] in column:
+                    matrix[row, column[point['period']]] = point['value']
+
+        return {'days': day_keys, 'matrix': matrix}
+
+    def compute(self, period: str = 'week', as_of: Union[str, datetime, None] = None) -> Dict[str, Any]:
+        """Build the summary for the period ending at as_of from stored history"""
+        if period not in SUMMARY_PERIODS:
+            raise ValueError(f"Unknown summary period: {period}")
+
+        end = parse_timestamp(as_of)
+        window = SUMMARY_PERIODS[period]
+        loaded = self.load_metric_matrix(end, window + self.baseline_days)
+        matrix = loaded['matrix']
+        names = list(SUMMARY_METRICS)
+
+        present = ~np.isnan(matrix)
+        has_value = present.any(axis=1)
+        last_column = matrix.shape[1] - 1 - np.argmax(present[:, ::-1], axis=1)
+        latest = np.where(has_value, matrix[np.arange(len(names)), last_column], np.nan)
+
+        with warnings.catch_warnings():
+            # All-NaN rows (metrics with no history yet) yield NaN, which is what we want
+            warnings.simplefilter('ignore', category=RuntimeWarning)
+            current_mean = np.nanmean(matrix[:, -window:], axis=1)
+            previous_mean = np.nanmean(matrix[:, -2 * window:-window], axis=1)
+            bands = np.nanpercentile(matrix[:, :-window], [10, 50, 90], axis=1)
+            change_pct = np.where(previous_mean != 0,
+                                  (current_mean - previous_mean) / np.abs(previous_mean) * 100, np.nan)
+
+        direction = np.array([1 if SUMMARY_METRICS[name][2] == 'higher' else -1 for name in names])
+        below_band = latest < bands[0]
+        above_band = latest > bands[2]
+        worse_than_band = ((direction > 0) & below_band) | ((direction < 0) & above_band)
+        declining = direction * change_pct < -self.alert_change_pct
+
+        trends = {}
+        insights, alerts, recommendations = [], [], []
+        comparison = f"vs previous {period}"
+        for row, name in enumerate(names):
+            label = SUMMARY_METRICS[name][3]
+            position = 'below' if below_band[row] else 'above' if above_band[row] else 'within'
+            trends[name] = {
+                'latest': None if np.isnan(latest[row]) else float(latest[row]),
+                'current_mean': None if np.isnan(current_mean[row]) else float(current_mean[row]),
+                'previous_mean': None if np.isnan(previous_mean[row]) else float(previous_mean[row]),
+                'change_pct': None if np.isnan(change_pct[row]) else float(change_pct[row]),
+                'band': {
+                    f'p{q}': None if np.isnan(bands[i, row]) else float(bands[i, row])
+                    for i, q in enumerate((10, 50, 90))
+                },
+                'band_position': position if not np.isnan(bands[1, row]) else None,
+                'points': int(present[row].sum())
+            }
+
+            if not has_value[row]:
+                continue
+
+            change = f" ({change_pct[row]:+.1f}% {comparison})" if not np.isnan(change_pct[row]) else ""
+            insights.append(f"{label}: {_format_value(latest[row])}{change}")
+
+            if worse_than_band[row]:
+                alerts.append(f"{label} at {_format_value(latest[row])} is {position} its "
+                              f"{self.baseline_days}-day band ({_format_value(bands[0, row])}"
+                              f"–{_format_value(bands[2, row])})")
+            if declining[row]:
+                alerts.append(f"{label} moved {change_pct[row]:+.1f}% {comparison}")
+            if (worse_than_band[row] or declining[row]) and METRIC_RECOMMENDATIONS[name] not in recommendations:
+                recommendations.append(METRIC_RECOMMENDATIONS[name])
+
+        if not has_value.any():
+            insights.append("No dashboard history stored yet - run the analytics suite to start collecting it")
+        elif not recommendations:
+            recommendations.append("All key metrics are within their normal range - keep current priorities")
+
+        return {
+            'timestamp': datetime.now().isoformat(),
+            'as_of': end.isoformat(),
+            'period': period,
+            'window_days': window,
+            'baseline_days': self.baseline_days,
+            'history_days': loaded['days'][0] + '/' + loaded['days'][-1],
+            'key_metrics': {name: trends[name]['latest'] for name in names},
+            'trends': trends,
+            'insights': insights,
+            'recommendations': recommendations,
+            'alerts': alerts
+        }
+
+    def _cache_path(self, key: str) -> Optional[str]:
+        return os.path.join(self.cache_dir, f"summary_{key}.json") if self.cache_dir else None
+
+    def get_summary(self, period: str = 'week', as_of: Union[str, datetime, None] = None) -> Dict[str, Any]:
+        """Cached summary for a period
+
+        The result depends only on the as_of day and the newest stored record
+        at or before as_of, so that pair is the cache key. Summaries of past
+        days can never change and are also kept on disk. The returned copy
+        carries the caller's own as_of, not that of the request that filled
+        the cache.
+        """
+        end = parse_timestamp(as_of)
+        latest = self.history.latest_timestamp(end)
+        key = f"{period}_{end.strftime('%Y%m%d')}_{int(latest * 1000) if latest else 0}"
+
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            self.cache_stats['hits'] += 1
+            return dict(self._cache[key], as_of=end.isoformat())
+
+        closed = end.date() < datetime.now().date()
+        cache_path = self._cache_path(key)
+        summary = None
+        if closed and cache_path and os.path.exists(cache_path):
+            try:
+                with open(cache_path, 'r') as f:
+                    summary = json.load(f)
+                self.cache_stats['disk_hits'] += 1
+            except Exception as e:
+                print(f"Error loading cached summary: {e}")
+
+        if summary is None:
+            self.cache_stats['misses'] += 1
+            summary = self.compute(period, end)
+            if closed and cache_path:
+                try:
+                    os.makedirs(self.cache_dir, exist_ok=True)
+                    tmp_path = cache_path + '.tmp'
+                    with open(tmp_path, 'w') as f:
+                        json.dump(summary, f)
+                    os.replace(tmp_path, cache_path)
+                except Exception as e:
+                    print(f"Error caching summary: {e}")
+
+        self._cache[key] = summary
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return dict(summary, as_of=end.isoformat())
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+AI Marketing Tools - Synthetic Monitoring Data Generator
+Fills monitoring.db with realistic multi-service monitoring data (diurnal load,
+incidents and latency tails) for testing the analyzer at production scale.
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Any
+
+import numpy as np
+
+# Per-service latency profile: median latency (ms), lognormal sigma, share of slow-tail requests
+SERVICE_PROFILES = {
+    'backend_api': {'median_ms': 180, 'sigma': 0.35, 'tail_share': 0.02},
+    'web_app': {'median_ms': 120, 'sigma': 0.30, 'tail_share': 0.01},
+    'mobile_app': {'median_ms': 150, 'sigma': 0.30, 'tail_share': 0.01},
+    'database': {'median_ms': 8, 'sigma': 0.50, 'tail_share': 0.005},
+    'system_resources': {'median_ms': None, 'sigma': None, 'tail_share': 0.0}
+}
+
+BACKEND_ENDPOINTS = ['/api/chat/analytics', '/api/plans', '/api/dashboard/overview']
+
+SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS monitoring_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        service_name TEXT NOT NULL,
+        status TEXT NOT NULL,
+        response_time_ms INTEGER,
+        error_message TEXT,
+        metrics TEXT
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS alerts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        alert_type TEXT NOT NULL,
+        severity TEXT NOT NULL,
+        message TEXT NOT NULL,
+        resolved BOOLEAN DEFAULT FALSE,
+        resolved_at DATETIME
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS system_metrics (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        cpu_usage REAL,
+        memory_usage REAL,
+        disk_usage REAL,
+        network_io TEXT,
+        active_connections INTEGER
+    )
+    '''
+]
+
+
+def parse_size(value: str) -> int:
+    """Parse row counts such as 10k, 2.5M or 50000000"""
+    value = value.strip().lower()
+    multipliers = {'k': 1_000, 'm': 1_000_000, 'b': 1_000_000_000}
+    if value and value[-1] in multipliers:
+        return int(float(value[:-1]) * multipliers[value[-1]])
+    return int(value)
+
+
+class MonitoringDataGenerator:
+    """Generates synthetic monitoring_logs and system_metrics rows"""
+
+    def __init__(self, db_path: str, seed: int = 42, incident_rate_per_day: float = 1.5):
+        self.db_path = db_path
+        self.rng = np.random.default_rng(seed)
+        self.incident_rate_per_day = incident_rate_per_day
+        self.services = list(SERVICE_PROFILES)
+
+    def init_database(self):
+        """Create the monitoring schema (same tables as the monitoring system)"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        with sqlite3.connect(self.db_path) as conn:
+            for statement in SCHEMA:
+                conn.execute(statement)
+            conn.commit()
+
+    def plan_incidents(self, start: datetime, end: datetime) -> Dict[str, List[tuple]]:
+        """Pick incident windows (epoch seconds) per service"""
+        span_days = (end - start).total_seconds() / 86400
+        incidents = {}
+        for service in self.services:
+            count = self.rng.poisson(self.incident_rate_per_day * span_days / len(self.services))
+            starts = self.rng.uniform(start.timestamp(), end.timestamp(), count)
+            durations = self.rng.exponential(15 * 60, count) + 60
+            incidents[service] = sorted(zip(starts, starts + durations))
+        return incidents
+
+    @staticmethod
+    def diurnal_factor(epoch_seconds: np.ndarray) -> np.ndarray:
+        """Load multiplier peaking in the afternoon and bottoming out at night"""
+        hour_of_day = (epoch_seconds % 86400) / 3600
+        return 1 + 0.6 * np.sin(2 * np.pi * (hour_of_day - 9) / 24)
+
+    def _incident_mask(self, epoch_seconds: np.ndarray, windows: List[tuple]) -> np.ndarray:
+        mask = np.zeros(epoch_seconds.shape, dtype=bool)
+        for window_start, window_end in windows:
+            lo, hi = np.searchsorted(epoch_seconds, [window_start, window_end])
+            mask[lo:hi] = True
+        return mask
+
+    def _latencies(self, profile: Dict[str, Any], load: np.ndarray, in_incident: np.ndarray) -> np.ndarray:
+        size = load.shape[0]
+        latencies = profile['median_ms'] * load * self.rng.lognormal(0, profile['sigma'], size)
+
+        # Heavy Pareto tail for a small share of requests
+        tail = self.rng.random(size) < profile['tail_share']
+        latencies[tail] *= 1 + self.rng.pareto(1.5, int(tail.sum()))
+
+        latencies[in_incident] *= self.rng.uniform(5, 30, int(in_incident.sum()))
+        return np.minimum(latencies, 30_000).astype(np.int64)
+
+    def _metrics_json(self, service: str, status: str, response_time: int, endpoint_times: List[int]) -> str:
+        result = {'service': service, 'status': status, 'response_time_ms': response_time}
+        if service == 'backend_api':
+            result['endpoints_status'] = {
+                endpoint: {'status': 200 if status == 'healthy' else 503, 'response_time': endpoint_time}
+                for endpoint, endpoint_time in zip(BACKEND_ENDPOINTS, endpoint_times)
+            }
+        return json.dumps(result)
+
+    def generate_chunk(self, epoch_seconds: np.ndarray, incidents: Dict[str, List[tuple]]):
+        """Build monitoring_logs and system_metrics rows for one chunk of check cycles"""
+        monitoring_rows = []
+        system_rows = []
+        load = self.diurnal_factor(epoch_seconds)
+        timestamps = [
+            datetime.fromtimestamp(ts, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+            for ts in epoch_seconds.tolist()
+        ]
+        service_columns = {}
+
+        for service, profile in SERVICE_PROFILES.items():
+            in_incident = self._incident_mask(epoch_seconds, incidents[service])
+            random_failures = self.rng.random(epoch_seconds.shape[0]) < 0.001
+            down = in_incident | random_failures
+
+            if profile['median_ms'] is None:
+                cpu = np.clip(25 * load + self.rng.normal(0, 8, load.shape[0]) + 40 * in_incident, 1, 100)
+                memory = np.clip(55 + 10 * load + self.rng.normal(0, 4, load.shape[0]), 5, 100)
+                disk = np.clip(np.linspace(34, 36, load.shape[0]) + self.rng.normal(0, 0.1, load.shape[0]), 0, 100)
+                connections = (200 * load + self.rng.normal(0, 20, load.shape[0])).astype(np.int64)
+                service_columns[service] = (down, None, cpu, memory, disk, connections)
+            else:
+                latencies = self._latencies(profile, load, in_incident)
+                endpoints = None
+                if service == 'backend_api':
+                    endpoints = (latencies[:, None] * self.rng.uniform(0.3, 1.2, (latencies.shape[0], 3))).astype(np.int64)
+                service_columns[service] = (down, latencies, endpoints)
+
+        for i, timestamp in enumerate(timestamps):
+            for service, columns in service_columns.items():
+                status = 'error' if columns[0][i] else 'healthy'
+                error = 'Connection timed out' if status == 'error' else None
+
+                if SERVICE_PROFILES[service]['median_ms'] is None:
+                    _, _, cpu, memory, disk, connections = columns
+                    metrics = {
+                        'service': service, 'status': status,
+                        'cpu_usage': round(float(cpu[i]), 1), 'memory_usage': round(float(memory[i]), 1),
+                        'disk_usage': round(float(disk[i]), 2), 'active_connections': int(connections[i])
+                    }
+                    monitoring_rows.append((timestamp, service, status, None, error, json.dumps(metrics)))
+                    system_rows.append((timestamp, metrics['cpu_usage'], metrics['memory_usage'],
+                                        metrics['disk_usage'], '{}', metrics['active_connections']))
+                else:
+                    _, latencies, endpoints = columns
+                    response_time = int(latencies[i])
+                    endpoint_times = endpoints[i].tolist() if endpoints is not None else []
+                    monitoring_rows.append((timestamp, service, status, response_time, error,
+                                            self._metrics_json(service, status, response_time, endpoint_times)))
+
+        return monitoring_rows, system_rows
+
+    def generate(self, rows: int, days: float = 7.0, chunk_cycles: int = 20_000) -> Dict[str, Any]:
+        """Generate roughly `rows` monitoring_logs rows spread evenly over the last `days`"""
+        self.init_database()
+        cycles = max(1, rows // len(self.services))
+        end = datetime.now(timezone.utc)
+        start = end - timedelta(days=days)
+        check_times = np.linspace(start.timestamp(), end.timestamp(), cycles)
+        incidents = self.plan_incidents(start, end)
+
+        start_time = time.time()
+        monitoring_count = 0
+        system_count = 0
+
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute('PRAGMA journal_mode = OFF')
+            conn.execute('PRAGMA synchronous = OFF')
+
+            for offset in range(0, cycles, chunk_cycles):
+                monitoring_rows, system_rows = self.generate_chunk(check_times[offset:offset + chunk_cycles], incidents)
+
+                conn.executemany('''
+                    INSERT INTO monitoring_logs
+                    (timestamp, service_name, status, response_time_ms, error_message, metrics)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', monitoring_rows)
+                conn.executemany('''
+                    INSERT INTO system_metrics
+                    (timestamp, cpu_usage, memory_usage, disk_usage, network_io, active_connections)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', system_rows)
+                conn.commit()
+
+                monitoring_count += len(monitoring_rows)
+                system_count += len(system_rows)
+
+        return {
+            'db_path': self.db_path,
+            'monitoring_rows': monitoring_count,
+            'system_metrics_rows': system_count,
+            'days': days,
+            'incidents': sum(len(windows) for windows in incidents.values()),
+            'elapsed_seconds': time.time() - start_time
+        }
+
+
+def main():
+    """Generate a synthetic monitoring database"""
+    parser = argparse.ArgumentParser(description='Generate synthetic monitoring data')
+    parser.add_argument('--db', default='/home/ubuntu/AI_Marketing_Tools_Workspace/analytics-monitoring/monitoring.db')
+    parser.add_argument('--rows', default='100k', help='monitoring_logs rows to generate, e.g. 10k, 5M, 50M')
+    parser.add_argument('--days', type=float, default=7.0, help='time span to spread the rows over')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--snapshot', action='store_true', help='also sync the columnar snapshot store')
+    args = parser.parse_args()
+
+    generator = MonitoringDataGenerator(args.db, seed=args.seed)
+    print(f"🧪 Generating {parse_size(args.rows):,} monitoring rows over {args.days} days into {args.db}...")
+    summary = generator.generate(parse_size(args.rows), days=args.days)
+    print(f"✅ Wrote {summary['monitoring_rows']:,} monitoring rows and {summary['system_metrics_rows']:,} "
+          f"system metrics with {summary['incidents']} incidents in {summary['elapsed_seconds']:.1f}s")
+
+    if args.snapshot:
+        from monitoring_snapshot import MonitoringSnapshotStore
+        added = MonitoringSnapshotStore(args.db).sync()
+        print(f"📦 Snapshot synced: {added}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""
+AI Marketing Tools - Ingest Queue
+Bounded in-process queue between the tracking endpoints and storage: requests
+only validate and enqueue, and one background writer flushes batches by size
+or age with a single group commit each.
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Callable, Dict, List, Any, Tuple
+
+from sketches import DDSketch
+
+
+class IngestRejected(Exception):
+    """The queue cannot take more events right now; retry after `retry_after` seconds"""
+
+    def __init__(self, message: str, status_code: int, retry_after: int):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class IngestBatch(dict):
+    """{storage: [records]} taken off the queue, handed to every flush attempt
+
+    A flush callback adds the storages it has made durable to `completed`,
+    so a retry of the same batch can skip them instead of writing them twice.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.attempts = 0
+        self.completed = set()
+
+
+class IngestQueue:
+    """Bounded queue of {storage: [records]} groups drained by one writer thread
+
+    offer() never touches storage: it raises IngestRejected with 429 when the
+    queue holds max_events, or 503 while the writer is failing to flush.
+    Transient errors (transient_errors, by default OSError) are retried with
+    exponential backoff up to max_attempts times; any other error, or the last
+    failed attempt, sends the batch to the dead-letter file (or drops it when
+    there is none) and counts it, so one bad record cannot stall ingest.
+    The writer flushes once batch_size events are waiting or the oldest one
+    has waited flush_interval seconds.
+    """
+
+    def __init__(self, flush: Callable[[Dict[str, List[Dict[str, Any]]]], None], max_events: int = 50_000,
+                 batch_size: int = 1000, flush_interval: float = 0.05, max_backoff: float = 5.0,
+                 max_attempts: int = 5, transient_errors: Tuple[type, ...] = (OSError,),
+                 dead_letter_path: str = None):
+        self.flush = flush
+        self.max_events = max_events
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+        self.transient_errors = transient_errors
+        self.dead_letter_path = dead_letter_path
+
+        self._groups = deque()
+        self._depth = 0
+        self._oldest = None
+        self._condition = threading.Condition()
+        self._writer = None
+        self._pid = None
+        self._closed = False
+        self._backoff = 0.0
+        self._in_flight = 0
+
+        self.flush_latency = DDSketch(0.01)
+        self.stats = {
+            'enqueued': 0,
+            'flushed': 0,
+            'rejected_full': 0,
+            'rejected_unavailable': 0,
+            'flushes': 0,
+            'flush_errors': 0,
+            'dead_lettered': 0,
+            'dropped': 0,
+            'max_depth': 0,
+            'last_error': None,
+            'last_flush_at': None
+        }
+
+    def _ensure_writer(self):
+        # Started lazily, and again in forked workers (threads do not survive fork)
+        if self._writer is None or self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._writer = threading.Thread(target=self._run, name='ingest-writer', daemon=True)
+            self._writer.start()
+
+    @property
+    def depth(self) -> int:
+        return self._depth
+
+    def retry_after(self) -> int:
+        """Seconds until the backlog should have drained, from the recent flush rate"""
+        if self._backoff:
+            return max(1, math.ceil(self._backoff))
+        mean_ms = self.flush_latency.mean
+        if not mean_ms:
+            return 1
+        seconds = self._depth / self.batch_size * (mean_ms / 1000 + self.flush_interval)
+        return max(1, math.ceil(seconds))
+
+    def offer(self, grouped: Dict[str, List[Dict[str, Any]]]) -> int:
+        """Enqueue events without waiting for storage; returns the number queued"""
+        count = sum(len(records) for records in grouped.values())
+        if not count:
+            return 0
+
+        with self._condition:
+            self._ensure_writer()
+            if self._backoff:
+                self.stats['rejected_unavailable'] += count
+                raise IngestRejected('Event storage is temporarily unavailable', 503, self.retry_after())
+            if self._depth + count > self.max_events:
+                self.stats['rejected_full'] += count
+                raise IngestRejected('Ingest queue is full', 429, self.retry_after())
+
+            self._groups.append(grouped)
+            self._depth += count
+            self.stats['enqueued'] += count
+            self.stats['max_depth'] = max(self.stats['max_depth'], self._depth)
+            # Wake the writer to start the flush timer, or to flush a full batch now
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+                self._condition.notify()
+            elif self._depth >= self.batch_size:
+                self._condition.notify()
+        return count
+
+    def _take_batch(self) -> IngestBatch:
+        batch, taken = IngestBatch(), 0
+        while self._groups and taken < self.batch_size:
+            for storage, records in self._groups.popleft().items():
+                batch.setdefault(storage, []).extend(records)
+                taken += len(records)
+        self._depth -= taken
+        self._in_flight = taken
+        self._oldest = time.monotonic() if self._groups else None
+        return batch
+
+    def _run(self):
+        batch = None
+        while True:
+            with self._condition:
+                if batch is None:
+                    while not self._closed:
+                        if self._depth >= self.batch_size:
+                            break
+                        if self._oldest is not None:
+                            remaining = self._oldest + self.flush_interval - time.monotonic()
+                            if remaining <= 0:
+                                break
+                            self._condition.wait(remaining)
+                        else:
+                            self._condition.wait()
+                    if not self._groups:
+                        if self._closed:
+                            return
+                        continue
+                    batch = self._take_batch()
+
+            start_time = time.perf_counter()
+            batch.attempts += 1
+            try:
+                self.flush(batch)
+            except Exception as e:
+                with self._condition:
+                    self.stats['flush_errors'] += 1
+                    self.stats['last_error'] = f"{type(e).__name__}: {e}"
+                    retry = isinstance(e, self.transient_errors) and batch.attempts < self.max_attempts
+                    if retry:
+                        self._backoff = min(self.max_backoff, max(0.05, self._backoff * 2))
+                        backoff = self._backoff
+                if retry:
+                    print(f"Error flushing ingest queue (retrying in {backoff:.2f}s): {e}")
+                    time.sleep(backoff)
+                    continue
+
+                self._dead_letter(batch, e)
+                with self._condition:
+                    self._in_flight = 0
+                    self._backoff = 0.0
+                    self._condition.notify_all()
+                batch = None
+                continue
+
+            elapsed_ms = (time.perf_counter() - start_time) * 1000
+            with self._condition:
+                self.flush_latency.add(elapsed_ms)
+                self.stats['flushes'] += 1
+                self.stats['flushed'] += self._in_flight
+                self.stats['last_flush_at'] = datetime.now().isoformat()
+                self._in_flight = 0
+                self._backoff = 0.0
+                self._condition.notify_all()
+            batch = None
+
+    def _dead_letter(self, batch: IngestBatch, error: Exception):
+        """Move a batch that cannot be flushed out of the way: append it to the dead-letter file, else drop it"""
+        count = sum(len(records) for records in batch.values())
+        error_text = f"{type(error).__name__}: {error}"
+        if self.dead_letter_path:
+            try:
+                os.makedirs(os.path.dirname(self.dead_letter_path) or '.', exist_ok=True)
+                with open(self.dead_letter_path, 'a', encoding='utf-8') as f:
+                    for storage, records in batch.items():
+                        for record in records:
+                            f.write(json.dumps({
+                                'storage': storage,
+                                'record': record,
+                                'error': error_text,
+                                'completed': storage in batch.completed,
+                                'failed_at': datetime.now().isoformat()
+                            }, separators=(',', ':'), default=str) + '\n')
+                with self._condition:
+                    self.stats['dead_lettered'] += count
+                print(f"⚠️  Dead-lettered {count} events after {batch.attempts} attempt(s): {error_text}")
+                return
+            except Exception as e:
+                print(f"Error writing ingest dead letters: {e}")
+
+        with self._condition:
+            self.stats['dropped'] += count
+        print(f"⚠️  Dropped {count} events after {batch.attempts} attempt(s): {error_text}")
+
+    def drain(self, timeout: float = 10.0) -> bool:
+        """Wait until everything queued so far has been flushed"""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            self._oldest = self._oldest and time.monotonic() - self.flush_interval
+            self._condition.notify()
+            while self._depth or self._in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(min(remaining, 0.05))
+        return True
+
+    def close(self, timeout: float = 10.0):
+        """Flush what is queued and stop the writer (registered with atexit)"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+            writer = self._writer if self._pid == os.getpid() else None
+        if writer is not None:
+            writer.join(timeout)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth, throughput counters and flush latency percentiles"""
+        with self._condition:
+            return {
+                **self.stats,
+                'depth': self._depth,
+                'in_flight': self._in_flight,
+                'capacity': self.max_events,
+                'batch_size': self.batch_size,
+                'flush_interval_ms': self.flush_interval * 1000,
+                'writer_alive': self._writer is not None and self._writer.is_alive(),
+                'backoff_seconds': self._backoff,
+                'max_attempts': self.max_attempts,
+                'dead_letter_path': self.dead_letter_path,
+                'flush_latency_ms': self.flush_latency.summary()
+            }
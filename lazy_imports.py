@@ -0,0 +1,67 @@
+"""
+AI Marketing Tools - Lazy Imports
+Module proxies that defer importing heavy data and plotting libraries until
+they are first used, so CLI paths that never render stay fast to start.
+"""
+
+import importlib
+import importlib.util
+from typing import Any, Callable, Optional
+
+
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access.
+
+    `on_load` runs once, right after the import, which is where global
+    side effects such as plotting styles belong.
+    """
+
+    def __init__(self, name: str, on_load: Optional[Callable[[Any], None]] = None):
+        self.__dict__['_name'] = name
+        self.__dict__['_on_load'] = on_load
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            module = importlib.import_module(self.__dict__['_name'])
+            self.__dict__['_module'] = module
+            on_load = self.__dict__['_on_load']
+            if on_load is not None:
+                on_load(module)
+        return module
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.__dict__['_module'] is not None
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr: str, value: Any):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self) -> str:
+        state = 'loaded' if self.is_loaded else 'not loaded'
+        return f"<LazyModule {self.__dict__['_name']} ({state})>"
+
+
+def lazy_function(module_name: str, function_name: str) -> Callable:
+    """Return a wrapper that imports `module_name.function_name` on first call"""
+    module = LazyModule(module_name)
+
+    def wrapper(*args, **kwargs):
+        return getattr(module, function_name)(*args, **kwargs)
+
+    wrapper.__name__ = function_name
+    wrapper.__qualname__ = function_name
+    wrapper.__doc__ = f"Lazily imported {module_name}.{function_name}"
+    return wrapper
+
+
+def module_available(name: str) -> bool:
+    """Check whether a module can be imported, without importing it"""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+AI Marketing Tools - Monitoring Snapshot Store
+Append-only columnar (Feather/Arrow IPC) snapshots of the monitoring database,
+partitioned by day and read back through memory mapping.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Any, Optional, Tuple
+
+from lazy_imports import LazyModule, module_available
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - falls back to the stdlib decoder
+    orjson = None
+
+# pandas and pyarrow (optional, required for snapshots) are imported on first use
+pd = LazyModule('pandas')
+pa = LazyModule('pyarrow')
+pc = LazyModule('pyarrow.compute')
+feather = LazyModule('pyarrow.feather')
+
+PART_PATTERN = re.compile(r'^part-(\d+)-(\d+)\.feather$')
+FEATURES_PREFIX = 'features-'
+
+
+def decode_metrics(metrics: pd.Series) -> pd.DataFrame:
+    """Expand a column of metrics JSON documents into typed, flattened columns.
+
+    The whole column is joined into one JSON array and decoded in a single
+    call, then nested objects such as endpoints_status are flattened into
+    dotted column names (e.g. 'endpoints_status./api/plans.response_time').
+    If any row is malformed the column is decoded row by row instead; bad
+    rows become empty records and are counted in attrs['invalid_metrics'].
+    """
+    if metrics.empty:
+        return pd.DataFrame(index=metrics.index)
+
+    loads = orjson.loads if orjson is not None else json.loads
+    documents = metrics.fillna('{}').astype(str).tolist()
+    invalid = 0
+    try:
+        records = loads('[' + ','.join(documents) + ']')
+        if len(records) != len(documents):
+            raise ValueError('metrics rows do not map one-to-one to JSON documents')
+    except ValueError:
+        records = []
+        for document in documents:
+            try:
+                records.append(loads(document))
+            except ValueError:
+                records.append({})
+                invalid += 1
+    records = [record if isinstance(record, dict) else {} for record in records]
+    if invalid:
+        print(f"⚠️  Skipped {invalid} malformed metrics row(s) of {len(documents)}")
+
+    features = pd.json_normalize(records)
+    features.index = metrics.index
+    features.attrs['invalid_metrics'] = invalid
+
+    for column in features.columns:
+        if features[column].dtype != object:
+            continue
+        present = features[column].notna()
+        numeric = pd.to_numeric(features[column], errors='coerce')
+        if numeric.notna().sum() == present.sum():
+            features[column] = numeric
+        else:
+            features[column] = features[column].where(~present, features[column].astype(str))
+
+    return features
+
+
+def _table_schemas() -> Dict[str, Any]:
+    """Arrow schemas for the snapshotted tables (timestamps are parsed once, at ingest)"""
+    return {
+        'monitoring_logs': pa.schema([
+            ('id', pa.int64()),
+            ('timestamp', pa.timestamp('ns')),
+            ('service_name', pa.string()),
+            ('status', pa.string()),
+            ('response_time_ms', pa.float64()),
+            ('error_message', pa.string()),
+            ('metrics', pa.string())
+        ]),
+        'system_metrics': pa.schema([
+            ('id', pa.int64()),
+            ('timestamp', pa.timestamp('ns')),
+            ('cpu_usage', pa.float64()),
+            ('memory_usage', pa.float64()),
+            ('disk_usage', pa.float64()),
+            ('network_io', pa.string()),
+            ('active_connections', pa.float64())
+        ])
+    }
+
+
+class MonitoringSnapshotStore:
+    """Columnar snapshot cache of monitoring_logs and system_metrics"""
+
+    TABLES = ('monitoring_logs', 'system_metrics')
+
+    def __init__(self, db_path: str, snapshot_dir: str = None,
+                 chunk_size: int = 500_000, max_parts_per_day: int = 32):
+        if not module_available('pyarrow'):
+            raise ImportError("pyarrow is required for the monitoring snapshot store")
+
+        self.db_path = db_path
+        self.snapshot_dir = snapshot_dir or os.path.join(os.path.dirname(db_path), 'snapshots')
+        self.chunk_size = chunk_size
+        self.max_parts_per_day = max_parts_per_day
+        self.schemas = _table_schemas()
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+
+    def _table_dir(self, table: str) -> str:
+        if table not in self.TABLES:
+            raise ValueError(f"Unknown snapshot table: {table}")
+        return os.path.join(self.snapshot_dir, table)
+
+    def _list_partitions(self, table: str) -> List[Tuple[str, str]]:
+        """Return (day, path) for every day partition of a table, oldest first"""
+        table_dir = self._table_dir(table)
+        if not os.path.isdir(table_dir):
+            return []
+
+        partitions = []
+        for entry in os.scandir(table_dir):
+            if entry.is_dir() and entry.name.startswith('date='):
+                partitions.append((entry.name[len('date='):], entry.path))
+
+        return sorted(partitions)
+
+    def _list_parts(self, partition_path: str) -> List[Tuple[int, int, str]]:
+        """Return (first_id, last_id, path) for the live parts of a partition.
+
+        Parts whose id range is covered by another part are left over from an
+        interrupted compaction and are skipped so rows are never read twice.
+        """
+        parts = []
+        for entry in os.scandir(partition_path):
+            match = PART_PATTERN.match(entry.name)
+            if match:
+                parts.append((int(match.group(1)), int(match.group(2)), entry.path))
+
+        parts.sort(key=lambda part: (part[0], -part[1]))
+
+        live_parts = []
+        covered_until = -1
+        for first_id, last_id, path in parts:
+            if last_id <= covered_until:
+                continue
+            live_parts.append((first_id, last_id, path))
+            covered_until = last_id
+
+        return live_parts
+
+    def get_watermark(self, table: str) -> int:
+        """Highest SQLite row id already present in the snapshot"""
+        watermark = 0
+        for _, partition_path in self._list_partitions(table):
+            for _, last_id, _ in self._list_parts(partition_path):
+                watermark = max(watermark, last_id)
+        return watermark
+
+    def _write_part(self, table: str, day: str, table_slice: pa.Table) -> str:
+        """Atomically write one part file into a day partition"""
+        partition_path = os.path.join(self._table_dir(table), f'date={day}')
+        os.makedirs(partition_path, exist_ok=True)
+
+        ids = table_slice.column('id')
+        first_id = pc.min(ids).as_py()
+        last_id = pc.max(ids).as_py()
+        part_path = os.path.join(partition_path, f'part-{first_id:012d}-{last_id:012d}.feather')
+
+        # Uncompressed Arrow IPC so the file can be memory mapped on read
+        tmp_path = part_path + '.tmp'
+        feather.write_feather(table_slice, tmp_path, compression='uncompressed')
+        os.replace(tmp_path, part_path)
+
+        return part_path
+
+    def _to_arrow(self, table: str, df: pd.DataFrame) -> pa.Table:
+        """Convert a raw SQLite chunk into a typed Arrow table"""
+        schema = self.schemas[table]
+        df['timestamp'] = pd.to_datetime(df['timestamp'], format='ISO8601', errors='coerce')
+
+        for field in schema:
+            if field.name not in df.columns:
+                df[field.name] = None
+
+        return pa.Table.from_pandas(df[schema.names], schema=schema, preserve_index=False)
+
+    def sync_table(self, table: str) -> int:
+        """Append rows newer than the watermark from SQLite; returns rows added"""
+        watermark = self.get_watermark(table)
+        rows_added = 0
+        touched_days = set()
+
+        with sqlite3.connect(self.db_path) as conn:
+            query = f'SELECT * FROM {table} WHERE id > ? ORDER BY id'
+            for chunk in pd.read_sql_query(query, conn, params=(watermark,), chunksize=self.chunk_size):
+                if chunk.empty:
+                    continue
+
+                arrow_chunk = self._to_arrow(table, chunk)
+                days = pc.strftime(arrow_chunk.column('timestamp'), format='%Y-%m-%d')
+
+                for day in pc.unique(days).to_pylist():
+                    day_label = day or 'unknown'
+                    mask = pc.is_null(days) if day is None else pc.equal(days, day)
+                    self._write_part(table, day_label, arrow_chunk.filter(mask))
+                    touched_days.add(day_label)
+
+                rows_added += arrow_chunk.num_rows
+
+        self.compact_table(table, touched_days)
+        return rows_added
+
+    def sync(self) -> Dict[str, int]:
+        """Sync every snapshotted table from SQLite"""
+        return {table: self.sync_table(table) for table in self.TABLES}
+
+    def compact_table(self, table: str, days: Optional[set] = None):
+        """Merge small parts of a partition into one file.
+
+        Closed days are compacted down to a single part; the current day only
+        once it has accumulated more than max_parts_per_day parts.
+        """
+        today = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+
+        for day, partition_path in self._list_partitions(table):
+            if days is not None and day not in days:
+                continue
+
+            parts = self._list_parts(partition_path)
+            limit = self.max_parts_per_day if day >= today else 1
+            if len(parts) <= limit:
+                continue
+
+            merged = pa.concat_tables(
+                feather.read_table(path, memory_map=True) for _, _, path in parts
+            )
+            self._write_part(table, day, merged)
+
+            for _, _, path in parts:
+                os.remove(path)
+                features_path = self._features_path(path)
+                if os.path.exists(features_path):
+                    os.remove(features_path)
+
+    def load(self, table: str, hours: int = 168) -> pd.DataFrame:
+        """Load the last N hours of a table from memory-mapped day partitions"""
+        cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(hours=hours)
+        cutoff_day = cutoff.strftime('%Y-%m-%d')
+
+        tables = []
+        for day, partition_path in self._list_partitions(table):
+            if day < cutoff_day:
+                continue
+            for _, _, path in self._list_parts(partition_path):
+                tables.append(feather.read_table(path, memory_map=True))
+
+        if not tables:
+            return self.schemas[table].empty_table().to_pandas()
+
+        combined = pa.concat_tables(tables)
+        combined = combined.filter(
+            pc.greater(combined.column('timestamp'), pa.scalar(cutoff, type=pa.timestamp('ns')))
+        )
+        combined = combined.sort_by([('timestamp', 'ascending'), ('id', 'ascending')])
+
+        return combined.to_pandas()
+
+    @staticmethod
+    def _features_path(part_path: str) -> str:
+        directory, name = os.path.split(part_path)
+        return os.path.join(directory, FEATURES_PREFIX + name[len('part-'):])
+
+    def _load_part_features(self, part_path: str) -> pd.DataFrame:
+        """Parsed metrics of one immutable part, decoded once and cached beside it"""
+        features_path = self._features_path(part_path)
+        if os.path.exists(features_path):
+            return feather.read_table(features_path, memory_map=True).to_pandas()
+
+        part = feather.read_table(part_path, columns=['id', 'timestamp', 'service_name', 'metrics'],
+                                  memory_map=True).to_pandas()
+        features = decode_metrics(part['metrics'])
+        features = features.drop(columns=[c for c in ('service', 'status') if c in features.columns])
+        features = pd.concat([part[['id', 'timestamp', 'service_name']], features], axis=1)
+
+        tmp_path = features_path + '.tmp'
+        feather.write_feather(features, tmp_path, compression='uncompressed')
+        os.replace(tmp_path, features_path)
+        return features
+
+    def load_metrics_features(self, hours: int = 168) -> pd.DataFrame:
+        """Typed columns parsed from monitoring_logs.metrics for the last N hours"""
+        cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(hours=hours)
+        cutoff_day = cutoff.strftime('%Y-%m-%d')
+
+        frames = []
+        for day, partition_path in self._list_partitions('monitoring_logs'):
+            if day < cutoff_day:
+                continue
+            for _, _, path in self._list_parts(partition_path):
+                frames.append(self._load_part_features(path))
+
+        if not frames:
+            return pd.DataFrame(columns=['id', 'timestamp', 'service_name'])
+
+        features = pd.concat(frames, ignore_index=True, sort=False)
+        features = features[features['timestamp'] > cutoff]
+        return features.sort_values(['timestamp', 'id']).reset_index(drop=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Summarize snapshot size and layout per table"""
+        stats = {}
+        for table in self.TABLES:
+            partitions = self._list_partitions(table)
+            parts = [part for _, path in partitions for part in self._list_parts(path)]
+            stats[table] = {
+                'partitions': len(partitions),
+                'parts': len(parts),
+                'size_mb': sum(os.path.getsize(path) for _, _, path in parts) / (1024 * 1024),
+                'watermark': max((last_id for _, last_id, _ in parts), default=0)
+            }
+        return stats
+
+
+def main():
+    """Sync the snapshot store from the monitoring database"""
+    parser = argparse.ArgumentParser(description='Sync the columnar monitoring snapshot store')
+    parser.add_argument('--db', default='/home/ubuntu/AI_Marketing_Tools_Workspace/analytics-monitoring/monitoring.db')
+    parser.add_argument('--snapshot-dir', default=None, help='defaults to snapshots/ next to the database')
+    args = parser.parse_args()
+
+    store = MonitoringSnapshotStore(args.db, args.snapshot_dir)
+
+    start_time = time.time()
+    added = store.sync()
+    elapsed = time.time() - start_time
+
+    print(f"📦 Snapshot synced in {elapsed:.2f}s: {added}")
+    for table, table_stats in store.get_stats().items():
+        print(f"  • {table}: {table_stats['parts']} parts in {table_stats['partitions']} days, "
+              f"{table_stats['size_mb']:.1f} MB, watermark id {table_stats['watermark']}")
+
+
+if __name__ == "__main__":
+    main()
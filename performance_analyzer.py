@@ -4,28 +4,67 @@ AI Marketing Tools - Performance Analyzer
 Advanced performance analysis and optimization recommendations.
 """
 
+from __future__ import annotations
+
 import sqlite3
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 from datetime import datetime, timedelta
 import json
 import os
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Optional
 import warnings
 warnings.filterwarnings('ignore')
 
+from lazy_imports import LazyModule
+from monitoring_snapshot import MonitoringSnapshotStore, decode_metrics
+from sketches import DDSketch, ks_compare
+
+# Data and plotting stacks are imported on first use; matplotlib only when a chart is drawn
+pd = LazyModule('pandas')
+np = LazyModule('numpy')
+plt = LazyModule('matplotlib.pyplot')
+
 class PerformanceAnalyzer:
     """Advanced performance analysis for AI Marketing Tools platform"""
     
-    def __init__(self, db_path: str = None):
+    def __init__(self, db_path: str = None, snapshot_dir: str = None, use_snapshot: bool = True,
+                 output_dir: str = None):
         self.db_path = db_path or '/home/ubuntu/AI_Marketing_Tools_Workspace/analytics-monitoring/monitoring.db'
-        self.output_dir = '/home/ubuntu/AI_Marketing_Tools_Workspace/analytics-monitoring/reports'
+        self.output_dir = output_dir or '/home/ubuntu/AI_Marketing_Tools_Workspace/analytics-monitoring/reports'
         os.makedirs(self.output_dir, exist_ok=True)
+        self.latency_history_path = os.path.join(self.output_dir, 'latency_history.json')
+        
+        # Regression detection settings (relative quantile shift that counts as a regression)
+        self.sketch_accuracy = 0.01
+        self.regression_threshold = 0.10
+        self.regression_min_samples = 50
+        self.latency_history_retention_days = 30
+        
+        # Columnar snapshot cache of the monitoring tables (requires pyarrow)
+        self.snapshot_store = None
+        if use_snapshot:
+            try:
+                self.snapshot_store = MonitoringSnapshotStore(self.db_path, snapshot_dir)
+            except Exception as e:
+                print(f"Snapshot store unavailable, reading from SQLite: {e}")
+        
+    def load_from_snapshot(self, table: str, hours: int) -> Optional[pd.DataFrame]:
+        """Sync a table's snapshot from its SQLite watermark and load it memory mapped"""
+        if self.snapshot_store is None:
+            return None
+        
+        try:
+            self.snapshot_store.sync_table(table)
+            return self.snapshot_store.load(table, hours)
+        except Exception as e:
+            print(f"Error loading {table} snapshot, falling back to SQLite: {e}")
+            return None
         
     def load_monitoring_data(self, hours: int = 168) -> pd.DataFrame:
         """Load monitoring data from database"""
+        df = self.load_from_snapshot('monitoring_logs', hours)
+        if df is not None:
+            return df
+        
         try:
             with sqlite3.connect(self.db_path) as conn:
                 query = '''
@@ -44,6 +83,10 @@ class PerformanceAnalyzer:
     
     def load_system_metrics(self, hours: int = 168) -> pd.DataFrame:
         """Load system metrics from database"""
+        df = self.load_from_snapshot('system_metrics', hours)
+        if df is not None:
+            return df
+        
         try:
             with sqlite3.connect(self.db_path) as conn:
                 query = '''
@@ -60,6 +103,57 @@ class PerformanceAnalyzer:
             print(f"Error loading system metrics: {e}")
             return pd.DataFrame()
     
+    def load_metrics_features(self, hours: int = 168, monitoring_df: pd.DataFrame = None) -> pd.DataFrame:
+        """Expand monitoring_logs.metrics JSON into typed columns (cached per snapshot part)"""
+        if self.snapshot_store is not None:
+            try:
+                self.snapshot_store.sync_table('monitoring_logs')
+                return self.snapshot_store.load_metrics_features(hours)
+            except Exception as e:
+                print(f"Error loading cached metrics features, parsing in memory: {e}")
+        
+        if monitoring_df is None:
+            monitoring_df = self.load_monitoring_data(hours)
+        if monitoring_df.empty or 'metrics' not in monitoring_df.columns:
+            return pd.DataFrame()
+        
+        features = decode_metrics(monitoring_df['metrics'])
+        features = features.drop(columns=[c for c in ('service', 'status') if c in features.columns])
+        return pd.concat([monitoring_df[['id', 'timestamp', 'service_name']], features], axis=1)
+    
+    def analyze_endpoint_latency(self, features_df: pd.DataFrame) -> Dict[str, Any]:
+        """Analyze per-endpoint latency from the backend's endpoints_status checks"""
+        if features_df.empty:
+            return {'error': 'No metrics data available'}
+        
+        latency_columns = [
+            column for column in features_df.columns
+            if column.startswith('endpoints_status.') and column.endswith('.response_time')
+        ]
+        if not latency_columns:
+            return {'error': 'No endpoint latency data available'}
+        
+        analysis = {'by_endpoint': {}}
+        for column in latency_columns:
+            endpoint = column[len('endpoints_status.'):-len('.response_time')]
+            latencies = pd.to_numeric(features_df[column], errors='coerce').dropna()
+            status_column = f'endpoints_status.{endpoint}.status'
+            statuses = features_df[status_column] if status_column in features_df.columns else pd.Series(dtype=object)
+            checks = statuses.notna().sum()
+            status_codes = pd.to_numeric(statuses, errors='coerce')
+            failures = (statuses.notna() & ~status_codes.between(200, 399)).sum()
+            
+            analysis['by_endpoint'][endpoint] = {
+                'mean': latencies.mean() if not latencies.empty else None,
+                'median': latencies.median() if not latencies.empty else None,
+                'p95': latencies.quantile(0.95) if not latencies.empty else None,
+                'p99': latencies.quantile(0.99) if not latencies.empty else None,
+                'count': len(latencies),
+                'error_rate': (failures / checks * 100) if checks else 0
+            }
+        
+        return analysis
+    
     def analyze_response_times(self, df: pd.DataFrame) -> Dict[str, Any]:
         """Analyze response time patterns and trends"""
         if df.empty:
@@ -107,7 +201,7 @@ class PerformanceAnalyzer:
             slope = np.polyfit(x, y, 1)[0]
             
             analysis['trends'] = {
-                'hourly_average': hourly_avg.to_dict(),
+                'hourly_average': {hour.isoformat(): value for hour, value in hourly_avg.items()},
                 'trend_slope': slope,
                 'trend_direction': 'improving' if slope < 0 else 'degrading' if slope > 0 else 'stable'
             }
@@ -264,10 +358,141 @@ class PerformanceAnalyzer:
         
         return analysis
     
+    def load_latency_history(self) -> Dict[str, Dict[str, DDSketch]]:
+        """Load hourly per-service latency sketches from the history file"""
+        if not os.path.exists(self.latency_history_path):
+            return {}
+        
+        try:
+            with open(self.latency_history_path, 'r') as f:
+                history = json.load(f)
+            
+            return {
+                hour: {service: DDSketch.from_dict(sketch) for service, sketch in services.items()}
+                for hour, services in history.get('hours', {}).items()
+            }
+        except Exception as e:
+            print(f"Error loading latency history: {e}")
+            return {}
+    
+    def update_latency_history(self, df: pd.DataFrame) -> Dict[str, Dict[str, DDSketch]]:
+        """Fold hourly per-service latency sketches from df into the on-disk history"""
+        history = self.load_latency_history()
+        
+        if not df.empty and 'response_time_ms' in df.columns:
+            df_filtered = df[df['response_time_ms'].notna()]
+            hours = df_filtered['timestamp'].dt.floor('H').dt.strftime('%Y-%m-%dT%H:00:00')
+            
+            # Hours present in the current data are rebuilt, so a partial hour is refreshed on the next run.
+            # The oldest loaded hour is cut by the load window, so an already stored (complete) sketch wins.
+            oldest = hours.min() if not hours.empty else None
+            for (hour, service), latencies in df_filtered.groupby([hours, 'service_name'])['response_time_ms']:
+                if hour == oldest and service in history.get(hour, {}):
+                    continue
+                sketch = DDSketch(self.sketch_accuracy)
+                sketch.add_array(latencies.values)
+                history.setdefault(hour, {})[service] = sketch
+        
+        if history:
+            cutoff = (datetime.strptime(max(history), '%Y-%m-%dT%H:%M:%S')
+                      - timedelta(days=self.latency_history_retention_days)).strftime('%Y-%m-%dT%H:00:00')
+            history = {hour: services for hour, services in history.items() if hour >= cutoff}
+        
+        try:
+            tmp_path = self.latency_history_path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump({
+                    'relative_accuracy': self.sketch_accuracy,
+                    'hours': {
+                        hour: {service: sketch.to_dict() for service, sketch in services.items()}
+                        for hour, services in sorted(history.items())
+                    }
+                }, f, separators=(',', ':'))
+            os.replace(tmp_path, self.latency_history_path)
+        except Exception as e:
+            print(f"Error saving latency history: {e}")
+        
+        return history
+    
+    def detect_performance_regressions(self, df: pd.DataFrame,
+                                       current_hours: int = 24,
+                                       baseline_hours: int = 168) -> Dict[str, Any]:
+        """Compare the current window's latency distribution with a baseline window per service"""
+        history = self.update_latency_history(df)
+        if not history:
+            return {'error': 'No latency history available'}
+        
+        window_end = datetime.strptime(max(history), '%Y-%m-%dT%H:%M:%S') + timedelta(hours=1)
+        current_start = window_end - timedelta(hours=current_hours)
+        baseline_start = current_start - timedelta(hours=baseline_hours)
+        current_key = current_start.strftime('%Y-%m-%dT%H:00:00')
+        baseline_key = baseline_start.strftime('%Y-%m-%dT%H:00:00')
+        
+        current_sketches, baseline_sketches = {}, {}
+        for hour, services in history.items():
+            if hour >= current_key:
+                target = current_sketches
+            elif hour >= baseline_key:
+                target = baseline_sketches
+            else:
+                continue
+            for service, sketch in services.items():
+                target.setdefault(service, DDSketch(self.sketch_accuracy)).merge(sketch)
+        
+        analysis = {
+            'current_window': {'start': current_start.isoformat(), 'end': window_end.isoformat()},
+            'baseline_window': {'start': baseline_start.isoformat(), 'end': current_start.isoformat()},
+            'regression_threshold': self.regression_threshold,
+            'by_service': {},
+            'regressions': []
+        }
+        
+        for service, current in current_sketches.items():
+            baseline = baseline_sketches.get(service)
+            if baseline is None or min(current.count, baseline.count) < self.regression_min_samples:
+                analysis['by_service'][service] = {
+                    'status': 'insufficient_data',
+                    'current': current.summary(),
+                    'baseline': baseline.summary() if baseline else None
+                }
+                continue
+            
+            current_summary = current.summary()
+            baseline_summary = baseline.summary()
+            deltas = {
+                quantile: (current_summary[quantile] - baseline_summary[quantile]) / baseline_summary[quantile]
+                if baseline_summary[quantile] else None
+                for quantile in ('p50', 'p95', 'p99')
+            }
+            ks = ks_compare(current, baseline)
+            worst_delta = max((delta for delta in deltas.values() if delta is not None), default=0)
+            is_regression = ks['significant'] and worst_delta > self.regression_threshold
+            
+            analysis['by_service'][service] = {
+                'status': 'regression' if is_regression else 'ok',
+                'current': current_summary,
+                'baseline': baseline_summary,
+                'relative_deltas': deltas,
+                'ks_test': ks
+            }
+            
+            if is_regression:
+                analysis['regressions'].append({
+                    'service': service,
+                    'worst_relative_delta': worst_delta,
+                    'p95_current': current_summary['p95'],
+                    'p95_baseline': baseline_summary['p95'],
+                    'ks_statistic': ks['statistic']
+                })
+        
+        analysis['regressions'].sort(key=lambda r: r['worst_relative_delta'], reverse=True)
+        return analysis
+    
     def generate_optimization_recommendations(self, 
                                             response_analysis: Dict[str, Any],
                                             availability_analysis: Dict[str, Any],
-                                            system_analysis: Dict[str, Any]) -> List[Dict[str, Any]]:
+                                            system_analysis: Dict[str, Any],
+                                            regression_analysis: Dict[str, Any] = None) -> List[Dict[str, Any]]:
         """Generate optimization recommendations based on analysis"""
         recommendations = []
         
@@ -362,6 +587,18 @@ class PerformanceAnalyzer:
                     'impact': 'Early problem detection'
                 })
         
+        # Run-over-run regression recommendations
+        if regression_analysis and regression_analysis.get('regressions'):
+            for regression in regression_analysis['regressions']:
+                recommendations.append({
+                    'category': 'Performance',
+                    'priority': 'High',
+                    'issue': f"Latency regression in {regression['service']} "
+                             f"(P95 {regression['p95_baseline']:.0f}ms → {regression['p95_current']:.0f}ms)",
+                    'recommendation': 'Review recent deployments and configuration changes for this service',
+                    'impact': 'Catch gradual performance drift early'
+                })
+        
         return recommendations
     
     def create_performance_visualizations(self, 
@@ -461,10 +698,12 @@ class PerformanceAnalyzer:
         response_analysis = self.analyze_response_times(monitoring_df)
         availability_analysis = self.analyze_availability(monitoring_df)
         system_analysis = self.analyze_system_performance(system_df)
+        regression_analysis = self.detect_performance_regressions(monitoring_df)
+        endpoint_analysis = self.analyze_endpoint_latency(self.load_metrics_features(hours, monitoring_df))
         
         # Generate recommendations
         recommendations = self.generate_optimization_recommendations(
-            response_analysis, availability_analysis, system_analysis
+            response_analysis, availability_analysis, system_analysis, regression_analysis
         )
         
         # Create visualizations
@@ -482,6 +721,8 @@ class PerformanceAnalyzer:
             'response_time_analysis': response_analysis,
             'availability_analysis': availability_analysis,
             'system_performance_analysis': system_analysis,
+            'regression_analysis': regression_analysis,
+            'endpoint_analysis': endpoint_analysis,
             'optimization_recommendations': recommendations,
             'visualization_path': plot_path
         }
@@ -525,6 +766,10 @@ def main():
             mem_avg = sys_analysis['memory_analysis'].get('average', 0)
             print(f"🧠 Average Memory Usage: {mem_avg:.1f}%")
     
+    regressions = report.get('regression_analysis', {}).get('regressions', [])
+    if regressions:
+        print(f"📉 Latency regressions vs baseline: {', '.join(r['service'] for r in regressions)}")
+    
     print(f"\n💡 OPTIMIZATION RECOMMENDATIONS ({len(report['optimization_recommendations'])}):")
     for i, rec in enumerate(report['optimization_recommendations'][:5], 1):
         print(f"  {i}. [{rec['priority']}] {rec['issue']}")
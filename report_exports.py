@@ -0,0 +1,280 @@
+"""
+AI Marketing Tools - Report Exports
+Background export jobs that stream logged analytics events into CSV, NDJSON
+or Parquet files, cached per (report type, date range, format) until new
+events are logged.
+"""
+
+import csv
+import json
+import os
+import re
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Iterator, Optional, Tuple
+
+from analytics_store import CODE, EVENT_SCHEMAS, JSON, LOG_ONLY_COLUMNS, NUMBER, TIME, to_epoch_us
+from event_log import EventLog
+from lazy_imports import LazyModule, module_available
+
+# pyarrow (optional, Parquet only) is imported on first use
+pa = LazyModule('pyarrow')
+pq = LazyModule('pyarrow.parquet')
+
+# Report type -> event types it contains
+REPORT_TYPES = {
+    'overview': ['page_views', 'user_interactions', 'conversion_events'],
+    'pageviews': ['page_views'],
+    'interactions': ['user_interactions'],
+    'conversions': ['conversion_events'],
+    'performance': ['performance_metrics'],
+    'all': list(EVENT_SCHEMAS)
+}
+
+# Format -> (file extension, mimetype)
+EXPORT_FORMATS = {
+    'csv': ('csv', 'text/csv'),
+    'ndjson': ('ndjson', 'application/x-ndjson'),
+    'parquet': ('parquet', 'application/vnd.apache.parquet')
+}
+FORMAT_ALIASES = {'json': 'ndjson', 'jsonl': 'ndjson'}
+
+DATE_RANGE_PATTERN = re.compile(r'^(\d+)([hd])$')
+MAX_DATE_RANGE = timedelta(days=90)
+REPORT_ID_PATTERN = re.compile(r'^report_\d{8}_\d{6}_[0-9a-f]{8}$')
+
+# Rows buffered per Parquet row group; CSV and NDJSON rows go straight to the file buffer
+PARQUET_ROW_GROUP = 50_000
+
+
+def parse_date_range(value: str) -> timedelta:
+    """'24h', '7d', '30d', ... -> timedelta (at most MAX_DATE_RANGE)"""
+    match = DATE_RANGE_PATTERN.match(str(value))
+    if not match:
+        raise ValueError("date_range must look like '24h' or '7d'")
+    amount, unit = int(match.group(1)), match.group(2)
+    span = timedelta(hours=amount) if unit == 'h' else timedelta(days=amount)
+    if not timedelta(0) < span <= MAX_DATE_RANGE:
+        raise ValueError(f"date_range must be between 1h and {MAX_DATE_RANGE.days}d")
+    return span
+
+
+def export_columns(event_types: List[str]) -> Dict[str, str]:
+    """Union of the event types' columns (column -> kind), record_type and timestamp first"""
+    columns = {'record_type': 'category', 'timestamp': TIME}
+    for event_type in event_types:
+        for column, kind in {**EVENT_SCHEMAS[event_type], **LOG_ONLY_COLUMNS.get(event_type, {})}.items():
+            columns.setdefault(column, kind)
+    return columns
+
+
+class ReportExporter:
+    """Runs report exports on a small thread pool and tracks them as jobs
+
+    Each job streams its rows from the event log (memory-mapped segments,
+    one record at a time) into a temporary file that is renamed into place
+    when complete, with a JSON sidecar so any worker can serve the download.
+    A finished export is reused for the same (type, date_range, format) until
+    the event log's data version changes.
+    """
+
+    def __init__(self, event_log: EventLog, export_dir: str, max_workers: int = 2, max_age_hours: int = 24):
+        self.event_log = event_log
+        self.export_dir = export_dir
+        self.max_age = timedelta(hours=max_age_hours)
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._cache: Dict[Tuple[str, str, str], str] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='report-export')
+
+    def _path(self, report_id: str, extension: str) -> str:
+        return os.path.join(self.export_dir, f"{report_id}.{extension}")
+
+    def file_path(self, job: Dict[str, Any]) -> str:
+        return self._path(job['report_id'], EXPORT_FORMATS[job['format']][0])
+
+    def request_export(self, report_type: str, date_range: str, format_type: str) -> Tuple[Dict[str, Any], bool]:
+        """Queue an export (or reuse a current one); returns (job, reused)"""
+        format_type = FORMAT_ALIASES.get(format_type, format_type)
+        if report_type not in REPORT_TYPES:
+            raise ValueError(f"report_type must be one of {', '.join(REPORT_TYPES)}")
+        if format_type not in EXPORT_FORMATS:
+            raise ValueError(f"format must be one of {', '.join(list(EXPORT_FORMATS) + list(FORMAT_ALIASES))}")
+        if format_type == 'parquet' and not module_available('pyarrow'):
+            raise ValueError("Parquet export requires pyarrow")
+        span = parse_date_range(date_range)
+
+        key = (report_type, date_range, format_type)
+        version = self.event_log.data_version()
+        with self._lock:
+            job = self._jobs.get(self._cache.get(key))
+            if job is not None and job['data_version'] == version and (
+                    job['status'] in ('queued', 'running')
+                    or (job['status'] == 'complete' and os.path.exists(self.file_path(job)))):
+                return dict(job), True
+
+            now = datetime.now()
+            report_id = f"report_{now.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+            job = {
+                'report_id': report_id,
+                'type': report_type,
+                'date_range': date_range,
+                'format': format_type,
+                'event_types': REPORT_TYPES[report_type],
+                'start': (now - span).isoformat(),
+                'end': now.isoformat(),
+                'data_version': version,
+                'status': 'queued',
+                'created_at': now.isoformat(),
+                'completed_at': None,
+                'rows': 0,
+                'bytes': 0,
+                'error': None
+            }
+            self._jobs[report_id] = job
+            self._cache[key] = report_id
+
+        self._prune()
+        self._executor.submit(self._run, report_id)
+        return dict(job), False
+
+    def get_job(self, report_id: str) -> Optional[Dict[str, Any]]:
+        """Job state from this process, or from the sidecar written by another worker"""
+        if not REPORT_ID_PATTERN.match(report_id):
+            return None
+        with self._lock:
+            job = self._jobs.get(report_id)
+            if job is not None:
+                return dict(job)
+        try:
+            with open(self._path(report_id, 'json'), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_metadata(self, job: Dict[str, Any]):
+        path = self._path(job['report_id'], 'json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(job, f)
+        os.replace(path + '.tmp', path)
+
+    def _update(self, report_id: str, **changes) -> Dict[str, Any]:
+        with self._lock:
+            job = self._jobs[report_id]
+            job.update(changes)
+            job = dict(job)
+        self._save_metadata(job)
+        return job
+
+    def _run(self, report_id: str):
+        os.makedirs(self.export_dir, exist_ok=True)
+        job = self._update(report_id, status='running', started_at=datetime.now().isoformat())
+        path = self.file_path(job)
+        tmp_path = path + '.tmp'
+        try:
+            writer = getattr(self, f"_write_{job['format']}")
+            rows = writer(tmp_path, self.iter_rows(job), export_columns(job['event_types']))
+            os.replace(tmp_path, path)
+            self._update(report_id, status='complete', rows=rows, bytes=os.path.getsize(path),
+                         completed_at=datetime.now().isoformat())
+            print(f"📤 Report {report_id} exported: {rows:,} rows")
+        except Exception as e:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            self._update(report_id, status='failed', error=str(e), completed_at=datetime.now().isoformat())
+            print(f"Error exporting report {report_id}: {e}")
+
+    def iter_rows(self, job: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Logged events of the job's types and time range, one at a time (log order per writer)"""
+        for event_type, record in self.event_log.read(job['start'], job['end'], job['event_types']):
+            row = {'record_type': event_type}
+            row.update(record)
+            yield row
+
+    @staticmethod
+    def _write_csv(path: str, rows: Iterator[Dict[str, Any]], columns: Dict[str, str]) -> int:
+        count = 0
+        json_columns = [column for column, kind in columns.items() if kind == JSON]
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=list(columns), restval='', extrasaction='ignore')
+            writer.writeheader()
+            for row in rows:
+                for column in json_columns:
+                    if row.get(column) is not None:
+                        row[column] = json.dumps(row[column], separators=(',', ':'))
+                writer.writerow(row)
+                count += 1
+        return count
+
+    @staticmethod
+    def _write_ndjson(path: str, rows: Iterator[Dict[str, Any]], columns: Dict[str, str]) -> int:
+        count = 0
+        with open(path, 'w', encoding='utf-8') as f:
+            for row in rows:
+                f.write(json.dumps(row, separators=(',', ':'), default=str) + '\n')
+                count += 1
+        return count
+
+    @staticmethod
+    def _write_parquet(path: str, rows: Iterator[Dict[str, Any]], columns: Dict[str, str]) -> int:
+        """One row group per PARQUET_ROW_GROUP rows, so memory stays bounded"""
+        types = {TIME: pa.timestamp('us'), NUMBER: pa.float64(), CODE: pa.int32()}
+        schema = pa.schema([(column, types.get(kind, pa.string())) for column, kind in columns.items()])
+
+        def to_table(batch: List[Dict[str, Any]]):
+            arrays = []
+            for column, kind in columns.items():
+                values = [row.get(column) for row in batch]
+                if kind == TIME:
+                    arrays.append(pa.array([to_epoch_us(value) if value else None for value in values],
+                                           pa.int64()).cast(pa.timestamp('us')))
+                elif kind == NUMBER:
+                    arrays.append(pa.array([None if value is None else float(value) for value in values],
+                                           pa.float64()))
+                elif kind == CODE:
+                    arrays.append(pa.array([None if value is None else int(value) for value in values],
+                                           pa.int32()))
+                elif kind == JSON:
+                    arrays.append(pa.array([None if value is None else json.dumps(value) for value in values],
+                                           pa.string()))
+                else:
+                    arrays.append(pa.array([None if value is None else str(value) for value in values],
+                                           pa.string()))
+            return pa.Table.from_arrays(arrays, schema=schema)
+
+        count = 0
+        with pq.ParquetWriter(path, schema, compression='zstd') as writer:
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= PARQUET_ROW_GROUP:
+                    writer.write_table(to_table(batch))
+                    count += len(batch)
+                    batch = []
+            if batch or not count:
+                writer.write_table(to_table(batch))
+                count += len(batch)
+        return count
+
+    def _prune(self):
+        """Delete export files and job state older than max_age"""
+        cutoff = datetime.now() - self.max_age
+        with self._lock:
+            expired = [report_id for report_id, job in self._jobs.items()
+                       if job['status'] in ('complete', 'failed')
+                       and datetime.fromisoformat(job['created_at']) < cutoff]
+            for report_id in expired:
+                del self._jobs[report_id]
+            self._cache = {key: report_id for key, report_id in self._cache.items() if report_id in self._jobs}
+
+        if not os.path.isdir(self.export_dir):
+            return
+        for filename in os.listdir(self.export_dir):
+            path = os.path.join(self.export_dir, filename)
+            try:
+                if datetime.fromtimestamp(os.path.getmtime(path)) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
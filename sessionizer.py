@@ -0,0 +1,207 @@
+"""
+AI Marketing Tools - Sessionizer
+Streams tracked events into sessions, keeping only open sessions in a bounded
+map whose inactivity expiry is driven by a time wheel, and emits each session
+once it closes.
+"""
+
+import math
+import sys
+import threading
+import time
+from operator import itemgetter
+from typing import Dict, List, Any, Optional
+
+from analytics_rollups import event_epoch
+
+# Event types that belong to a session; only pageviews count as pages
+SESSION_EVENT_TYPES = ('page_views', 'user_interactions')
+
+
+class OpenSession:
+    """State of a session that has not timed out yet"""
+
+    __slots__ = ('first_seen', 'last_seen', 'pages', 'interactions',
+                 'entry_page', 'entry_at', 'exit_page', 'exit_at', 'expiry_tick')
+
+    def __init__(self, timestamp: float):
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.pages = 0
+        self.interactions = 0
+        self.entry_page = None
+        self.entry_at = math.inf
+        self.exit_page = None
+        self.exit_at = -math.inf
+        self.expiry_tick = 0
+
+    def add_pageview(self, page: str, timestamp: float):
+        self.pages += 1
+        if timestamp < self.entry_at:
+            self.entry_page, self.entry_at = page, timestamp
+        if timestamp >= self.exit_at:
+            self.exit_page, self.exit_at = page, timestamp
+
+    def closed(self, session_id: str) -> Dict[str, Any]:
+        """Closed-session record, timestamped at the session start (the bucket it is counted in)"""
+        return {
+            'session_id': session_id,
+            'timestamp': self.first_seen,
+            'duration': self.last_seen - self.first_seen,
+            'pages': self.pages,
+            'interactions': self.interactions,
+            'entry_page': self.entry_page,
+            'exit_page': self.exit_page,
+            'bounce': self.pages <= 1 and not self.interactions
+        }
+
+
+class Sessionizer:
+    """Open sessions keyed by session id, closed after `timeout` seconds of inactivity
+
+    Expiry is scheduled on a time wheel of `tick`-second slots covering the
+    timeout. Touching a session only adds it to its new slot; stale entries
+    are skipped when a slot comes due, so both touching and expiring are O(1)
+    per session. Time is the larger of the newest event time seen and the
+    `now` passed to advance(), so replaying old events sessionizes them as
+    they happened. At most `max_sessions` stay open: beyond that the session
+    due to expire soonest is closed early, which bounds memory.
+    """
+
+    def __init__(self, timeout: float = 1800, max_sessions: int = 1_000_000, tick: float = 60):
+        self.timeout = timeout
+        self.max_sessions = max_sessions
+        self.tick = tick
+        self.sessions: Dict[str, OpenSession] = {}
+        self._size = int(math.ceil(timeout / tick)) + 2
+        self._wheel: List[set] = [set() for _ in range(self._size)]
+        self._tick: Optional[int] = None
+        self.watermark = 0.0
+        self._lock = threading.Lock()
+        self.stats = {'opened': 0, 'closed': 0, 'evicted': 0}
+
+    def _schedule(self, session_id: str, session: OpenSession):
+        expiry_tick = int((session.last_seen + self.timeout) // self.tick) + 1
+        if expiry_tick != session.expiry_tick:
+            session.expiry_tick = expiry_tick
+            self._wheel[expiry_tick % self._size].add(session_id)
+
+    def _touch(self, session_id: str, timestamp: float, closed: List[Dict[str, Any]]) -> OpenSession:
+        session = self.sessions.get(session_id)
+        if session is not None and timestamp - session.last_seen > self.timeout:
+            # Idle past the timeout before the wheel got to it: the old session is over
+            self._close(session_id, closed)
+            session = None
+        if session is None:
+            if len(self.sessions) >= self.max_sessions:
+                self._evict(closed)
+            session = self.sessions[session_id] = OpenSession(timestamp)
+            self.stats['opened'] += 1
+        elif timestamp < session.first_seen:
+            session.first_seen = timestamp
+        if timestamp > session.last_seen:
+            session.last_seen = timestamp
+        return session
+
+    def _close(self, session_id: str, closed: List[Dict[str, Any]]):
+        closed.append(self.sessions.pop(session_id).closed(session_id))
+        self.stats['closed'] += 1
+
+    def _evict(self, closed: List[Dict[str, Any]]):
+        """Close the open session due to expire soonest"""
+        for offset in range(self._size):
+            index = (self._tick + offset) % self._size
+            slot = self._wheel[index]
+            while slot:
+                session_id = slot.pop()
+                session = self.sessions.get(session_id)
+                if session is not None and session.expiry_tick % self._size == index:
+                    self._close(session_id, closed)
+                    self.stats['evicted'] += 1
+                    return
+
+    def _advance(self, now: float, closed: List[Dict[str, Any]]):
+        target = int(now // self.tick)
+        if self._tick is None:
+            self._tick = target
+        if target - self._tick >= self._size:
+            # Idle for longer than the wheel: sweep everything once instead of every missed tick
+            for session_id, session in list(self.sessions.items()):
+                if session.expiry_tick <= target:
+                    self._close(session_id, closed)
+            self._wheel = [set() for _ in range(self._size)]
+            for session_id, session in self.sessions.items():
+                self._wheel[session.expiry_tick % self._size].add(session_id)
+            self._tick = target + 1
+            return
+
+        while self._tick <= target:
+            index = self._tick % self._size
+            keep = set()
+            for session_id in self._wheel[index]:
+                session = self.sessions.get(session_id)
+                if session is None:
+                    continue
+                if session.expiry_tick <= self._tick:
+                    self._close(session_id, closed)
+                elif session.expiry_tick % self._size == index:
+                    keep.add(session_id)
+            self._wheel[index] = keep
+            self._tick += 1
+
+    def add(self, grouped: Dict[str, List[Dict[str, Any]]], now: float = None) -> List[Dict[str, Any]]:
+        """Fold stored events ({storage: [records]}) into their sessions; returns the sessions closed meanwhile
+
+        Expiry runs after the whole batch, so a batch's pageviews and interactions join the same sessions.
+        """
+        events = []
+        for storage in SESSION_EVENT_TYPES:
+            is_pageview = storage == 'page_views'
+            for record in grouped.get(storage, ()):
+                if record.get('session_id'):
+                    events.append((event_epoch(record), is_pageview, record))
+        # Time order, so gaps between a session's events are measured across event types
+        events.sort(key=itemgetter(0))
+
+        closed = []
+        with self._lock:
+            if events and self._tick is None:
+                self._tick = int(events[0][0] // self.tick)
+            for timestamp, is_pageview, record in events:
+                session_id = record['session_id']
+                session = self._touch(session_id, timestamp, closed)
+                if is_pageview:
+                    session.add_pageview(record.get('page') or '/', timestamp)
+                else:
+                    session.interactions += 1
+                self._schedule(session_id, session)
+            if events:
+                self.watermark = max(self.watermark, events[-1][0])
+            self.watermark = max(self.watermark, now or 0.0)
+            if self._tick is not None:
+                self._advance(self.watermark, closed)
+        return closed
+
+    def advance(self, now: float = None) -> List[Dict[str, Any]]:
+        """Close sessions idle for longer than the timeout as of now; returns them"""
+        closed = []
+        with self._lock:
+            self.watermark = max(self.watermark, now or time.time())
+            if self._tick is not None:
+                self._advance(self.watermark, closed)
+        return closed
+
+    def memory_bytes(self) -> int:
+        """Approximate memory of the open-session state"""
+        per_session = sys.getsizeof(OpenSession(0.0)) + 100
+        return len(self.sessions) * per_session + sum(sys.getsizeof(slot) for slot in self._wheel)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.stats,
+                'open': len(self.sessions),
+                'max_open': self.max_sessions,
+                'timeout_seconds': self.timeout,
+                'memory_bytes': self.memory_bytes()
+            }
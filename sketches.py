@@ -0,0 +1,651 @@
+"""
+AI Marketing Tools - Streaming Sketches
+Compact, mergeable summaries used by the analyzer and analytics aggregation layer.
+"""
+
+import base64
+import hashlib
+import heapq
+import math
+from array import array
+from functools import lru_cache
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+from lazy_imports import LazyModule
+
+# numpy is only needed for bulk inserts and register arithmetic
+np = LazyModule('numpy')
+
+
+@lru_cache(maxsize=1 << 16)
+def stable_hash64(value: Any) -> int:
+    """64-bit hash that is identical across processes (unlike hash(), which is salted)
+
+    Memoized, since pages, referrers and visitor ids repeat heavily in event streams.
+    """
+    data = value if isinstance(value, bytes) else str(value).encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'big')
+
+
+class DDSketch:
+    """Mergeable quantile sketch with relative-error guarantees (DDSketch).
+
+    Values are counted in logarithmic buckets so every quantile estimate is
+    within `relative_accuracy` of the true value, and two sketches built with
+    the same accuracy merge by adding bucket counts.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _index(self, value: float) -> int:
+        return int(math.ceil(math.log(value) / self.log_gamma))
+
+    def _value(self, index: int) -> float:
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+    def add(self, value: float, count: int = 1):
+        """Add a single value (non-positive values are counted as zero)"""
+        if value > 0:
+            index = self._index(value)
+            self.bins[index] = self.bins.get(index, 0) + count
+        else:
+            self.zero_count += count
+
+        self.count += count
+        self.sum += value * count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def add_array(self, values: Iterable[float]):
+        """Add many values in one vectorized pass"""
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return
+
+        positive = values[values > 0]
+        if positive.size:
+            indexes = np.ceil(np.log(positive) / self.log_gamma).astype(np.int64)
+            unique_indexes, counts = np.unique(indexes, return_counts=True)
+            for index, count in zip(unique_indexes.tolist(), counts.tolist()):
+                self.bins[index] = self.bins.get(index, 0) + count
+
+        self.zero_count += int(values.size - positive.size)
+        self.count += int(values.size)
+        self.sum += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    def merge(self, other: 'DDSketch') -> 'DDSketch':
+        """Merge another sketch into this one in place"""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate the q-quantile (0 <= q <= 1)"""
+        if self.count == 0:
+            return None
+
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                return min(max(self._value(index), self.min), self.max)
+
+        return self.max
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+    def cdf_points(self) -> Dict[int, int]:
+        """Cumulative counts (zero bucket included) at each bucket index"""
+        cumulative = {}
+        seen = self.zero_count
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            cumulative[index] = seen
+        return cumulative
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'p50': self.quantile(0.50),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Compact JSON-serializable form"""
+        return {
+            'alpha': self.relative_accuracy,
+            'bins': {str(index): count for index, count in self.bins.items()},
+            'zero': self.zero_count,
+            'count': self.count,
+            'sum': self.sum,
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'DDSketch':
+        sketch = cls(data['alpha'])
+        sketch.bins = {int(index): count for index, count in data['bins'].items()}
+        sketch.zero_count = data['zero']
+        sketch.count = data['count']
+        sketch.sum = data['sum']
+        if sketch.count:
+            sketch.min = data['min']
+            sketch.max = data['max']
+        return sketch
+
+    @classmethod
+    def merged(cls, sketches: List['DDSketch'], relative_accuracy: float = 0.01) -> 'DDSketch':
+        """Merge a list of sketches into a new one"""
+        result = cls(relative_accuracy)
+        for sketch in sketches:
+            result.merge(sketch)
+        return result
+
+
+class HyperLogLog:
+    """Mergeable distinct-count sketch (HyperLogLog with linear counting for small sets).
+
+    Uses 2**precision one-byte registers; the relative standard error of the
+    estimate is about 1.04 / sqrt(2**precision). Sketches with the same
+    precision merge by taking the register-wise maximum. Hashing is stable
+    across processes, so a serialized sketch (to_dict) stays valid when it
+    is loaded elsewhere.
+    """
+
+    def __init__(self, precision: int = 12):
+        if not 4 <= precision <= 18:
+            raise ValueError("precision must be between 4 and 18")
+
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = bytearray(self.m)
+        self._rank_bits = 64 - precision
+        self._rank_mask = (1 << self._rank_bits) - 1
+
+    @property
+    def relative_error(self) -> float:
+        """Relative standard error of count()"""
+        return 1.04 / math.sqrt(self.m)
+
+    @property
+    def memory_bytes(self) -> int:
+        return self.m
+
+    def add(self, value: Any):
+        hashed = stable_hash64(value)
+        index = hashed >> self._rank_bits
+        rank = self._rank_bits - (hashed & self._rank_mask).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values: Iterable[Any]):
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: 'HyperLogLog') -> 'HyperLogLog':
+        """Merge another sketch into this one in place"""
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches with different precision")
+
+        merged = np.maximum(np.frombuffer(self.registers, dtype=np.uint8),
+                            np.frombuffer(other.registers, dtype=np.uint8))
+        self.registers = bytearray(merged.tobytes())
+        return self
+
+    def copy(self) -> 'HyperLogLog':
+        sketch = HyperLogLog(self.precision)
+        sketch.registers = bytearray(self.registers)
+        return sketch
+
+    def count(self) -> int:
+        """Estimated number of distinct values added"""
+        registers = np.frombuffer(self.registers, dtype=np.uint8)
+        zeros = int(np.count_nonzero(registers == 0))
+        if zeros == self.m:
+            return 0
+
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m * self.m / float(np.exp2(-registers.astype(np.float64)).sum())
+        if estimate <= 2.5 * self.m and zeros:
+            estimate = self.m * math.log(self.m / zeros)
+        return int(round(estimate))
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def error_bounds(self, sigmas: float = 2.0) -> Dict[str, Any]:
+        """Estimate with a +/- sigmas * standard error interval (2 sigmas ~ 95%)"""
+        estimate = self.count()
+        margin = estimate * self.relative_error * sigmas
+        return {
+            'estimate': estimate,
+            'precision': self.precision,
+            'relative_error': self.relative_error,
+            'low': max(0, int(math.floor(estimate - margin))),
+            'high': int(math.ceil(estimate + margin))
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Compact JSON-serializable form"""
+        return {'p': self.precision, 'registers': base64.b64encode(bytes(self.registers)).decode('ascii')}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'HyperLogLog':
+        sketch = cls(data['p'])
+        sketch.registers = bytearray(base64.b64decode(data['registers']))
+        return sketch
+
+    @classmethod
+    def merged(cls, sketches: List['HyperLogLog'], precision: int = 12) -> 'HyperLogLog':
+        """Merge a list of sketches into a new one"""
+        result = cls(precision)
+        for sketch in sketches:
+            result.merge(sketch)
+        return result
+
+
+@lru_cache(maxsize=1 << 16)
+def count_min_cells(key: Any, width: int, depth: int) -> Tuple[int, ...]:
+    """Flat table cells of key in every Count-Min row (double hashing from one 64-bit hash)"""
+    hashed = stable_hash64(key)
+    low, high = hashed & 0xFFFFFFFF, hashed >> 32
+    cells = []
+    for offset in range(0, depth * width, width):
+        cells.append(offset + low % width)
+        low += high
+    return tuple(cells)
+
+
+class CountMinSketch:
+    """Mergeable frequency sketch (Count-Min).
+
+    A depth x width table of counters; estimates never undercount and
+    overcount by at most e / width * total with probability 1 - exp(-depth).
+    Sketches with the same dimensions merge by adding tables.
+    """
+
+    def __init__(self, width: int = 256, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        # Flattened depth x width table; row r, column c lives at r * width + c.
+        # array('q') keeps single-counter updates cheap; merges go through numpy views.
+        self.table = array('q', bytes(8 * depth * width))
+        self.total = 0
+
+    def _cells(self, key: Any) -> Tuple[int, ...]:
+        return count_min_cells(key, self.width, self.depth)
+
+    def add(self, key: Any, count: int = 1):
+        table = self.table
+        for cell in self._cells(key):
+            table[cell] += count
+        self.total += count
+
+    def estimate(self, key: Any) -> int:
+        return min(map(self.table.__getitem__, self._cells(key)))
+
+    def estimates(self, keys: List[Any]) -> List[int]:
+        return [self.estimate(key) for key in keys]
+
+    def merge(self, other: 'CountMinSketch') -> 'CountMinSketch':
+        """Merge another sketch into this one in place"""
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("Cannot merge Count-Min sketches with different dimensions")
+        view = np.frombuffer(self.table, dtype=np.int64)
+        view += np.frombuffer(other.table, dtype=np.int64)
+        self.total += other.total
+        return self
+
+    def copy(self) -> 'CountMinSketch':
+        sketch = CountMinSketch(self.width, self.depth)
+        sketch.table = array('q', self.table)
+        sketch.total = self.total
+        return sketch
+
+    @property
+    def error_bound(self) -> float:
+        """Maximum overcount (with probability 1 - exp(-depth))"""
+        return math.e / self.width * self.total
+
+
+class SpaceSaving:
+    """Top-k heavy hitters in bounded memory (Space-Saving).
+
+    Keeps at most `capacity` counters for string keys; an unseen key replaces
+    the smallest counter and inherits its count as error, so every key with a
+    true count above total / capacity is always present and no count is
+    underestimated. Summaries merge with the mergeable-summaries rule
+    (missing keys are charged the other summary's minimum).
+    """
+
+    def __init__(self, capacity: int = 64):
+        self.capacity = capacity
+        # key -> [count, error]
+        self.counters: Dict[str, List[int]] = {}
+        # (count, key) min-heap; entries go stale as counts grow and are refreshed lazily on eviction
+        self._heap: List[Any] = []
+
+    def add(self, key: str, count: int = 1):
+        counter = self.counters.get(key)
+        if counter is not None:
+            counter[0] += count
+            return
+        if len(self.counters) < self.capacity:
+            self.counters[key] = [count, 0]
+            heapq.heappush(self._heap, (count, key))
+            return
+
+        heap = self._heap
+        while True:
+            smallest_count, smallest = heap[0]
+            current = self.counters[smallest][0]
+            if current == smallest_count:
+                break
+            heapq.heapreplace(heap, (current, smallest))
+
+        del self.counters[smallest]
+        self.counters[key] = [smallest_count + count, smallest_count]
+        heapq.heapreplace(heap, (smallest_count + count, key))
+
+    def _minimum(self) -> int:
+        if len(self.counters) < self.capacity:
+            return 0
+        return min(count for count, _ in self.counters.values())
+
+    def _set_counters(self, counters: Dict[str, List[int]]):
+        self.counters = counters
+        self._heap = [(count, key) for key, (count, _) in counters.items()]
+        heapq.heapify(self._heap)
+
+    def merge(self, other: 'SpaceSaving') -> 'SpaceSaving':
+        """Merge another summary into this one in place"""
+        own_min, other_min = self._minimum(), other._minimum()
+        merged = {}
+        for key in self.counters.keys() | other.counters.keys():
+            count, error = self.counters.get(key, (own_min, own_min))
+            other_count, other_error = other.counters.get(key, (other_min, other_min))
+            merged[key] = [count + other_count, error + other_error]
+
+        if len(merged) > self.capacity:
+            merged = dict(heapq.nlargest(self.capacity, merged.items(), key=lambda item: item[1][0]))
+        self._set_counters(merged)
+        return self
+
+    def copy(self) -> 'SpaceSaving':
+        summary = SpaceSaving(self.capacity)
+        summary.counters = {key: list(counter) for key, counter in self.counters.items()}
+        summary._heap = list(self._heap)
+        return summary
+
+    def top(self, n: int = 10) -> List[Dict[str, Any]]:
+        ranked = heapq.nlargest(n, self.counters.items(), key=lambda item: item[1][0])
+        return [{'key': key, 'count': count, 'error': error} for key, (count, error) in ranked]
+
+
+class HeavyHitters:
+    """Space-Saving candidates with Count-Min refined counts.
+
+    Space-Saving decides which keys are heavy; each reported count is the
+    smaller of the two sketches' (both never-underestimating) counts. While
+    at most `capacity` distinct keys have been seen the Space-Saving counts
+    are exact, so the Count-Min table is only allocated once that overflows;
+    most per-minute buckets never need one.
+    """
+
+    def __init__(self, capacity: int = 64, width: int = 512, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.candidates = SpaceSaving(capacity)
+        self.frequencies: Optional[CountMinSketch] = None
+        self.total = 0
+
+    def _materialize(self):
+        if self.frequencies is None:
+            self.frequencies = CountMinSketch(self.width, self.depth)
+            for key, (count, _) in self.candidates.counters.items():
+                self.frequencies.add(key, count)
+
+    def add(self, key: str, count: int = 1):
+        if self.frequencies is None and key not in self.candidates.counters \
+                and len(self.candidates.counters) >= self.candidates.capacity:
+            self._materialize()
+        if self.frequencies is not None:
+            self.frequencies.add(key, count)
+        self.candidates.add(key, count)
+        self.total += count
+
+    def merge(self, other: 'HeavyHitters') -> 'HeavyHitters':
+        """Merge another sketch (same dimensions) into this one in place"""
+        exact = self.frequencies is None and other.frequencies is None and len(
+            self.candidates.counters.keys() | other.candidates.counters.keys()) <= self.candidates.capacity
+        if not exact:
+            self._materialize()
+            if other.frequencies is not None:
+                self.frequencies.merge(other.frequencies)
+            else:
+                for key, (count, _) in other.candidates.counters.items():
+                    self.frequencies.add(key, count)
+
+        self.candidates.merge(other.candidates)
+        self.total += other.total
+        return self
+
+    def copy(self) -> 'HeavyHitters':
+        sketch = HeavyHitters(self.candidates.capacity, self.width, self.depth)
+        sketch.candidates = self.candidates.copy()
+        sketch.frequencies = self.frequencies.copy() if self.frequencies is not None else None
+        sketch.total = self.total
+        return sketch
+
+    def top(self, n: int = 10) -> List[Dict[str, Any]]:
+        """The n heaviest keys with counts and the maximum overcount of each"""
+        if self.frequencies is None:
+            return self.candidates.top(n)
+
+        keys = list(self.candidates.counters)
+        error_bound = int(self.frequencies.error_bound)
+        ranked = [
+            {'key': key, 'count': min(count, estimate), 'error': min(error, error_bound)}
+            for key, estimate, (count, error) in zip(
+                keys, self.frequencies.estimates(keys), self.candidates.counters.values())
+        ]
+        return heapq.nlargest(n, ranked, key=lambda item: item['count'])
+
+
+class RotatingBloomFilter:
+    """Time-bucketed Bloom filter for "seen within the last window" membership.
+
+    The window is covered by `generations` equal-sized bitsets, each taking
+    new keys for window / (generations - 1) seconds before the oldest one is
+    dropped, so a key is remembered for at least `window` seconds and memory
+    stays fixed at `memory_bytes`. There are no false negatives inside the
+    window; the false-positive rate grows with how full the bitsets are
+    (about 1% at 9.6 bits per key with the default 7 hashes).
+    """
+
+    def __init__(self, window: float, memory_bytes: int, generations: int = 4, hashes: int = 7):
+        if generations < 2:
+            raise ValueError("generations must be at least 2")
+
+        self.window = window
+        self.generations = generations
+        self.hashes = hashes
+        self.span = window / (generations - 1)
+        self.bits = max(8, memory_bytes // generations) * 8
+        # Oldest first; each entry is [start time, bitset, keys added]
+        self._filters: List[List[Any]] = []
+        self._current: Optional[List[Any]] = None
+
+    def _cells(self, key: Any) -> List[Tuple[int, int]]:
+        """(byte offset, bit mask) of each of the key's bits
+
+        The filter lives in one process only, so the (salted, but cached per
+        string) built-in hash() is enough; double hashing derives the k bits.
+        """
+        hashed = hash(key) & 0xFFFFFFFFFFFFFFFF
+        low, high, bits = hashed & 0xFFFFFFFF, hashed >> 32 | 1, self.bits
+        cells = []
+        for _ in range(self.hashes):
+            position = low % bits
+            cells.append((position >> 3, 1 << (position & 7)))
+            low += high
+        return cells
+
+    @staticmethod
+    def _in(bitset: bytearray, cells: List[Tuple[int, int]]) -> bool:
+        for offset, mask in cells:
+            if not bitset[offset] & mask:
+                return False
+        return True
+
+    def _rotate(self, now: float):
+        current = self._current
+        if current is not None and now < current[0] + self.span:
+            return
+        if current is None or now >= current[0] + self.span * self.generations:
+            self._filters = []
+            start = now
+        else:
+            start = current[0] + (now - current[0]) // self.span * self.span
+        self._current = [start, bytearray(self.bits // 8), 0]
+        # Drop generations whose every key is older than the window
+        self._filters = [entry for entry in self._filters[-(self.generations - 1):]
+                         if entry[0] + self.span > now - self.window]
+        self._filters.append(self._current)
+
+    def add(self, key: Any, now: float) -> bool:
+        """Remember key; returns True if it was (probably) already seen within the window"""
+        self._rotate(now)
+        cells = self._cells(key)
+        seen = any(self._in(bitset, cells) for _, bitset, _ in self._filters)
+
+        current = self._current
+        bitset = current[1]
+        for offset, mask in cells:
+            bitset[offset] |= mask
+        current[2] += 1
+        return seen
+
+    def __contains__(self, key: Any) -> bool:
+        cells = self._cells(key)
+        return any(self._in(bitset, cells) for _, bitset, _ in self._filters)
+
+    @property
+    def memory_bytes(self) -> int:
+        return sum(len(bitset) for _, bitset, _ in self._filters)
+
+    @property
+    def capacity(self) -> int:
+        """Keys per generation before the false-positive rate passes ~1%"""
+        return int(self.bits / 9.6)
+
+    def false_positive_rate(self) -> float:
+        """Expected chance that an unseen key is reported as seen, from the bitsets' key counts"""
+        miss = 1.0
+        for _, _, count in self._filters:
+            miss *= 1 - (1 - math.exp(-self.hashes * count / self.bits)) ** self.hashes
+        return 1 - miss
+
+
+def hyperloglog_accuracy(cardinalities: Iterable[int], precision: int = 12, trials: int = 5,
+                         sigmas: float = 3.0) -> List[Dict[str, Any]]:
+    """Compare HyperLogLog estimates with exact distinct counts on synthetic visitor ids
+
+    Each trial uses a disjoint id range and also checks that merging two half
+    sketches gives the same estimate as one sketch over all ids.
+    """
+    results = []
+    for cardinality in cardinalities:
+        errors = []
+        merge_consistent = True
+        for trial in range(trials):
+            ids = [f"user_id:{trial}-{n}" for n in range(cardinality)]
+            sketch = HyperLogLog(precision)
+            sketch.update(ids)
+            errors.append((sketch.count() - cardinality) / cardinality if cardinality else 0.0)
+
+            halves = HyperLogLog(precision)
+            halves.update(ids[::2])
+            other = HyperLogLog(precision)
+            other.update(ids[1::2])
+            merge_consistent &= halves.merge(other).registers == sketch.registers
+
+        relative_error = 1.04 / math.sqrt(1 << precision)
+        worst = max(abs(error) for error in errors)
+        results.append({
+            'cardinality': cardinality,
+            'precision': precision,
+            'expected_relative_error': relative_error,
+            'mean_abs_error': sum(abs(error) for error in errors) / len(errors),
+            'max_abs_error': worst,
+            'merge_consistent': merge_consistent,
+            'within_bounds': merge_consistent and worst <= sigmas * relative_error
+        })
+    return results
+
+
+# Two-sample KS critical coefficients c(alpha) for D > c * sqrt((n + m) / (n * m))
+KS_CRITICAL_COEFFICIENTS = {0.10: 1.224, 0.05: 1.358, 0.01: 1.628, 0.001: 1.949}
+
+
+def ks_compare(current: DDSketch, baseline: DDSketch, significance: float = 0.01) -> Dict[str, Any]:
+    """Two-sample Kolmogorov-Smirnov comparison evaluated on sketch bucket boundaries"""
+    if significance not in KS_CRITICAL_COEFFICIENTS:
+        raise ValueError(f"significance must be one of {', '.join(map(str, sorted(KS_CRITICAL_COEFFICIENTS)))}")
+    if current.count == 0 or baseline.count == 0:
+        return {'statistic': None, 'critical_value': None, 'significant': False}
+
+    current_cdf = current.cdf_points()
+    baseline_cdf = baseline.cdf_points()
+
+    statistic = abs(current.zero_count / current.count - baseline.zero_count / baseline.count)
+    current_seen = current.zero_count
+    baseline_seen = baseline.zero_count
+    for index in sorted(set(current_cdf) | set(baseline_cdf)):
+        current_seen = current_cdf.get(index, current_seen)
+        baseline_seen = baseline_cdf.get(index, baseline_seen)
+        statistic = max(statistic, abs(current_seen / current.count - baseline_seen / baseline.count))
+
+    n, m = current.count, baseline.count
+    critical_value = KS_CRITICAL_COEFFICIENTS[significance] * math.sqrt((n + m) / (n * m))
+
+    return {
+        'statistic': statistic,
+        'critical_value': critical_value,
+        'significant': statistic > critical_value
+    }
@@ -0,0 +1,143 @@
+"""
+Tracking endpoints of the analytics blueprint through the Flask test client.
+The module keeps its state in ANALYTICS_DATA_DIR, so it is imported once per
+test module with that pointed at a temporary directory.
+"""
+
+import gzip
+import importlib
+import io
+import json
+import sys
+
+import pytest
+from flask import Flask
+
+
+@pytest.fixture(scope='module')
+def analytics(tmp_path_factory):
+    patch = pytest.MonkeyPatch()
+    patch.setenv('ANALYTICS_DATA_DIR', str(tmp_path_factory.mktemp('analytics')))
+    patch.setenv('ANALYTICS_INGEST_FLUSH_MS', '5')
+    sys.modules.pop('analytics', None)
+    module = importlib.import_module('analytics')
+    yield module
+    module.ingest_queue.close()
+    module.event_log.close()
+    sys.modules.pop('analytics', None)
+    patch.undo()
+
+
+@pytest.fixture(scope='module')
+def client(analytics):
+    app = Flask(__name__)
+    app.register_blueprint(analytics.analytics_bp, url_prefix='/api')
+    return app.test_client()
+
+
+@pytest.mark.parametrize('path, body', [
+    ('/api/track/pageview', {'page': ['x']}),
+    ('/api/track/pageview', {'page': '/', 'user_id': {'id': 1}}),
+    ('/api/track/interaction', {'event_type': 'click', 'additional_data': 'not an object'}),
+    ('/api/track/conversion', {'value': '49.99'}),
+    ('/api/track/conversion', {'value': True}),
+    ('/api/track/performance', {'metric': 'page_load'}),
+    ('/api/track/performance', {'value': 1200, 'event_id': ''}),
+    ('/api/track/pageview', ['/pricing']),
+])
+def test_single_event_endpoints_reject_invalid_fields(analytics, client, path, body):
+    enqueued = analytics.ingest_queue.stats['enqueued']
+    response = client.post(path, json=body)
+    assert response.status_code == 400, response.get_json()
+    assert 'error' in response.get_json()
+    assert analytics.ingest_queue.stats['enqueued'] == enqueued
+
+
+def test_single_event_endpoint_rejects_malformed_json(client):
+    response = client.post('/api/track/pageview', data='{"page": ', content_type='application/json')
+    assert response.status_code == 400
+
+
+def post_chunked(client, path, body, **headers):
+    """POST without a Content-Length, like a chunked upload"""
+    return client.post(path, input_stream=io.BytesIO(body), content_type='application/json', headers=headers,
+                       environ_overrides={'wsgi.input_terminated': True})
+
+
+def test_batch_body_without_content_length_is_capped(analytics, client):
+    padding = b' ' * (analytics.MAX_BATCH_BYTES + 1)
+    assert post_chunked(client, '/api/track/batch', gzip.compress(padding + b'[]'),
+                        **{'Content-Encoding': 'gzip'}).status_code == 413
+    assert post_chunked(client, '/api/track/batch', padding + b'[]').status_code == 413
+
+    event = {'type': 'pageview', 'page': '/chunked'}
+    response = post_chunked(client, '/api/track/batch', gzip.compress(json.dumps([event]).encode()),
+                            **{'Content-Encoding': 'gzip'})
+    assert response.status_code == 202 and response.get_json()['accepted'] == 1
+
+
+def overview(client):
+    response = client.get('/api/dashboard/overview?window=24h')
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_batch_and_single_events_reach_store_log_and_rollups(analytics, client):
+    assert analytics.ingest_queue.drain(5)
+    before = overview(client)
+    logged_before = sum(1 for _ in analytics.event_log.read())
+
+    response = client.post('/api/track/batch', json=[
+        {'type': 'pageview', 'page': '/pricing', 'session_id': 'api-s1', 'referrer': 'https://www.google.com/'},
+        {'type': 'conversion', 'conversion_type': 'purchase', 'value': 49, 'campaign': 'spring', 'session_id': 'api-s1'},
+        {'type': 'pageview', 'page': ['not', 'a', 'page']},
+        {'type': 'refund'}
+    ])
+    body = response.get_json()
+    assert response.status_code == 202
+    assert (body['status'], body['accepted'], body['rejected']) == ('partial', 2, 2)
+    assert [result['status'] for result in body['results']] == ['accepted', 'accepted', 'rejected', 'rejected']
+
+    response = client.post('/api/track/pageview', json={'page': '/signup', 'session_id': 'api-s1'},
+                           headers={'User-Agent': 'Mozilla/5.0 (iPhone; CPU iPhone OS 17_0) Mobile/15E148 Safari/604.1'})
+    assert response.status_code == 202
+    assert analytics.ingest_queue.drain(5)
+
+    pageviews = {row['page']: row for row in analytics.analytics_data['page_views'].rows()}
+    assert pageviews['/pricing']['session_id'] == 'api-s1'
+    assert pageviews['/signup']['ua_code'] == analytics.user_agent_code(
+        'Mozilla/5.0 (iPhone; CPU iPhone OS 17_0) Mobile/15E148 Safari/604.1')
+    conversions = [row for row in analytics.analytics_data['conversion_events'].rows() if row['campaign'] == 'spring']
+    assert [(row['conversion_type'], row['value']) for row in conversions] == [('purchase', 49.0)]
+    assert sum(1 for _ in analytics.event_log.read()) == logged_before + 3
+
+    after = overview(client)
+    assert after['page_views'] == before['page_views'] + 2
+    assert after['conversions'] == before['conversions'] + 1
+    assert after['open_sessions'] >= 1
+    assert {'page': '/pricing', 'views': 1} in after['top_pages']
+    assert {'campaign': 'spring', 'conversions': 1} in after['top_campaigns']
+
+
+def test_retried_event_id_is_reported_as_duplicate(analytics, client):
+    event = {'page': '/docs', 'event_id': 'api-retry-1'}
+    assert client.post('/api/track/pageview', json=event).status_code == 202
+    response = client.post('/api/track/pageview', json=event)
+    assert response.status_code == 200 and response.get_json()['status'] == 'duplicate'
+
+
+def test_full_queue_answers_429_and_releases_the_event_id(analytics, client, monkeypatch):
+    event = {'page': '/busy', 'event_id': 'api-busy-1'}
+    with monkeypatch.context() as patch:
+        patch.setattr(analytics.ingest_queue, 'max_events', 0)
+        response = client.post('/api/track/pageview', json=event)
+        assert response.status_code == 429
+        assert int(response.headers['Retry-After']) >= 1
+
+        response = client.post('/api/track/batch', json=[{'type': 'pageview', 'page': '/busy-batch'}])
+        assert response.status_code == 429
+
+    # Not stored, so the client's retry is accepted rather than dropped as a duplicate
+    assert client.post('/api/track/pageview', json=event).status_code == 202
+    assert analytics.ingest_queue.drain(5)
+    assert '/busy' in {row['page'] for row in analytics.analytics_data['page_views'].rows()}
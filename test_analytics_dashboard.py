@@ -0,0 +1,39 @@
+"""
+Dashboard data fetching: the overall deadline bounds sequential fetches too.
+"""
+
+import time
+
+import requests
+
+from analytics_dashboard import AIMarketingAnalyticsDashboard
+
+
+class SlowSession:
+    """Stands in for requests.Session: every request takes `delay` seconds, capped by its timeout"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.timeouts = []
+
+    def get(self, url, timeout=None):
+        self.timeouts.append(timeout)
+        time.sleep(min(self.delay, timeout))
+        raise requests.Timeout(f"{url} timed out")
+
+
+def test_sequential_fetch_respects_overall_deadline(tmp_path):
+    dashboard = AIMarketingAnalyticsDashboard(output_dir=str(tmp_path), request_timeout=5.0, fetch_deadline=0.3)
+    dashboard._session = SlowSession(delay=0.2)
+
+    start = time.perf_counter()
+    data = dashboard.fetch_analytics_data(concurrent=False)
+    elapsed = time.perf_counter() - start
+
+    timeouts = dashboard._session.timeouts
+    assert len(timeouts) == 2  # the second request gets only the ~0.1s that is left
+    assert timeouts[0] <= 0.3 and timeouts[1] < 0.15
+    assert elapsed < 1.0
+    report = dashboard.last_fetch_report
+    assert [report[source]['status'] for source in dashboard.DATA_SOURCES] == ['failed', 'failed', 'timeout', 'timeout']
+    assert set(data) >= set(dashboard.DATA_SOURCES)
@@ -0,0 +1,38 @@
+"""
+Tests for the day-segmented dashboard history store.
+"""
+
+from datetime import datetime, timedelta
+
+from dashboard_history import INDEX_RECORD, DashboardHistoryStore
+
+DAY = datetime(2025, 1, 20, 9, 0)
+
+
+def test_as_of_returns_latest_payload_per_source(tmp_path):
+    store = DashboardHistoryStore(str(tmp_path))
+    store.append({'overview': {'users': 1}, 'revenue': {'mrr': 10}}, DAY)
+    store.append({'overview': {'users': 2}}, DAY + timedelta(minutes=5))
+
+    result = store.as_of(DAY + timedelta(minutes=10), sources=['overview', 'revenue'])
+    assert result['data'] == {'overview': {'users': 2}, 'revenue': {'mrr': 10}}
+    assert store.as_of(DAY + timedelta(minutes=1))['data']['overview'] == {'users': 1}
+
+
+def test_append_after_torn_index_write_keeps_entries_aligned(tmp_path):
+    store = DashboardHistoryStore(str(tmp_path))
+    store.append({'overview': {'users': 1}}, DAY)
+    data_path, index_path = store._paths(DAY.strftime('%Y-%m-%d'))
+
+    # Interrupted append: half an index record, then an entry pointing past the segment
+    with open(index_path, 'ab') as f:
+        f.write(INDEX_RECORD.pack(DAY.timestamp() + 60, 10_000, 50))
+        f.write(b'\x00' * (INDEX_RECORD.size // 2))
+
+    store.append({'overview': {'users': 3}}, DAY + timedelta(minutes=5))
+    store.append({'overview': {'users': 4}}, DAY + timedelta(minutes=6))
+
+    assert store._load_index(DAY.strftime('%Y-%m-%d'))[-1][0] == (DAY + timedelta(minutes=6)).timestamp()
+    assert store.get_stats()['records'] == 3
+    assert store.as_of(DAY + timedelta(minutes=5, seconds=30))['data']['overview'] == {'users': 3}
+    assert store.as_of(DAY + timedelta(minutes=10))['data']['overview'] == {'users': 4}
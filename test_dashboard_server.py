@@ -0,0 +1,61 @@
+"""
+Live dashboard server: figure snapshots and published updates stay consistent
+with the version they are tagged with.
+"""
+
+import plotly.graph_objects as go
+
+from analytics_dashboard import AIMarketingAnalyticsDashboard
+from dashboard_server import DashboardLiveServer
+
+
+class FakeDashboard:
+    """Two line charts over one growing series, without any backend"""
+
+    DASHBOARDS = {
+        'first': ('series', 'build_first', None, None),
+        'second': ('series', 'build_second', None, None)
+    }
+    colors = {'background': '#fff', 'text_dark': '#000', 'primary_teal': '#0aa'}
+    last_fetch_report = {}
+    hash_dashboard_input = staticmethod(AIMarketingAnalyticsDashboard.hash_dashboard_input)
+
+    def __init__(self):
+        self.points = [1, 2]
+        self.during_build = None
+
+    def fetch_analytics_data(self):
+        return {'series': list(self.points)}
+
+    def build_first(self, data):
+        return go.Figure(go.Scatter(y=data['series']))
+
+    def build_second(self, data):
+        if self.during_build:
+            self.during_build()
+        return go.Figure(go.Scatter(y=data['series']))
+
+
+def test_snapshot_taken_during_a_poll_matches_its_version():
+    dashboard = FakeDashboard()
+    server = DashboardLiveServer(dashboard)
+    client = server.create_app().test_client()
+    server.poll_once()
+    subscriber = server.subscribe()
+
+    # A viewer loads the page while the next poll is between dashboards
+    snapshots = []
+    dashboard.during_build = lambda: snapshots.append(client.get('/api/figures').get_json())
+    dashboard.points.append(3)
+    server.poll_once()
+
+    snapshot = snapshots[0]
+    event, message = subscriber.get_nowait()
+    assert event == 'update'
+    assert '"base_version": %d' % snapshot['version'] in message
+    # Applying the update on top of this snapshot must not extend an already-extended trace
+    assert snapshot['figures']['first']['figure']['data'][0]['y'] == [1, 2]
+
+    final = client.get('/api/figures').get_json()
+    assert final['version'] == snapshot['version'] + 1
+    assert final['figures']['first']['figure']['data'][0]['y'] == [1, 2, 3]
@@ -0,0 +1,69 @@
+"""
+Tests for dropping client retries by event_id.
+"""
+
+import time
+from datetime import datetime
+
+import pytest
+
+from event_dedup import EventDeduplicator
+
+
+@pytest.mark.parametrize('mode', ['bloom', 'lru'])
+def test_integer_and_string_ids_are_distinct(mode):
+    dedup = EventDeduplicator(window=60, memory_bytes=1 << 20, mode=mode)
+
+    assert dedup.check('page_views', {'event_id': 1})[0] is False
+    assert dedup.check('page_views', {'event_id': '1'})[0] is False
+    assert dedup.check('page_views', {'event_id': 1})[0] is True
+    assert dedup.check('page_views', {'event_id': '1'})[0] is True
+
+
+@pytest.mark.parametrize('mode', ['bloom', 'lru'])
+def test_released_keys_are_accepted_again(mode):
+    dedup = EventDeduplicator(window=60, memory_bytes=1 << 20, mode=mode)
+    duplicate, key = dedup.check('user_interactions', {'event_id': 'a'})
+    assert not duplicate
+
+    dedup.release([key])
+    assert dedup.check('user_interactions', {'event_id': 'a'})[0] is False
+    assert dedup.check('user_interactions', {'event_id': 'a'})[0] is True
+
+
+def test_conversions_are_exact_per_user_and_type():
+    dedup = EventDeduplicator(window=60, memory_bytes=1 << 20)
+    conversion = {'event_id': 'x', 'user_id': 'u1', 'conversion_type': 'signup'}
+
+    assert not dedup.check('conversion_events', conversion)[0]
+    assert not dedup.check('conversion_events', {**conversion, 'user_id': 'u2'})[0]
+    assert not dedup.check('conversion_events', {**conversion, 'conversion_type': 'purchase'})[0]
+    assert dedup.check('conversion_events', conversion)[0]
+
+
+def test_conversion_key_cap_is_configurable_and_reported():
+    dedup = EventDeduplicator(window=60, memory_bytes=1 << 20, max_conversion_keys=100)
+    for n in range(150):
+        dedup.check('conversion_events', {'event_id': n, 'user_id': 'u', 'conversion_type': 'signup'})
+
+    stats = dedup.get_stats()
+    assert stats['conversion_key_capacity'] == 100
+    assert stats['conversion_keys'] == 100
+    assert stats['conversion_keys_evicted'] == 50
+
+    with pytest.raises(ValueError):
+        EventDeduplicator(window=60, memory_bytes=1 << 10, max_conversion_keys=100)
+
+
+@pytest.mark.parametrize('mode', ['bloom', 'lru'])
+def test_replayed_keys_expire_a_window_after_their_event_time(mode):
+    window = 600
+    dedup = EventDeduplicator(window=window, memory_bytes=1 << 20, mode=mode)
+    now = time.time()
+    dedup.remember('page_views', [
+        {'event_id': 'old', 'timestamp': datetime.fromtimestamp(now - 2 * window).isoformat()},
+        {'event_id': 'recent', 'timestamp': datetime.fromtimestamp(now - 60).isoformat()}
+    ])
+
+    assert dedup.check('page_views', {'event_id': 'recent'})[0] is True
+    assert dedup.check('page_views', {'event_id': 'old'})[0] is False
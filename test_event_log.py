@@ -0,0 +1,51 @@
+"""
+Tests for the durable analytics event log.
+"""
+
+import time
+from datetime import datetime
+
+from event_log import EventLog
+
+
+def iso(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch).isoformat()
+
+
+def test_read_merges_writers_by_event_time(tmp_path):
+    first = EventLog(str(tmp_path), fsync=False)
+    second = EventLog(str(tmp_path), fsync=False)
+    base = time.time() - 3600
+    first.append('page_views', [{'timestamp': iso(base + n), 'page': f'/a{n}'} for n in range(0, 100, 2)])
+    second.append('page_views', [{'timestamp': iso(base + n), 'page': f'/b{n}'} for n in range(1, 100, 2)])
+    assert first.writer_dir != second.writer_dir
+
+    timestamps = [record['timestamp'] for _, record in first.read()]
+    assert len(timestamps) == 100
+    assert timestamps == sorted(timestamps)
+
+    first.close()
+    second.close()
+
+
+def test_rotation_prunes_segments_past_retention(tmp_path):
+    log = EventLog(str(tmp_path), segment_bytes=4096, index_interval=8, fsync=False)
+    old = time.time() - 30 * 86400
+    log.append('page_views', [{'timestamp': iso(old + n), 'page': '/old' + 'x' * 100} for n in range(200)])
+    log.commit()
+    old_segments = log.get_stats()['segments']
+    assert old_segments > 2
+
+    log.retention_seconds = 7 * 86400
+
+    recent = time.time() - 60
+    log.append('page_views', [{'timestamp': iso(recent + n / 1000), 'page': '/new' + 'x' * 100}
+                              for n in range(200)])
+    log.commit()
+
+    # Every sealed segment of old events is gone; the one holding the first new events stays
+    assert log.stats['pruned_segments'] == old_segments - 1
+    pages = [record['page'] for _, record in log.read()]
+    assert pages.count('/new' + 'x' * 100) == 200
+    assert pages.count('/old' + 'x' * 100) < 200
+    log.close()
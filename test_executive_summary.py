@@ -0,0 +1,29 @@
+"""
+Executive summary cache: hits are keyed by day and newest record, but every
+caller gets its own as_of back.
+"""
+
+from datetime import datetime, timedelta
+
+from dashboard_history import DashboardHistoryStore
+from executive_summary import ExecutiveSummaryEngine
+
+
+def test_cached_summary_carries_each_callers_as_of(tmp_path):
+    history = DashboardHistoryStore(str(tmp_path / 'history'))
+    yesterday = (datetime.now() - timedelta(days=1)).replace(hour=6, minute=0, second=0, microsecond=0)
+    history.append({'overview': {'total_page_views': 1200}}, yesterday)
+    engine = ExecutiveSummaryEngine(history, str(tmp_path / 'cache'))
+
+    morning = engine.get_summary('week', yesterday.replace(hour=9))
+    evening = engine.get_summary('week', yesterday.replace(hour=21))
+    assert engine.cache_stats['hits'] == 1
+    assert morning['as_of'] == yesterday.replace(hour=9).isoformat()
+    assert evening['as_of'] == yesterday.replace(hour=21).isoformat()
+
+    # Past days are also served from disk by a fresh engine
+    reloaded = ExecutiveSummaryEngine(history, str(tmp_path / 'cache'))
+    noon = reloaded.get_summary('week', yesterday.replace(hour=12))
+    assert reloaded.cache_stats['disk_hits'] == 1
+    assert noon['as_of'] == yesterday.replace(hour=12).isoformat()
+    assert noon['key_metrics'] == morning['key_metrics']
@@ -0,0 +1,52 @@
+"""
+Lazy-import tests: each module is imported in a fresh interpreter and must not
+load the plotting or data stacks (see benchmark_imports.IMPORT_BUDGETS) until
+one of its lazy proxies is first used. Import timings are reported by
+benchmark_imports.py, not asserted here.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from benchmark_imports import IMPORT_BUDGETS
+
+# Module -> {lazy proxy attribute: top-level package it loads on first use}
+LAZY_PROXIES = {
+    'analytics_dashboard': {'np': 'numpy', 'go': 'plotly'},
+    'performance_analyzer': {'pd': 'pandas', 'np': 'numpy'},
+    'monitoring_snapshot': {'pd': 'pandas', 'pa': 'pyarrow'},
+    'sketches': {'np': 'numpy'}
+}
+
+PROBE = """
+import importlib, json, sys
+module = importlib.import_module(sys.argv[1])
+loaded = {'import': sorted({name.split('.')[0] for name in sys.modules})}
+for attr in sys.argv[2:]:
+    getattr(getattr(module, attr), '__name__')
+    loaded[attr] = sorted({name.split('.')[0] for name in sys.modules})
+print(json.dumps(loaded))
+"""
+
+
+def probe_imports(module, attributes):
+    """Top-level packages loaded after importing `module`, then after touching each lazy attribute"""
+    completed = subprocess.run([sys.executable, '-c', PROBE, module, *attributes], capture_output=True, text=True,
+                               cwd=os.path.dirname(os.path.abspath(__file__)))
+    assert completed.returncode == 0, completed.stderr[-2000:]
+    return {step: set(packages) for step, packages in json.loads(completed.stdout.splitlines()[-1]).items()}
+
+
+@pytest.mark.parametrize('module', list(IMPORT_BUDGETS))
+def test_heavy_modules_load_only_on_first_use(module):
+    proxies = LAZY_PROXIES[module]
+    loaded = probe_imports(module, list(proxies))
+
+    eager = sorted(loaded['import'] & set(IMPORT_BUDGETS[module]['forbidden']))
+    assert not eager, f"{module} imports {', '.join(eager)} eagerly"
+    for attr, package in proxies.items():
+        assert package in loaded[attr], f"{module}.{attr} did not load {package} on first use"
@@ -0,0 +1,72 @@
+"""
+Ingest queue failure handling: poison batches are dead-lettered so ingest
+continues, and transient errors are retried without repeating finished work.
+"""
+
+import json
+
+from ingest_queue import IngestQueue
+
+
+def test_poison_batch_is_dead_lettered_and_ingest_continues(tmp_path):
+    stored = []
+
+    def flush(batch):
+        for record in batch['page_views']:
+            hash(record['page'])  # a list-valued field fails like it does in the columnar store
+        stored.extend(batch['page_views'])
+
+    dead_letters = tmp_path / 'dead_letters.ndjson'
+    queue = IngestQueue(flush, batch_size=10, flush_interval=0.01, dead_letter_path=str(dead_letters))
+    queue.offer({'page_views': [{'page': ['x']}]})
+    assert queue.drain(5)
+
+    queue.offer({'page_views': [{'page': '/pricing'}]})
+    assert queue.drain(5)
+    queue.close()
+
+    assert stored == [{'page': '/pricing'}]
+    stats = queue.get_stats()
+    assert stats['dead_lettered'] == 1 and stats['backoff_seconds'] == 0
+    assert stats['flush_errors'] == 1  # not retried: the error is not transient
+    lines = [json.loads(line) for line in dead_letters.read_text().splitlines()]
+    assert [line['record'] for line in lines] == [{'page': ['x']}]
+    assert lines[0]['storage'] == 'page_views' and lines[0]['error'].startswith('TypeError')
+
+
+def test_transient_errors_retry_without_repeating_completed_work():
+    logged, attempts = [], []
+
+    def flush(batch):
+        attempts.append(batch.attempts)
+        if 'page_views' not in batch.completed:
+            logged.extend(batch['page_views'])
+            batch.completed.add('page_views')
+        if len(attempts) < 3:
+            raise OSError('disk unavailable')
+
+    queue = IngestQueue(flush, flush_interval=0.01, max_backoff=0.05)
+    queue.offer({'page_views': [{'page': '/'}]})
+    assert queue.drain(5)
+    queue.close()
+
+    assert attempts == [1, 2, 3]
+    assert logged == [{'page': '/'}]
+    assert queue.get_stats()['flushed'] == 1
+
+
+def test_transient_errors_stop_after_max_attempts():
+    calls = []
+
+    def flush(batch):
+        calls.append(batch.attempts)
+        raise OSError('disk unavailable')
+
+    queue = IngestQueue(flush, flush_interval=0.01, max_backoff=0.01, max_attempts=3)
+    queue.offer({'page_views': [{'page': '/'}]})
+    assert queue.drain(5)
+    queue.close()
+
+    assert calls == [1, 2, 3]
+    stats = queue.get_stats()
+    assert stats['dropped'] == 1 and stats['backoff_seconds'] == 0
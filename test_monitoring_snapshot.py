@@ -0,0 +1,33 @@
+"""
+Tests for decoding monitoring_logs.metrics JSON into typed columns.
+"""
+
+import pytest
+
+pd = pytest.importorskip('pandas')
+
+from monitoring_snapshot import decode_metrics  # noqa: E402
+
+
+def test_decode_metrics_flattens_and_types_columns():
+    metrics = pd.Series([
+        '{"cpu": 12.5, "endpoints_status": {"/api/plans": {"status": "ok", "response_time": 41}}}',
+        '{"cpu": "13", "endpoints_status": {"/api/plans": {"status": "error", "response_time": 95}}}'
+    ], index=[10, 11])
+    features = decode_metrics(metrics)
+
+    assert list(features.index) == [10, 11]
+    assert features['cpu'].tolist() == [12.5, 13.0]
+    assert features['endpoints_status./api/plans.response_time'].tolist() == [41, 95]
+    assert features['endpoints_status./api/plans.status'].tolist() == ['ok', 'error']
+    assert features.attrs['invalid_metrics'] == 0
+
+
+def test_decode_metrics_keeps_good_rows_when_some_are_malformed():
+    metrics = pd.Series(['{"cpu": 1}', '', 'not json', None, '{"cpu": 3}', '1, 2'])
+    features = decode_metrics(metrics)
+
+    assert len(features) == len(metrics)
+    assert features['cpu'].iloc[[0, 4]].tolist() == [1, 3]
+    assert features['cpu'].iloc[[1, 2, 3, 5]].isna().all()
+    assert features.attrs['invalid_metrics'] == 3
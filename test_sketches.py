@@ -0,0 +1,150 @@
+"""
+Accuracy tests for the streaming sketches: every estimate is checked against
+the exact answer computed from the same synthetic stream.
+"""
+
+import math
+import random
+from collections import Counter
+
+import pytest
+
+from sketches import CountMinSketch, DDSketch, HeavyHitters, HyperLogLog, SpaceSaving, hyperloglog_accuracy, ks_compare
+
+
+def zipf_stream(keys: int, events: int, seed: int = 7):
+    """Page-like keys with a few heavy hitters and a long tail"""
+    rng = random.Random(seed)
+    weights = [1 / rank ** 1.2 for rank in range(1, keys + 1)]
+    return rng.choices([f"/page/{rank}" for rank in range(1, keys + 1)], weights, k=events)
+
+
+@pytest.mark.parametrize('cardinality', [50, 1_000, 20_000, 200_000])
+def test_hyperloglog_within_error_bound(cardinality):
+    sketch = HyperLogLog(12)
+    sketch.update(f"visitor-{n}" for n in range(cardinality))
+
+    # 3 standard errors: fails by chance well under 1% of the time, and the ids are fixed
+    assert abs(sketch.count() - cardinality) <= 3 * sketch.relative_error * cardinality
+    bounds = sketch.error_bounds(sigmas=3.0)
+    assert bounds['low'] <= cardinality <= bounds['high']
+
+
+def test_hyperloglog_ignores_duplicates_and_merges_exactly():
+    ids = [f"visitor-{n % 5_000}" for n in range(50_000)]
+    whole = HyperLogLog(12)
+    whole.update(ids)
+    assert abs(whole.count() - 5_000) <= 3 * whole.relative_error * 5_000
+
+    left, right = HyperLogLog(12), HyperLogLog(12)
+    left.update(ids[:30_000])
+    right.update(ids[20_000:])
+    assert left.merge(right).registers == whole.registers
+
+
+def test_hyperloglog_accuracy_report():
+    results = hyperloglog_accuracy([1_000, 10_000], precision=12, trials=2)
+    assert all(result['within_bounds'] and result['merge_consistent'] for result in results)
+
+
+@pytest.mark.parametrize('relative_accuracy', [0.01, 0.02])
+def test_ddsketch_quantiles_within_relative_accuracy(relative_accuracy):
+    rng = random.Random(3)
+    # Latency-like: lognormal body plus a slow tail
+    values = [rng.lognormvariate(4, 0.6) for _ in range(40_000)] + [rng.uniform(2_000, 9_000) for _ in range(400)]
+    sketch = DDSketch(relative_accuracy)
+    sketch.add_array(values)
+
+    ordered = sorted(values)
+    for q in (0.0, 0.1, 0.5, 0.9, 0.95, 0.99, 0.999, 1.0):
+        exact = ordered[int(math.floor(q * (len(ordered) - 1)))]
+        assert abs(sketch.quantile(q) - exact) <= relative_accuracy * exact * (1 + 1e-9), q
+
+    assert sketch.count == len(values)
+    assert sketch.mean == pytest.approx(sum(values) / len(values))
+
+
+def test_ddsketch_merge_matches_single_sketch():
+    rng = random.Random(5)
+    values = [rng.expovariate(1 / 120) for _ in range(10_000)]
+    whole = DDSketch(0.01)
+    for value in values:
+        whole.add(value)
+
+    left, right = DDSketch(0.01), DDSketch(0.01)
+    left.add_array(values[:4_000])
+    right.add_array(values[4_000:])
+    merged = left.merge(right)
+    for q in (0.5, 0.9, 0.99):
+        assert merged.quantile(q) == whole.quantile(q)
+
+
+def test_count_min_never_undercounts_and_stays_within_bound():
+    stream = zipf_stream(2_000, 50_000)
+    exact = Counter(stream)
+    sketch = CountMinSketch(width=512, depth=4)
+    for key in stream:
+        sketch.add(key)
+
+    overcounts = [sketch.estimate(key) - count for key, count in exact.items()]
+    assert min(overcounts) >= 0
+    # The e / width * total bound holds per key with probability 1 - exp(-depth)
+    within = sum(overcount <= sketch.error_bound for overcount in overcounts)
+    assert within / len(overcounts) >= 1 - math.exp(-sketch.depth)
+
+
+def test_space_saving_top_k_matches_counter():
+    stream = zipf_stream(5_000, 100_000)
+    exact = Counter(stream)
+    summary = SpaceSaving(capacity=64)
+    for key in stream:
+        summary.add(key)
+
+    top = summary.top(10)
+    assert [item['key'] for item in top] == [key for key, _ in exact.most_common(10)]
+    for item in top:
+        # Never underestimated, and overestimated by at most the recorded error
+        assert item['count'] - item['error'] <= exact[item['key']] <= item['count']
+
+
+def test_heavy_hitters_top_k_matches_counter_after_merge():
+    stream = zipf_stream(5_000, 100_000, seed=11)
+    exact = Counter(stream)
+    halves = [HeavyHitters(capacity=64), HeavyHitters(capacity=64)]
+    for position, key in enumerate(stream):
+        halves[position % 2].add(key)
+    merged = halves[0].merge(halves[1])
+
+    top = merged.top(10)
+    assert [item['key'] for item in top] == [key for key, _ in exact.most_common(10)]
+    for item in top:
+        assert exact[item['key']] <= item['count'] <= exact[item['key']] + item['error']
+    assert merged.total == len(stream)
+
+
+def test_heavy_hitters_exact_below_capacity():
+    stream = zipf_stream(40, 5_000)
+    sketch = HeavyHitters(capacity=64)
+    for key in stream:
+        sketch.add(key)
+
+    assert sketch.frequencies is None
+    assert {item['key']: item['count'] for item in sketch.top(40)} == dict(Counter(stream))
+
+
+def test_ks_compare_flags_shifted_distribution():
+    rng = random.Random(9)
+    baseline, same, slower = DDSketch(0.01), DDSketch(0.01), DDSketch(0.01)
+    baseline.add_array([rng.lognormvariate(4, 0.5) for _ in range(5_000)])
+    same.add_array([rng.lognormvariate(4, 0.5) for _ in range(5_000)])
+    slower.add_array([rng.lognormvariate(4.3, 0.5) for _ in range(5_000)])
+
+    assert not ks_compare(same, baseline)['significant']
+    assert ks_compare(slower, baseline)['significant']
+
+
+def test_ks_compare_rejects_unknown_significance():
+    sketch = DDSketch(0.01)
+    sketch.add(10)
+    with pytest.raises(ValueError):
+        ks_compare(sketch, sketch, significance=0.02)
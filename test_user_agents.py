@@ -0,0 +1,28 @@
+"""
+User-Agent classification and the header length cap in front of its cache.
+"""
+
+from user_agents import (MAX_USER_AGENT_LENGTH, clip_user_agent, unpack_user_agent, user_agent_code,
+                         user_agent_info)
+
+CHROME_ANDROID = ('Mozilla/5.0 (Linux; Android 14; Pixel 8) AppleWebKit/537.36 (KHTML, like Gecko) '
+                  'Chrome/126.0.0.0 Mobile Safari/537.36')
+
+
+def test_classifies_common_headers():
+    assert unpack_user_agent(user_agent_code(CHROME_ANDROID)) == {
+        'device': 'mobile', 'browser': 'chrome', 'os': 'android'
+    }
+    assert unpack_user_agent(user_agent_code('Googlebot/2.1'))['device'] == 'bot'
+    assert unpack_user_agent(user_agent_code(None)) == {'device': 'unknown', 'browser': 'unknown', 'os': 'unknown'}
+
+
+def test_oversized_headers_are_clipped_before_caching():
+    user_agent_info.cache_clear()
+    for n in range(20):
+        user_agent_code(CHROME_ANDROID + 'x' * (MAX_USER_AGENT_LENGTH + n))
+
+    # Every variant differs only past the cap, so they share one cache entry
+    assert user_agent_info.cache_info().currsize == 1
+    assert len(clip_user_agent('x' * 10_000)) == MAX_USER_AGENT_LENGTH
+    assert clip_user_agent(CHROME_ANDROID) == CHROME_ANDROID
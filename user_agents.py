@@ -0,0 +1,93 @@
+"""
+AI Marketing Tools - User-Agent Classification
+Maps User-Agent headers to device, browser and OS classes packed into one
+small integer, parsing each distinct header once through a bounded LRU cache.
+"""
+
+from functools import lru_cache
+from typing import Dict, Tuple
+
+# Class vocabularies; a class's code is its index (0 = unknown)
+DEVICE_TYPES = ('unknown', 'desktop', 'mobile', 'tablet', 'bot')
+BROWSERS = ('unknown', 'chrome', 'safari', 'firefox', 'edge', 'opera', 'samsung', 'ie', 'other')
+OPERATING_SYSTEMS = ('unknown', 'windows', 'macos', 'ios', 'android', 'linux', 'chromeos', 'other')
+
+# Distinct User-Agent strings kept parsed
+USER_AGENT_CACHE_SIZE = 8192
+
+# Headers are cut to this many characters before the cache lookup, so a client
+# cannot pin arbitrarily large strings in the cache (real ones stay well below)
+MAX_USER_AGENT_LENGTH = 512
+
+BOT_MARKERS = ('bot', 'crawler', 'spider', 'slurp', 'headless', 'lighthouse', 'python-requests', 'curl/')
+
+# (substring, class) checked in order; the first match wins
+BROWSER_MARKERS = (
+    ('edg/', 'edge'), ('edge/', 'edge'), ('edgios', 'edge'), ('edga/', 'edge'),
+    ('opr/', 'opera'), ('opera', 'opera'),
+    ('samsungbrowser', 'samsung'),
+    ('firefox/', 'firefox'), ('fxios', 'firefox'),
+    ('chrome/', 'chrome'), ('crios', 'chrome'), ('chromium', 'chrome'),
+    ('safari/', 'safari'),
+    ('msie', 'ie'), ('trident/', 'ie')
+)
+OS_MARKERS = (
+    ('windows', 'windows'),
+    ('iphone', 'ios'), ('ipad', 'ios'), ('ipod', 'ios'),
+    ('android', 'android'),
+    ('cros', 'chromeos'),
+    ('mac os x', 'macos'), ('macintosh', 'macos'),
+    ('linux', 'linux')
+)
+
+
+def classify_user_agent(user_agent: str) -> Tuple[str, str, str]:
+    """(device, browser, os) class names of a User-Agent header (uncached)"""
+    if not user_agent:
+        return 'unknown', 'unknown', 'unknown'
+    ua = user_agent.lower()
+
+    browser = next((name for marker, name in BROWSER_MARKERS if marker in ua), 'other')
+    os_name = next((name for marker, name in OS_MARKERS if marker in ua), 'other')
+
+    if any(marker in ua for marker in BOT_MARKERS):
+        device = 'bot'
+    elif 'ipad' in ua or 'tablet' in ua or (os_name == 'android' and 'mobile' not in ua):
+        device = 'tablet'
+    elif 'mobi' in ua or os_name in ('ios', 'android'):
+        device = 'mobile'
+    else:
+        device = 'desktop'
+    return device, browser, os_name
+
+
+def pack_user_agent(device: str, browser: str, os_name: str) -> int:
+    """Class names -> one code below 2**12 (4 bits each)"""
+    return DEVICE_TYPES.index(device) << 8 | BROWSERS.index(browser) << 4 | OPERATING_SYSTEMS.index(os_name)
+
+
+def unpack_user_agent(code: int) -> Dict[str, str]:
+    return {
+        'device': DEVICE_TYPES[code >> 8 & 0xF],
+        'browser': BROWSERS[code >> 4 & 0xF],
+        'os': OPERATING_SYSTEMS[code & 0xF]
+    }
+
+
+@lru_cache(maxsize=USER_AGENT_CACHE_SIZE)
+def user_agent_info(user_agent: str) -> Tuple[str, int]:
+    """(canonical string, packed class code) of a User-Agent header
+
+    The cache holds the first instance seen of each header, so events that
+    keep the returned string share one object instead of a copy per request.
+    Callers pass headers cut to MAX_USER_AGENT_LENGTH (see clip_user_agent).
+    """
+    return user_agent, pack_user_agent(*classify_user_agent(user_agent))
+
+
+def clip_user_agent(user_agent: str) -> str:
+    return (user_agent or '')[:MAX_USER_AGENT_LENGTH]
+
+
+def user_agent_code(user_agent: str) -> int:
+    return user_agent_info(clip_user_agent(user_agent))[1]